@@ -58,7 +58,7 @@ class CharacterAdmin(admin.ModelAdmin):
             "description": "AI 모델에 전달될 최종 프롬프트",
         }),
         ("⚙️ 제어 설정", {
-            "fields": ("creativity", "context_length", "moderation_level"),
+            "fields": ("creativity", "context_length", "moderation_level", "response_cache_enabled"),
             "classes": ("collapse",),
         }),
         ("이미지 및 메타데이터", {
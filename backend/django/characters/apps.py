@@ -5,3 +5,7 @@ class CharactersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "characters"
     verbose_name = "캐릭터 관리"
+
+    def ready(self):
+        """캐릭터 캐시 무효화 시그널 등록"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("characters", "0006_alter_character_avatar_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="character",
+            name="response_cache_enabled",
+            field=models.BooleanField(
+                default=False,
+                help_text="대화 첫 질문이 이전 질문과 거의 같으면 저장된 답변 재사용 (교육자 캐릭터 권장)",
+                verbose_name="응답 캐시 사용",
+            ),
+        ),
+    ]
@@ -206,6 +206,12 @@ class Character(models.Model):
         help_text="교육용은 높음 권장"
     )
 
+    response_cache_enabled = models.BooleanField(
+        default=False,
+        verbose_name="응답 캐시 사용",
+        help_text="대화 첫 질문이 이전 질문과 거의 같으면 저장된 답변 재사용 (교육자 캐릭터 권장)"
+    )
+
     # ========== 상태 관리 ==========
     status = models.CharField(
         max_length=20,
@@ -85,6 +85,7 @@ class CharacterDetailSerializer(serializers.ModelSerializer):
             "context_length",
             "moderation_level",
             "moderation_level_display",
+            "response_cache_enabled",
             "owner",
             "owner_name",
             "owner_role",
@@ -149,6 +150,7 @@ class CharacterCreateUpdateSerializer(serializers.ModelSerializer):
             "creativity",
             "context_length",
             "moderation_level",
+            "response_cache_enabled",
             "organization",
             "visibility",
             "tags",
@@ -0,0 +1,70 @@
+"""
+캐릭터 변경 시그널
+- Character 저장/삭제 시 FastAPI 캐릭터 캐시 무효화
+- Redis 채널로 무효화 메시지를 발행하면 FastAPI 인스턴스들이 구독하여 로컬 캐시 제거
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import serializers
+
+from .models import Character
+
+logger = logging.getLogger(__name__)
+
+# FastAPI app/character_cache.py 와 동일한 값이어야 함
+CHARACTER_CACHE_KEY = "character:{id}"
+CHARACTER_INVALIDATE_CHANNEL = "character:invalidate"
+
+_redis = None
+
+
+def get_redis():
+    """Redis 클라이언트 (REDIS_URL 미설정 시 None)"""
+    global _redis
+    if _redis is None and settings.REDIS_URL:
+        import redis
+        _redis = redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+        )
+    return _redis
+
+
+def character_stamp(character) -> str:
+    """캐릭터 버전 스탬프 - API 응답의 version/updated_at 표현과 동일"""
+    updated_at = serializers.DateTimeField().to_representation(character.updated_at)
+    return f"{character.version}:{updated_at}"
+
+
+def invalidate_character_cache(character_id, stamp=None):
+    """FastAPI 캐릭터 캐시 무효화 (Redis 키 삭제 + 무효화 메시지 발행)"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(CHARACTER_CACHE_KEY.format(id=character_id))
+        client.publish(
+            CHARACTER_INVALIDATE_CHANNEL,
+            json.dumps({"id": character_id, "stamp": stamp}),
+        )
+    except Exception as e:
+        logger.warning(f"[Character Cache] Invalidation failed for {character_id}: {e}")
+
+
+@receiver(post_save, sender=Character)
+def character_saved(sender, instance, **kwargs):
+    stamp = character_stamp(instance)
+    transaction.on_commit(lambda: invalidate_character_cache(instance.pk, stamp))
+
+
+@receiver(post_delete, sender=Character)
+def character_deleted(sender, instance, **kwargs):
+    character_id = instance.pk
+    transaction.on_commit(lambda: invalidate_character_cache(character_id))
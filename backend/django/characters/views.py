@@ -215,8 +215,9 @@ class CharacterViewSet(viewsets.ModelViewSet):
     def increment_usage(self, request, pk=None):
         """캐릭터 사용 횟수 증가 (대화 시작 시 호출)"""
         character = self.get_object()
-        character.usage_count += 1
-        character.save()
+        # 프롬프트와 무관한 카운터이므로 save() 대신 UPDATE만 수행 (캐릭터 캐시 무효화 방지)
+        Character.objects.filter(pk=character.pk).update(usage_count=models.F("usage_count") + 1)
+        character.refresh_from_db(fields=["usage_count"])
 
         return Response(
             {"message": "사용 횟수가 증가했습니다.", "usage_count": character.usage_count}
@@ -278,6 +278,13 @@ SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "")
 
 REDIS_URL = os.getenv("REDIS_URL", "")
 
+# =============================================================================
+# WORKER SETTINGS
+# =============================================================================
+# FastAPI/Celery 워커가 X-Worker-Token 헤더로 보내는 서비스 토큰
+# 업로드 결과(result_data.asset)는 이 토큰이 있는 요청에서만 받음
+WORKER_SERVICE_TOKEN = os.getenv("WORKER_SERVICE_TOKEN", "")
+
 # =============================================================================
 # CUSTOM USER MODEL
 # =============================================================================
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db.models import Q
 from django.utils.html import format_html
+from rest_framework.exceptions import ValidationError
 from .models import Conversation, Message, ConversationReport
+from .search import search_messages
 
 
 class MessageInline(admin.TabularInline):
@@ -27,14 +30,17 @@ class ConversationAdmin(admin.ModelAdmin):
         "user",
         "character_link",
         "title_preview",
-        "message_count",
+        "message_count_badge",
         "is_active",
         "created_at",
         "updated_at",
     ]
     
+    list_select_related = ["user", "character"]
+    
     list_filter = [
         "is_active",
+        ("archived_at", admin.EmptyFieldListFilter),
         "created_at",
         "updated_at",
         "character",
@@ -53,6 +59,11 @@ class ConversationAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
         "message_count",
+        "total_tokens",
+        "last_message_at",
+        "last_message_preview",
+        "archived_at",
+        "rehydrated_at",
     ]
     
     inlines = [MessageInline]
@@ -62,7 +73,11 @@ class ConversationAdmin(admin.ModelAdmin):
             "fields": ("user", "character", "classroom", "title", "subject")
         }),
         ("상태", {
-            "fields": ("is_active", "message_count")
+            "fields": ("is_active", "message_count", "total_tokens", "last_message_at", "last_message_preview")
+        }),
+        ("아카이브", {
+            "fields": ("archived_at", "rehydrated_at"),
+            "classes": ("collapse",),
         }),
         ("정책", {
             "fields": ("policy_snapshot_ref",),
@@ -92,15 +107,16 @@ class ConversationAdmin(admin.ModelAdmin):
     
     title_preview.short_description = "대화 제목"
     
-    def message_count(self, obj):
+    def message_count_badge(self, obj):
         """메시지 개수"""
-        count = obj.messages.count()
+        count = obj.message_count
         return format_html(
             '<span style="background-color: #007bff; color: white; padding: 2px 8px; border-radius: 3px;">{} 개</span>',
             count
         )
     
-    message_count.short_description = "메시지 수"
+    message_count_badge.short_description = "메시지 수"
+    message_count_badge.admin_order_field = "message_count"
 
 
 @admin.register(Message)
@@ -124,6 +140,7 @@ class MessageAdmin(admin.ModelAdmin):
         "created_at",
     ]
     
+    # 실제 검색은 get_search_results (검색창 표시용)
     search_fields = [
         "conversation__user__username",
         "conversation__character__name",
@@ -170,12 +187,27 @@ class MessageAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """내용 검색은 n-gram 색인 사용 (사용자명/캐릭터명 검색은 기본 방식)"""
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        try:
+            by_content = search_messages(queryset, search_term)
+        except ValidationError:
+            # 1글자 검색어 등은 기본 icontains 검색
+            return super().get_search_results(request, queryset, search_term)
+        by_name = queryset.filter(
+            Q(conversation__user__username__icontains=search_term.strip())
+            | Q(conversation__character__name__icontains=search_term.strip())
+        )
+        return by_content | by_name, False
+    
     def conversation_link(self, obj):
         """대화 링크"""
         return format_html(
             '<a href="/admin/conversations/conversation/{}/change/">대화 #{}</a>',
-            obj.conversation.id,
-            obj.conversation.id
+            obj.conversation_id,
+            obj.conversation_id
         )
     
     conversation_link.short_description = "대화"
@@ -271,8 +303,8 @@ class ConversationReportAdmin(admin.ModelAdmin):
         """대화 링크"""
         return format_html(
             '<a href="/admin/conversations/conversation/{}/change/">대화 #{}</a>',
-            obj.conversation.id,
-            obj.conversation.id
+            obj.conversation_id,
+            obj.conversation_id
         )
     
     conversation_link.short_description = "대화"
@@ -0,0 +1,155 @@
+"""
+메시지 콜드 아카이브
+
+messages 테이블이 끝없이 커지는 것(인덱스 팽창, VACUUM 시간)을 막기 위해
+비활성 대화 또는 N일 이상 갱신되지 않은 대화의 메시지를 MessageArchive 한 행
+(zlib 압축 JSON)으로 옮기고 messages에서는 삭제
+- 대화 요약 컬럼(message_count, last_message_*)은 그대로 두므로 목록 화면은 영향 없음
+- 대화를 열면(메시지 조회/추가) 원래 ID와 생성일시 그대로 messages로 복원
+- 검색 색인에서도 함께 빠지고, 복원 시 다시 색인
+- 복원한 대화는 다시 N일이 지나야 아카이브 대상이 됨 (열람할 때마다 오가지 않도록)
+"""
+
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Conversation, Message, MessageArchive
+from .search import index_messages, unindex_messages
+
+
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_COMPRESSION_LEVEL = 6
+RESTORE_BATCH_SIZE = 500
+
+
+class _ArchiveEncoder(DjangoJSONEncoder):
+    """
+    datetime을 마이크로초까지 보존
+    (DjangoJSONEncoder는 밀리초로 자르므로 복원 후 커서 페이지네이션 위치가 어긋남)
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _archived_fields():
+    """아카이브에 담는 컬럼 (conversation은 아카이브 행의 키)"""
+    return [field for field in Message._meta.concrete_fields if field.name != "conversation"]
+
+
+def archive_candidates(older_than_days=MESSAGE_ARCHIVE_AFTER_DAYS):
+    """아카이브 대상 대화 (비활성이거나 오래 갱신되지 않았고, 최근 복원되지 않은 대화)"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Conversation.objects.filter(
+        Q(is_active=False) | Q(updated_at__lt=cutoff),
+        Q(rehydrated_at__isnull=True) | Q(rehydrated_at__lt=cutoff),
+        archived_at__isnull=True,
+    )
+
+
+def archive_conversation(conversation_id):
+    """
+    대화의 메시지를 아카이브로 이동
+
+    Returns:
+        아카이브한 메시지 수 (이미 아카이브됐거나 메시지가 없으면 0)
+    """
+    fields = _archived_fields()
+    attnames = [field.attname for field in fields]
+
+    with transaction.atomic():
+        # 동시에 들어오는 메시지 저장/복원과 직렬화
+        conversation = Conversation.objects.select_for_update().get(pk=conversation_id)
+        if conversation.archived_at is not None:
+            return 0
+
+        messages = Message.objects.filter(conversation_id=conversation_id)
+        rows = list(messages.order_by("created_at", "id").values_list(*attnames))
+        if not rows:
+            return 0
+
+        raw = json.dumps(
+            {"fields": attnames, "rows": rows},
+            cls=_ArchiveEncoder,
+            ensure_ascii=False,
+        ).encode("utf-8")
+        MessageArchive.objects.create(
+            conversation_id=conversation_id,
+            payload=zlib.compress(raw, ARCHIVE_COMPRESSION_LEVEL),
+            message_count=len(rows),
+            raw_size=len(raw),
+        )
+        unindex_messages(row[attnames.index("id")] for row in rows)
+        messages.delete()
+        # update()라 updated_at(auto_now)은 바뀌지 않음
+        Conversation.objects.filter(pk=conversation_id).update(archived_at=timezone.now())
+
+    return len(rows)
+
+
+def rehydrate_conversation(conversation):
+    """
+    아카이브된 대화의 메시지를 messages로 복원 (아카이브되지 않았으면 아무것도 안 함)
+
+    Returns:
+        복원한 메시지 수
+    """
+    if conversation.archived_at is None:
+        return 0
+
+    restored = []
+    with transaction.atomic():
+        locked = Conversation.objects.select_for_update().get(pk=conversation.pk)
+        if locked.archived_at is not None:
+            archive = MessageArchive.objects.filter(pk=conversation.pk).first()
+            if archive is not None:
+                restored = _restore_messages(conversation.pk, archive)
+                index_messages(restored)
+                archive.delete()
+            locked.rehydrated_at = timezone.now()
+            Conversation.objects.filter(pk=conversation.pk).update(
+                archived_at=None, rehydrated_at=locked.rehydrated_at
+            )
+        # else: 다른 요청이 먼저 복원함
+
+    conversation.archived_at = None
+    conversation.rehydrated_at = locked.rehydrated_at
+    if restored:
+        print(f"[Message Archive] Rehydrated conversation {conversation.pk} ({len(restored)} messages)")
+    return len(restored)
+
+
+def _restore_messages(conversation_id, archive):
+    """아카이브 payload를 Message 행으로 되돌림 (원래 ID/생성일시 유지)"""
+    data = json.loads(zlib.decompress(bytes(archive.payload)))
+    by_attname = {field.attname: field for field in _archived_fields()}
+
+    messages = []
+    for row in data["rows"]:
+        values = {}
+        for attname, value in zip(data["fields"], row):
+            field = by_attname.get(attname)
+            if field is None:
+                # 아카이브 이후 삭제된 컬럼
+                continue
+            if isinstance(field, models.DateTimeField):
+                value = field.to_python(value)
+            values[attname] = value
+        messages.append(Message(conversation_id=conversation_id, **values))
+
+    created_at = [message.created_at for message in messages]
+    Message.objects.bulk_create(messages, batch_size=RESTORE_BATCH_SIZE)
+    # bulk_create는 auto_now_add로 created_at을 현재 시각으로 덮어쓰므로 원래 값으로 되돌림
+    for message, value in zip(messages, created_at):
+        message.created_at = value
+    Message.objects.bulk_update(messages, ["created_at"], batch_size=RESTORE_BATCH_SIZE)
+    return messages
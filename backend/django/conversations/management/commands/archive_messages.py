@@ -0,0 +1,64 @@
+"""
+메시지 콜드 아카이브 커맨드
+
+사용법:
+    python manage.py archive_messages [--days 90] [--limit 1000] [--dry-run]
+
+비활성 대화(is_active=False)나 --days일 이상 갱신되지 않은 대화의 메시지를
+압축해 message_archives로 옮기고 messages 테이블에서 삭제합니다.
+아카이브된 대화는 열람 시 자동으로 복원됩니다. (cron 등으로 주기 실행)
+"""
+
+from django.core.management.base import BaseCommand
+
+from conversations.archive import (
+    MESSAGE_ARCHIVE_AFTER_DAYS,
+    archive_candidates,
+    archive_conversation,
+)
+
+
+class Command(BaseCommand):
+    help = '오래되거나 비활성인 대화의 메시지를 압축 아카이브로 이동'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=MESSAGE_ARCHIVE_AFTER_DAYS,
+            help=f'마지막 갱신 후 경과 일수 기준 (기본 {MESSAGE_ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='이번 실행에서 처리할 최대 대화 수',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='대상 대화 수만 출력',
+        )
+
+    def handle(self, *args, **options):
+        candidates = archive_candidates(options['days']).order_by('updated_at').values_list('pk', flat=True)
+        if options['limit']:
+            candidates = candidates[:options['limit']]
+        ids = list(candidates)
+
+        if options['dry_run']:
+            self.stdout.write(f"[INFO] {len(ids)} conversations would be archived")
+            return
+
+        conversations = 0
+        messages = 0
+        for conversation_id in ids:
+            # 대화 하나씩 별도 트랜잭션 (긴 잠금 방지)
+            archived = archive_conversation(conversation_id)
+            if archived:
+                conversations += 1
+                messages += archived
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] Archived {messages} messages from {conversations} conversations"
+        ))
@@ -0,0 +1,86 @@
+"""
+대화 요약 컬럼 백필 커맨드
+
+사용법:
+    python manage.py backfill_conversation_summaries [--batch-size 500]
+
+messages 테이블에서 message_count, total_tokens, last_message_at,
+last_message_preview를 다시 계산해 conversations에 저장합니다.
+요약 컬럼 추가 전 데이터나 어긋난 값을 바로잡을 때 사용합니다.
+(메시지가 아카이브된 대화는 건너뜀)
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+
+from conversations.models import LAST_MESSAGE_PREVIEW_LENGTH, Conversation, Message
+
+
+class Command(BaseCommand):
+    help = '대화 요약 컬럼(메시지 수, 토큰, 마지막 메시지) 백필'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='한 트랜잭션에서 처리할 대화 수 (기본 500)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        # 아카이브된 대화는 messages에 행이 없으므로 기존 요약을 유지
+        ids = list(
+            Conversation.objects.filter(archived_at__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        updated = 0
+
+        for start in range(0, len(ids), batch_size):
+            updated += self.backfill_batch(ids[start:start + batch_size])
+            self.stdout.write(f"[INFO] {min(start + batch_size, len(ids))}/{len(ids)} conversations")
+
+        self.stdout.write(self.style.SUCCESS(f"[OK] Backfilled {updated} conversations"))
+
+    def backfill_batch(self, ids):
+        """대화 묶음 하나를 다시 계산 (행 잠금으로 동시 메시지 저장과 직렬화)"""
+        last_message = Message.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-created_at', '-id')
+
+        with transaction.atomic():
+            # 잠금 후 집계해야 백필 도중 들어온 메시지 증분이 덮어써지지 않음
+            ids = list(
+                Conversation.objects.select_for_update()
+                .filter(pk__in=ids, archived_at__isnull=True)
+                .values_list('pk', flat=True)
+            )
+
+            stats = {
+                row['conversation_id']: row
+                for row in Message.objects.filter(conversation_id__in=ids)
+                .values('conversation_id')
+                .annotate(count=Count('id'), tokens=Sum('token_usage'), last_at=Max('created_at'))
+                .order_by()
+            }
+            conversations = list(
+                Conversation.objects.filter(pk__in=ids)
+                .only('pk')
+                .annotate(last_content=Subquery(last_message.values('content')[:1]))
+            )
+
+            for conversation in conversations:
+                row = stats.get(conversation.pk, {})
+                conversation.message_count = row.get('count', 0)
+                conversation.total_tokens = row.get('tokens') or 0
+                conversation.last_message_at = row.get('last_at')
+                conversation.last_message_preview = (conversation.last_content or '')[:LAST_MESSAGE_PREVIEW_LENGTH]
+
+            # updated_at(auto_now)은 건드리지 않도록 bulk_update 사용
+            Conversation.objects.bulk_update(
+                conversations,
+                ['message_count', 'total_tokens', 'last_message_at', 'last_message_preview'],
+            )
+        return len(conversations)
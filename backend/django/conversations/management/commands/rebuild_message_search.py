@@ -0,0 +1,52 @@
+"""
+메시지 검색 색인 재구축 커맨드
+
+사용법:
+    python manage.py rebuild_message_search [--batch-size 1000]
+
+messages 테이블 전체를 ID 순으로 읽어 검색 색인(message_search)에 다시 넣습니다.
+색인 도입 전 메시지나 색인이 어긋났을 때 사용합니다. (새 메시지는 저장 시 자동 색인)
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from conversations.models import Message
+from conversations.search import index_messages, search_backend
+
+
+class Command(BaseCommand):
+    help = '메시지 검색 색인 재구축'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='한 트랜잭션에서 색인할 메시지 수 (기본 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if not search_backend():
+            self.stdout.write(self.style.WARNING("[WARN] Search index table not available, nothing to do"))
+            return
+
+        batch_size = max(1, options['batch_size'])
+        last_id = 0
+        indexed = 0
+        while True:
+            # OFFSET 없이 ID 기준으로 이어서 읽기
+            batch = list(
+                Message.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .only('pk', 'content')[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                index_messages(batch)
+            last_id = batch[-1].pk
+            indexed += len(batch)
+            self.stdout.write(f"[INFO] Indexed {indexed} messages")
+
+        self.stdout.write(self.style.SUCCESS(f"[OK] Rebuilt search index for {indexed} messages"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("conversations", "0004_remove_message_tokens_used_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "created_at", "id"],
+                name="messages_convers_5267e1_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="message",
+            name="messages_convers_3ebb41_idx",
+        ),
+    ]
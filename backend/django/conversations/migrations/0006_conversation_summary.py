@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("characters", "0007_character_response_cache_enabled"),
+        ("conversations", "0005_message_keyset_index"),
+        ("organizations", "0003_classroom_classrooms_organiz_787978_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="마지막 메시지 일시"
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message_preview",
+            field=models.CharField(
+                blank=True,
+                default="",
+                max_length=100,
+                verbose_name="마지막 메시지 미리보기",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="message_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="메시지 수"),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="total_tokens",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="총 토큰 사용량"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["user", "updated_at"], name="conversatio_user_id_41671b_idx"
+            ),
+        ),
+    ]
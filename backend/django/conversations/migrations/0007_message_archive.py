@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("conversations", "0006_conversation_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageArchive",
+            fields=[
+                (
+                    "conversation",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="message_archive",
+                        serialize=False,
+                        to="conversations.conversation",
+                        verbose_name="대화",
+                    ),
+                ),
+                ("payload", models.BinaryField(verbose_name="압축된 메시지")),
+                (
+                    "message_count",
+                    models.PositiveIntegerField(default=0, verbose_name="메시지 수"),
+                ),
+                (
+                    "raw_size",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="원본 크기(바이트)"
+                    ),
+                ),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="아카이브 일시"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "메시지 아카이브",
+                "verbose_name_plural": "메시지 아카이브",
+                "db_table": "message_archives",
+            },
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="archived_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="메시지 아카이브 일시"
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="rehydrated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="메시지 복원 일시"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:10
+
+from django.db import migrations
+
+
+# 메시지 검색 색인 (conversations/search.py)
+# - PostgreSQL: 글자 bigram tsvector + GIN
+# - SQLite: FTS5 가상 테이블 (FTS5가 없으면 만들지 않고 icontains로 동작)
+# 기존 메시지는 manage.py rebuild_message_search로 색인
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE IF NOT EXISTS message_search (
+        message_id bigint PRIMARY KEY REFERENCES messages (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS message_search_document_idx ON message_search USING GIN (document)",
+]
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_search "
+    "USING fts5(tokens, tokenize='unicode61 remove_diacritics 0')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        statements = POSTGRES_CREATE
+    elif connection.vendor == "sqlite":
+        statements = SQLITE_CREATE
+    else:
+        print(f"[Search] Message search index is not supported on {connection.vendor}")
+        return
+
+    try:
+        for statement in statements:
+            schema_editor.execute(statement)
+    except Exception as e:
+        if connection.vendor != "sqlite":
+            raise
+        print(f"[Search] FTS5 unavailable, message search falls back to icontains: {e}")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("postgresql", "sqlite"):
+        schema_editor.execute("DROP TABLE IF EXISTS message_search")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("conversations", "0007_message_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("conversations", "0008_message_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="client_id",
+            field=models.CharField(
+                blank=True,
+                help_text="메시지를 보낸 쪽에서 생성한 고유 ID",
+                max_length=64,
+                null=True,
+                verbose_name="클라이언트 메시지 ID",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("client_id__isnull", False)),
+                fields=("conversation", "client_id"),
+                name="message_unique_client_id",
+            ),
+        ),
+    ]
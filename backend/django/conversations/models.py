@@ -1,5 +1,11 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
 from django.conf import settings
+from django.utils import timezone
+
+
+# 대화 목록에 보여줄 마지막 메시지 미리보기 길이
+LAST_MESSAGE_PREVIEW_LENGTH = 100
 
 
 class Conversation(models.Model):
@@ -66,6 +72,43 @@ class Conversation(models.Model):
         verbose_name="수정일시"
     )
     
+    # 목록용 요약 (메시지 저장과 같은 트랜잭션에서 record_messages로 갱신)
+    message_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="메시지 수"
+    )
+    
+    total_tokens = models.PositiveIntegerField(
+        default=0,
+        verbose_name="총 토큰 사용량"
+    )
+    
+    last_message_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="마지막 메시지 일시"
+    )
+    
+    last_message_preview = models.CharField(
+        max_length=LAST_MESSAGE_PREVIEW_LENGTH,
+        blank=True,
+        default="",
+        verbose_name="마지막 메시지 미리보기"
+    )
+    
+    # 콜드 아카이브 (메시지는 MessageArchive에 압축 보관, 열람 시 복원)
+    archived_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="메시지 아카이브 일시"
+    )
+    
+    rehydrated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="메시지 복원 일시"
+    )
+    
     class Meta:
         db_table = "conversations"
         verbose_name = "대화"
@@ -73,10 +116,44 @@ class Conversation(models.Model):
         ordering = ["-updated_at"]
         indexes = [
             models.Index(fields=["user", "created_at"]),
+            # 사이드바 대화 목록 (사용자별 최근 갱신순)
+            models.Index(fields=["user", "updated_at"]),
             models.Index(fields=["classroom", "created_at"]),
             models.Index(fields=["character", "created_at"]),
         ]
     
+    @classmethod
+    def record_messages(cls, messages):
+        """
+        새로 저장한 메시지를 대화 요약 컬럼에 반영
+        - 메시지 INSERT와 같은 트랜잭션 안에서 호출
+        - 대화별 UPDATE 1회 (교착 방지를 위해 대화 ID 순서로)
+        - 카운터는 F() 증분이라 동시 저장에도 누락 없음
+        - 마지막 메시지는 기존 last_message_at 이후일 때만 교체
+        """
+        by_conversation = {}
+        for message in messages:
+            by_conversation.setdefault(message.conversation_id, []).append(message)
+        
+        now = timezone.now()
+        for conversation_id in sorted(by_conversation):
+            items = by_conversation[conversation_id]
+            last = max(items, key=lambda m: (m.created_at, m.pk or 0))
+            is_newer = Q(last_message_at__isnull=True) | Q(last_message_at__lte=last.created_at)
+            cls.objects.filter(pk=conversation_id).update(
+                message_count=F("message_count") + len(items),
+                total_tokens=F("total_tokens") + sum(m.token_usage or 0 for m in items),
+                last_message_at=Case(
+                    When(is_newer, then=Value(last.created_at)),
+                    default=F("last_message_at"),
+                ),
+                last_message_preview=Case(
+                    When(is_newer, then=Value(last.content[:LAST_MESSAGE_PREVIEW_LENGTH])),
+                    default=F("last_message_preview"),
+                ),
+                updated_at=now,
+            )
+    
     def __str__(self):
         return f"{self.user.username} - {self.character.name} ({self.created_at})"
 
@@ -180,6 +257,15 @@ class Message(models.Model):
         verbose_name="메타데이터"
     )
     
+    # 멱등 키 (FastAPI write-behind 재전송 시 같은 메시지를 다시 저장하지 않도록)
+    client_id = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        verbose_name="클라이언트 메시지 ID",
+        help_text="메시지를 보낸 쪽에서 생성한 고유 ID"
+    )
+    
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="생성일시"
@@ -191,9 +277,17 @@ class Message(models.Model):
         verbose_name_plural = "메시지"
         ordering = ["created_at"]
         indexes = [
-            models.Index(fields=["conversation", "created_at"]),
+            # 메시지 이력 커서 페이지네이션 (created_at 동률은 id로 구분)
+            models.Index(fields=["conversation", "created_at", "id"]),
             models.Index(fields=["role", "created_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["conversation", "client_id"],
+                condition=models.Q(client_id__isnull=False),
+                name="message_unique_client_id",
+            ),
+        ]
     
     def __str__(self):
         return f"{self.role}: {self.content[:50]}"
@@ -241,3 +335,45 @@ class ConversationReport(models.Model):
     
     def __str__(self):
         return f"Report for {self.conversation}"
+
+
+class MessageArchive(models.Model):
+    """
+    메시지 콜드 아카이브
+    - 비활성/오래된 대화의 메시지 행을 zlib 압축 JSON 하나로 보관 (messages 테이블과 인덱스 축소)
+    - 대화를 다시 열면 원래 ID/생성일시 그대로 messages로 복원 후 삭제
+    """
+    conversation = models.OneToOneField(
+        Conversation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="message_archive",
+        verbose_name="대화"
+    )
+    
+    payload = models.BinaryField(
+        verbose_name="압축된 메시지"
+    )
+    
+    message_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="메시지 수"
+    )
+    
+    raw_size = models.PositiveIntegerField(
+        default=0,
+        verbose_name="원본 크기(바이트)"
+    )
+    
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="아카이브 일시"
+    )
+    
+    class Meta:
+        db_table = "message_archives"
+        verbose_name = "메시지 아카이브"
+        verbose_name_plural = "메시지 아카이브"
+    
+    def __str__(self):
+        return f"Archive for {self.conversation_id} ({self.message_count})"
@@ -0,0 +1,84 @@
+"""
+메시지 이력 커서(keyset) 페이지네이션
+
+긴 대화에서 OFFSET 없이 (conversation_id, created_at, id) 인덱스만 타도록
+마지막으로 본 메시지의 (created_at, id)를 커서로 넘김
+- before 커서: 그보다 이전 메시지 (위로 스크롤하며 과거 이력 로드)
+- since 커서: 그보다 이후 메시지 (재접속/다른 탭에서 새 메시지만 증분 동기화)
+- 커서는 불투명 문자열 (base64url 인코딩한 "created_at|id")
+"""
+
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(message):
+    """메시지 위치를 커서 문자열로"""
+    raw = f"{message.created_at.isoformat()}|{message.pk}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    커서 문자열을 (created_at, id)로
+
+    Raises:
+        ValidationError: 형식이 잘못된 커서
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at_raw, pk_raw = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at_raw)
+        pk = int(pk_raw)
+    except (ValueError, UnicodeError, binascii.Error):
+        created_at = None
+    if created_at is None:
+        raise ValidationError({"detail": "잘못된 커서입니다."})
+    return created_at, pk
+
+
+def parse_page_size(value, name="page_size"):
+    """페이지 크기 파라미터 (기본 DEFAULT_PAGE_SIZE, 최대 MAX_PAGE_SIZE)"""
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    if not value.isdigit() or int(value) == 0:
+        raise ValidationError({"detail": f"{name}는 양의 정수여야 합니다."})
+    return min(int(value), MAX_PAGE_SIZE)
+
+
+def paginate_messages(queryset, before=None, since=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    메시지 한 페이지 조회 (결과는 항상 시간순)
+
+    - 커서 없음: 가장 최근 page_size개
+    - before: 커서보다 이전 메시지 중 가장 최근 page_size개
+    - since: 커서보다 이후 메시지를 오래된 순으로 page_size개
+
+    Returns:
+        (메시지 리스트, 이어서 받을 메시지가 더 있는지)
+    """
+    if since:
+        created_at, pk = decode_cursor(since)
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        ).order_by("created_at", "id")
+        page = list(queryset[:page_size + 1])
+        return page[:page_size], len(page) > page_size
+
+    if before:
+        created_at, pk = decode_cursor(before)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    page = list(queryset.order_by("-created_at", "-id")[:page_size + 1])
+    has_more = len(page) > page_size
+    return list(reversed(page[:page_size])), has_more
@@ -0,0 +1,156 @@
+"""
+메시지 전문 검색 (한국어 n-gram)
+
+한국어는 조사가 붙고 2글자 단어가 많아 형태소 분석 없이 쓸 수 있는
+글자 bigram 색인을 사용 ("광합성이" -> 광합 / 합성 / 성이)
+- PostgreSQL: message_search 테이블의 tsvector(GIN) - array_to_tsvector로 만들어 로케일 영향 없음
+- SQLite(개발): FTS5 가상 테이블 (FTS5가 없는 빌드면 icontains로 동작)
+- 메시지 저장과 같은 트랜잭션에서 index_messages로 색인 (아카이브 시 제거, 복원 시 재색인)
+- 색인으로 후보를 좁힌 뒤 단어별 icontains로 정확히 포함하는 메시지만 남김
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+
+SEARCH_TABLE = "message_search"
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_TERMS = 10
+SNIPPET_RADIUS = 40  # 검색어 앞뒤로 보여줄 글자 수
+
+POSTGRES = "postgresql"
+SQLITE = "sqlite"
+
+# 공백과 ASCII 문장부호를 단어 구분자로 (한글/한자 등은 그대로 단어 문자)
+_SEPARATORS = re.compile(r"[\s!-/:-@\[-`{-~]+")
+
+_backend = None
+
+
+def search_terms(text):
+    """검색/색인용 단어 목록 (NFKC 정규화 + 소문자)"""
+    normalized = unicodedata.normalize("NFKC", text or "").lower()
+    return [term for term in _SEPARATORS.split(normalized) if term]
+
+
+def ngram_tokens(text):
+    """색인 토큰 (단어별 글자 bigram, 1글자 단어는 제외, 중복 제거)"""
+    tokens = []
+    seen = set()
+    for term in search_terms(text):
+        for i in range(len(term) - 1):
+            token = term[i:i + 2]
+            if token not in seen:
+                seen.add(token)
+                tokens.append(token)
+    return tokens
+
+
+def search_backend():
+    """사용할 색인 백엔드 (색인 테이블이 없으면 None)"""
+    global _backend
+
+    if _backend is None:
+        vendor = connection.vendor
+        if vendor in (POSTGRES, SQLITE) and SEARCH_TABLE in connection.introspection.table_names():
+            _backend = vendor
+        else:
+            _backend = ""
+            print(f"[Search] Index table not available on {vendor}, using icontains")
+    return _backend or None
+
+
+def index_messages(messages):
+    """새 메시지 색인 (메시지 INSERT와 같은 트랜잭션에서 호출)"""
+    backend = search_backend()
+    rows = [(message.pk, ngram_tokens(message.content)) for message in messages if message.pk]
+    if not backend or not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if backend == POSTGRES:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (message_id, document) "
+                "VALUES (%s, array_to_tsvector(%s::text[])) "
+                "ON CONFLICT (message_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, tokens) VALUES (%s, %s)",
+                [(pk, " ".join(tokens)) for pk, tokens in rows],
+            )
+
+
+def unindex_messages(message_ids):
+    """색인에서 메시지 제거 (아카이브 시)"""
+    backend = search_backend()
+    message_ids = list(message_ids)
+    if not backend or not message_ids:
+        return
+
+    column = "message_id" if backend == POSTGRES else "rowid"
+    placeholders = ", ".join(["%s"] * len(message_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {column} IN ({placeholders})",
+            message_ids,
+        )
+
+
+def _index_filter(tokens):
+    """색인 후보 메시지 ID 서브쿼리"""
+    if search_backend() == POSTGRES:
+        # tsquery 캐스팅은 사전/파서를 거치지 않으므로 토큰을 그대로 비교
+        query = " & ".join("'" + token.replace("\\", "\\\\").replace("'", "''") + "'" for token in tokens)
+        return RawSQL(
+            f"SELECT message_id FROM {SEARCH_TABLE} WHERE document @@ %s::tsquery",
+            [query],
+        )
+    query = " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+    return RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+        [query],
+    )
+
+
+def search_messages(queryset, query):
+    """
+    메시지 검색 (queryset은 호출 측에서 권한 범위로 이미 제한)
+
+    Raises:
+        ValidationError: 검색어가 너무 짧거나 단어가 너무 많음
+    """
+    terms = search_terms(query)
+    if not terms or max(len(term) for term in terms) < MIN_QUERY_LENGTH:
+        raise ValidationError({"detail": f"검색어는 {MIN_QUERY_LENGTH}자 이상이어야 합니다."})
+    if len(terms) > MAX_QUERY_TERMS:
+        raise ValidationError({"detail": f"검색어는 단어 {MAX_QUERY_TERMS}개까지 가능합니다."})
+
+    if search_backend():
+        queryset = queryset.filter(pk__in=_index_filter(ngram_tokens(query)))
+    # bigram이 모두 있어도 붙어 있지 않을 수 있으므로 단어 단위로 다시 확인
+    condition = Q()
+    for term in terms:
+        condition &= Q(content__icontains=term)
+    return queryset.filter(condition)
+
+
+def snippet(content, query):
+    """첫 번째로 일치한 단어 주변 미리보기"""
+    lowered = unicodedata.normalize("NFKC", content).lower()
+    positions = [lowered.find(term) for term in search_terms(query)]
+    positions = [position for position in positions if position >= 0]
+    if not positions:
+        return content[:SNIPPET_RADIUS * 2]
+
+    start = max(0, min(positions) - SNIPPET_RADIUS)
+    end = min(len(content), min(positions) + SNIPPET_RADIUS)
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if end < len(content) else ""
+    return f"{prefix}{content[start:end]}{suffix}"
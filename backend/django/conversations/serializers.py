@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import Conversation, Message, ConversationReport
 from characters.models import Character
+from .search import snippet
 
 User = get_user_model()
 
@@ -25,6 +26,7 @@ class MessageSerializer(serializers.ModelSerializer):
             "error_code",
             "retry_count",
             "metadata",
+            "client_id",
             "created_at",
         ]
         read_only_fields = [
@@ -38,15 +40,78 @@ class MessageSerializer(serializers.ModelSerializer):
             "prompt_hash",
             "error_code",
             "retry_count",
+            "client_id",
             "created_at",
         ]
 
 
+class MessageCreateSerializer(MessageSerializer):
+    """
+    메시지 저장용 Serializer (add_message)
+    - FastAPI가 계산한 token_usage, model_version도 저장 (워커 토큰 요청만, 뷰에서 확인)
+    - client_id: 멱등 키 (선택)
+    """
+
+    class Meta(MessageSerializer.Meta):
+        read_only_fields = [
+            field for field in MessageSerializer.Meta.read_only_fields
+            if field not in ("token_usage", "model_version", "client_id")
+        ]
+
+
+class MessageBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    메시지 일괄 저장용 Serializer (bulk_add_messages)
+    - conversation은 ID로만 받고 권한 확인은 뷰에서 한 번에 처리
+    - token_usage, model_version은 워커 토큰 요청만 저장 (뷰에서 확인)
+    - client_id: 재전송 시 중복 저장 방지용 멱등 키 (선택)
+    """
+    conversation = serializers.IntegerField(source="conversation_id")
+
+    class Meta:
+        model = Message
+        fields = [
+            "conversation",
+            "role",
+            "content",
+            "token_usage",
+            "model_version",
+            "citations",
+            "metadata",
+            "client_id",
+        ]
+
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    """메시지 검색 결과 Serializer (내용 대신 검색어 주변 미리보기)"""
+    conversation_title = serializers.CharField(source="conversation.title", read_only=True)
+    character_name = serializers.CharField(source="conversation.character.name", read_only=True)
+    user_name = serializers.CharField(source="conversation.user.username", read_only=True)
+    snippet = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = [
+            "id",
+            "conversation",
+            "conversation_title",
+            "character_name",
+            "user_name",
+            "role",
+            "snippet",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+    def get_snippet(self, obj):
+        """검색어 주변 미리보기"""
+        return snippet(obj.content, self.context.get("query", ""))
+
+
 class ConversationListSerializer(serializers.ModelSerializer):
     """대화 목록용 간단한 Serializer"""
     character_name = serializers.CharField(source="character.name", read_only=True)
     user_name = serializers.CharField(source="user.username", read_only=True)
-    message_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
@@ -58,6 +123,9 @@ class ConversationListSerializer(serializers.ModelSerializer):
             "title",
             "subject",
             "message_count",
+            "total_tokens",
+            "last_message_at",
+            "last_message_preview",
             "is_active",
             "created_at",
             "updated_at",
@@ -67,18 +135,19 @@ class ConversationListSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "message_count",
+            "total_tokens",
+            "last_message_at",
+            "last_message_preview",
         ]
 
-    def get_message_count(self, obj):
-        """메시지 개수 반환"""
-        return obj.messages.count()
-
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
-    """대화 상세 조회용 Serializer"""
+    """
+    대화 상세 조회용 Serializer
+    - 메시지는 포함하지 않음 (messages 액션에서 커서 페이지 단위로 조회)
+    """
     character_name = serializers.CharField(source="character.name", read_only=True)
     user_name = serializers.CharField(source="user.username", read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
 
     class Meta:
         model = Conversation
@@ -93,7 +162,10 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
             "subject",
             "policy_snapshot_ref",
             "is_active",
-            "messages",
+            "message_count",
+            "total_tokens",
+            "last_message_at",
+            "last_message_preview",
             "created_at",
             "updated_at",
         ]
@@ -101,10 +173,24 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
             "id",
             "user",
             "character",
+            "message_count",
+            "total_tokens",
+            "last_message_at",
+            "last_message_preview",
             "created_at",
             "updated_at",
         ]
 
+    def update(self, instance, validated_data):
+        """
+        요청에 포함된 필드만 저장
+        (요약 컬럼/archived_at은 메시지 저장·아카이브가 동시에 갱신하므로 전체 save로 덮어쓰지 않음)
+        """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
 
 class ConversationCreateSerializer(serializers.ModelSerializer):
     """대화 생성용 Serializer"""
@@ -1,3 +1,545 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from characters.models import Character
+from organizations.models import Classroom, Organization
+from users.models import User
+
+from .archive import archive_conversation
+from .models import Conversation, Message
+from .pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from .views import BULK_MESSAGE_LIMIT, ConversationViewSet
+
+WORKER_TOKEN = "worker-secret"
+
+
+class BulkAddMessagesTests(TestCase):
+    """메시지 일괄 추가 (권한 + 배치 단위 검증)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw", role="student")
+        self.other = User.objects.create_user("other", password="pw", role="student")
+        character = Character.objects.create(name="캐릭터", owner=self.user)
+        self.conversation = Conversation.objects.create(user=self.user, character=character)
+        self.other_conversation = Conversation.objects.create(user=self.other, character=character)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _bulk(self, messages):
+        return self.api.post(
+            "/api/v1/conversations/bulk_add_messages/", {"messages": messages}, format="json"
+        )
+
+    def test_cannot_write_into_another_users_conversation(self):
+        for conversation_id in (self.other_conversation.pk, self.other_conversation.pk + 100):
+            response = self._bulk([
+                {"conversation": self.conversation.pk, "role": "user", "content": "내 메시지"},
+                {"conversation": conversation_id, "role": "user", "content": "남의 대화"},
+            ])
+            self.assertEqual(response.status_code, 403)
+
+        self.assertFalse(Message.objects.exists())
+        self.other_conversation.refresh_from_db()
+        self.assertEqual(self.other_conversation.message_count, 0)
+
+    def test_invalid_item_rejects_whole_batch(self):
+        response = self._bulk([
+            {"conversation": self.conversation.pk, "role": "user", "content": "정상"},
+            {"conversation": self.conversation.pk, "role": "robot", "content": "잘못된 역할"},
+            {"conversation": self.conversation.pk, "role": "assistant"},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        # 항목 번호별 오류 (정상 항목은 없음)
+        self.assertEqual(set(response.data), {1, 2})
+        self.assertIn("role", response.data[1])
+        self.assertIn("content", response.data[2])
+        self.assertFalse(Message.objects.exists())
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 0)
+
+    def test_retried_batch_is_not_stored_twice(self):
+        batch = [
+            {"conversation": self.conversation.pk, "role": "user", "content": "질문", "client_id": "m-1"},
+            {"conversation": self.conversation.pk, "role": "assistant", "content": "답변", "client_id": "m-2"},
+        ]
+        first = self._bulk(batch)
+        # 응답을 받지 못해 재전송 + 배치 안 반복 + 키 없는 메시지
+        retry = self._bulk(batch + [
+            batch[0],
+            {"conversation": self.conversation.pk, "role": "user", "content": "새 질문", "client_id": "m-3"},
+            {"conversation": self.conversation.pk, "role": "user", "content": "키 없음"},
+        ])
+
+        self.assertEqual((first.data["created"], first.data["duplicates"]), (2, 0))
+        self.assertEqual((retry.data["created"], retry.data["duplicates"]), (2, 3))
+        self.assertEqual(
+            list(Message.objects.order_by("id").values_list("content", flat=True)),
+            ["질문", "답변", "새 질문", "키 없음"],
+        )
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 4)
+
+    def test_rejects_malformed_body(self):
+        for body in (
+            [{"conversation": self.conversation.pk, "role": "user", "content": "목록만"}],
+            {"messages": {"conversation": self.conversation.pk}},
+            {"messages": "메시지"},
+            {},
+        ):
+            response = self.api.post("/api/v1/conversations/bulk_add_messages/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(Message.objects.exists())
+
+    def test_adds_to_archived_conversation_after_restoring(self):
+        self._bulk([{"conversation": self.conversation.pk, "role": "user", "content": "예전 메시지"}])
+        archive_conversation(self.conversation.pk)
+
+        response = self._bulk([{"conversation": self.conversation.pk, "role": "user", "content": "새 메시지"}])
+        self.assertEqual(response.status_code, 201)
+        response = self.api.post(
+            f"/api/v1/conversations/{self.conversation.pk}/add_message/",
+            {"role": "assistant", "content": "답변"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.conversation.refresh_from_db()
+        self.assertIsNone(self.conversation.archived_at)
+        self.assertEqual(
+            list(Message.objects.filter(conversation=self.conversation).order_by("id").values_list("content", flat=True)),
+            ["예전 메시지", "새 메시지", "답변"],
+        )
+
+    def test_batch_size_limit(self):
+        item = {"conversation": self.conversation.pk, "role": "user", "content": "메시지"}
+        response = self._bulk([item] * (BULK_MESSAGE_LIMIT + 1))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.exists())
+
+
+class MessagePaginationTests(TestCase):
+    """메시지 이력 커서 페이지네이션"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw", role="student")
+        character = Character.objects.create(name="캐릭터", owner=self.user)
+        self.conversation = Conversation.objects.create(user=self.user, character=character)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.url = f"/api/v1/conversations/{self.conversation.pk}/messages/"
+
+    def _create_messages(self, count, start=0):
+        return Message.objects.bulk_create([
+            Message(conversation=self.conversation, role="user", content=f"메시지 {i}")
+            for i in range(start, start + count)
+        ])
+
+    def _get(self, **params):
+        response = self.api.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_round_trip(self):
+        message = self._create_messages(1)[0]
+        message.refresh_from_db()
+        self.assertEqual(decode_cursor(encode_cursor(message)), (message.created_at, message.pk))
+
+    def test_before_pages_through_history_with_same_created_at(self):
+        self._create_messages(7)
+        # 같은 시각에 저장된 메시지도 id로 순서가 정해져 빠지거나 겹치지 않아야 함
+        Message.objects.filter(conversation=self.conversation).update(created_at=timezone.now())
+
+        pages = []
+        data = self._get(page_size=3)
+        pages.append(data["results"])
+        while data["previous"]:
+            data = self._get(page_size=3, before=data["previous"])
+            self.assertIsNone(data["next"])
+            pages.append(data["results"])
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        contents = [m["content"] for page in reversed(pages) for m in page]
+        self.assertEqual(contents, [f"메시지 {i}" for i in range(7)])
+
+    def test_since_returns_only_new_messages(self):
+        self._create_messages(3)
+        data = self._get()
+        self.assertIsNone(data["previous"])
+        self.assertFalse(data["has_more"])
+
+        self._create_messages(4, start=3)
+        synced = self._get(since=data["next"], page_size=3)
+        self.assertEqual([m["content"] for m in synced["results"]], ["메시지 3", "메시지 4", "메시지 5"])
+        self.assertTrue(synced["has_more"])
+        self.assertIsNone(synced["previous"])
+
+        rest = self._get(since=synced["next"], page_size=3)
+        self.assertEqual([m["content"] for m in rest["results"]], ["메시지 6"])
+        self.assertFalse(rest["has_more"])
+
+        # 새 메시지가 없으면 같은 커서를 유지
+        empty = self._get(since=rest["next"])
+        self.assertEqual(empty["results"], [])
+        self.assertEqual(empty["next"], rest["next"])
+
+    def test_rejects_bad_parameters(self):
+        message = self._create_messages(1)[0]
+        message.refresh_from_db()
+        cursor = encode_cursor(message)
+
+        for params in (
+            {"before": "not-a-cursor"},
+            {"since": "bm90LWEtY3Vyc29y"},  # "not-a-cursor"를 base64로
+            {"before": cursor, "since": cursor},
+            {"page_size": "0"},
+            {"limit": "ten"},
+        ):
+            response = self.api.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_legacy_limit_is_clamped(self):
+        self._create_messages(MAX_PAGE_SIZE + 5)
+
+        response = self.api.get(self.url, {"limit": "100000"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), MAX_PAGE_SIZE)
+        self.assertEqual(response.data[-1]["content"], f"메시지 {MAX_PAGE_SIZE + 4}")
+
+
+class ConversationListQueryCountTests(TestCase):
+    """대화 목록 쿼리 수 회귀 테스트 (행 수와 무관하게 일정해야 함)"""
+
+    def setUp(self):
+        self.student = User.objects.create_user("student", password="pw", role="student")
+        self.admin = User.objects.create_user(
+            "admin", password="pw", role="admin", is_staff=True, is_superuser=True
+        )
+        self.api = APIClient()
+
+    def _create_conversations(self, count, messages_per_conversation=3):
+        for i in range(count):
+            character = Character.objects.create(name=f"캐릭터 {i}", owner=self.admin)
+            conversation = Conversation.objects.create(user=self.student, character=character)
+            Conversation.record_messages(Message.objects.bulk_create([
+                Message(conversation=conversation, role="user", content=f"메시지 {j}")
+                for j in range(messages_per_conversation)
+            ]))
+
+    def _count_queries(self, func):
+        with CaptureQueriesContext(connection) as context:
+            response = func()
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_list_query_count(self):
+        self.api.force_authenticate(self.student)
+        self._create_conversations(2)
+        # 페이지네이션 COUNT 1회 + 목록 SELECT 1회
+        with self.assertNumQueries(2):
+            response = self.api.get("/api/v1/conversations/")
+        self.assertEqual([row["message_count"] for row in response.data["results"]], [3, 3])
+
+        self._create_conversations(8)
+        with self.assertNumQueries(2):
+            response = self.api.get("/api/v1/conversations/")
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertTrue(all(row["character_name"] for row in response.data["results"]))
+
+    def test_my_conversations_query_count(self):
+        self.api.force_authenticate(self.student)
+        self._create_conversations(2)
+        with self.assertNumQueries(1):
+            response = self.api.get("/api/v1/conversations/my_conversations/")
+        self.assertEqual(len(response.data), 2)
+
+        self._create_conversations(8)
+        with self.assertNumQueries(1):
+            response = self.api.get("/api/v1/conversations/my_conversations/")
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual({row["user_name"] for row in response.data}, {"student"})
+
+    # 테스트에서는 collectstatic 매니페스트가 없으므로 기본 정적 파일 저장소 사용
+    @override_settings(STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_admin_changelist_query_count(self):
+        self.client.force_login(self.admin)
+        url = "/admin/conversations/conversation/"
+
+        self._create_conversations(2)
+        small, _ = self._count_queries(lambda: self.client.get(url))
+
+        self._create_conversations(8)
+        large, response = self._count_queries(lambda: self.client.get(url))
+
+        self.assertEqual(small, large)
+        self.assertContains(response, "3 개")
+
+
+class ConversationSummaryTests(TestCase):
+    """대화 요약 컬럼 (메시지 저장 시 갱신 + 백필)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw", role="student")
+        character = Character.objects.create(name="캐릭터", owner=self.user)
+        self.conversation = Conversation.objects.create(user=self.user, character=character)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_add_message_updates_summary(self):
+        response = self.api.post(
+            f"/api/v1/conversations/{self.conversation.pk}/add_message/",
+            {"role": "user", "content": "광합성이 뭐야?" * 20},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 1)
+        self.assertEqual(len(self.conversation.last_message_preview), 100)
+        self.assertIsNotNone(self.conversation.last_message_at)
+
+    @override_settings(WORKER_SERVICE_TOKEN=WORKER_TOKEN)
+    def test_add_message_keeps_token_usage(self):
+        response = self.api.post(
+            f"/api/v1/conversations/{self.conversation.pk}/add_message/",
+            {"role": "assistant", "content": "답변", "token_usage": 57, "model_version": "gpt-4o-mini"},
+            format="json",
+            HTTP_X_WORKER_TOKEN=WORKER_TOKEN,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["token_usage"], 57)
+
+        message = Message.objects.get(pk=response.data["id"])
+        self.assertEqual(message.token_usage, 57)
+        self.assertEqual(message.model_version, "gpt-4o-mini")
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.total_tokens, 57)
+
+    @override_settings(WORKER_SERVICE_TOKEN=WORKER_TOKEN)
+    def test_user_token_cannot_set_token_usage(self):
+        data = {"role": "assistant", "content": "답변", "token_usage": 10**6, "model_version": "fake"}
+        single = self.api.post(
+            f"/api/v1/conversations/{self.conversation.pk}/add_message/", data, format="json",
+        )
+        bulk = self.api.post(
+            "/api/v1/conversations/bulk_add_messages/",
+            {"messages": [{"conversation": self.conversation.pk, **data}]},
+            format="json",
+            HTTP_X_WORKER_TOKEN="guess",
+        )
+        self.assertEqual((single.status_code, bulk.status_code), (201, 201))
+
+        self.assertEqual(
+            list(self.conversation.messages.values_list("token_usage", "model_version")),
+            [(0, None), (0, None)],
+        )
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.total_tokens, 0)
+
+    def test_add_message_is_idempotent_by_client_id(self):
+        url = f"/api/v1/conversations/{self.conversation.pk}/add_message/"
+        data = {"role": "user", "content": "질문", "client_id": "m-1"}
+
+        first = self.api.post(url, data, format="json")
+        second = self.api.post(url, data, format="json")
+
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(second.data["client_id"], "m-1")
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 1)
+
+    @override_settings(WORKER_SERVICE_TOKEN=WORKER_TOKEN)
+    def test_bulk_add_messages_updates_summary(self):
+        response = self.api.post(
+            "/api/v1/conversations/bulk_add_messages/",
+            {"messages": [
+                {"conversation": self.conversation.pk, "role": "user", "content": "질문"},
+                {"conversation": self.conversation.pk, "role": "assistant", "content": "답변", "token_usage": 42},
+            ]},
+            format="json",
+            HTTP_X_WORKER_TOKEN=WORKER_TOKEN,
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 2)
+        self.assertEqual(self.conversation.total_tokens, 42)
+        self.assertEqual(self.conversation.last_message_preview, "답변")
+
+    def test_updates_do_not_overwrite_summary(self):
+        # 메시지 저장/아카이브 전에 읽어 둔 대화 객체로 수정 요청이 처리되는 경우
+        stale = Conversation.objects.get(pk=self.conversation.pk)
+        Conversation.record_messages(Message.objects.bulk_create([
+            Message(conversation=self.conversation, role="user", content="질문", token_usage=5),
+        ]))
+        Conversation.objects.filter(pk=self.conversation.pk).update(archived_at=timezone.now())
+
+        with mock.patch.object(ConversationViewSet, "get_object", return_value=stale):
+            response = self.api.post(f"/api/v1/conversations/{self.conversation.pk}/toggle_active/")
+            self.assertEqual(response.status_code, 200)
+            response = self.api.patch(
+                f"/api/v1/conversations/{self.conversation.pk}/", {"title": "새 제목"}, format="json"
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.conversation.refresh_from_db()
+        self.assertFalse(self.conversation.is_active)
+        self.assertEqual(self.conversation.title, "새 제목")
+        self.assertEqual(self.conversation.message_count, 1)
+        self.assertEqual(self.conversation.total_tokens, 5)
+        self.assertEqual(self.conversation.last_message_preview, "질문")
+        self.assertIsNotNone(self.conversation.archived_at)
+
+    def test_backfill_recomputes_summary(self):
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, role="user", content="첫 메시지", token_usage=3),
+            Message(conversation=self.conversation, role="assistant", content="마지막 메시지", token_usage=7),
+        ])
+        updated_at = Conversation.objects.get(pk=self.conversation.pk).updated_at
+
+        call_command("backfill_conversation_summaries", batch_size=1, stdout=StringIO())
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 2)
+        self.assertEqual(self.conversation.total_tokens, 10)
+        self.assertEqual(self.conversation.last_message_preview, "마지막 메시지")
+        self.assertEqual(self.conversation.updated_at, updated_at)
+
+
+class MessageArchiveTests(TestCase):
+    """메시지 콜드 아카이브와 열람 시 복원"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw", role="student")
+        character = Character.objects.create(name="캐릭터", owner=self.user)
+        self.conversation = Conversation.objects.create(
+            user=self.user, character=character, is_active=False
+        )
+        self.messages = Message.objects.bulk_create([
+            Message(
+                conversation=self.conversation,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"메시지 {i}",
+                citations=[{"source": f"문서 {i}"}],
+                metadata={"turn": i},
+            )
+            for i in range(5)
+        ])
+        Conversation.record_messages(self.messages)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_archive_and_rehydrate_on_open(self):
+        original = list(
+            Message.objects.filter(conversation=self.conversation)
+            .order_by("id")
+            .values("id", "content", "created_at", "citations", "metadata")
+        )
+
+        call_command("archive_messages", stdout=StringIO())
+
+        self.conversation.refresh_from_db()
+        self.assertIsNotNone(self.conversation.archived_at)
+        self.assertFalse(Message.objects.filter(conversation=self.conversation).exists())
+        self.assertEqual(self.conversation.message_archive.message_count, 5)
+        # 목록용 요약은 유지
+        self.assertEqual(self.conversation.message_count, 5)
+
+        response = self.api.get(f"/api/v1/conversations/{self.conversation.pk}/messages/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m["content"] for m in response.data["results"]], [f"메시지 {i}" for i in range(5)])
+
+        restored = list(
+            Message.objects.filter(conversation=self.conversation)
+            .order_by("id")
+            .values("id", "content", "created_at", "citations", "metadata")
+        )
+        self.assertEqual(restored, original)
+        self.conversation.refresh_from_db()
+        self.assertIsNone(self.conversation.archived_at)
+        self.assertIsNotNone(self.conversation.rehydrated_at)
+
+        # 방금 복원한 대화는 다시 아카이브하지 않음
+        call_command("archive_messages", stdout=StringIO())
+        self.assertEqual(Message.objects.filter(conversation=self.conversation).count(), 5)
+
+    def test_active_recent_conversation_is_not_archived(self):
+        Conversation.objects.filter(pk=self.conversation.pk).update(is_active=True)
+
+        call_command("archive_messages", stdout=StringIO())
+
+        self.assertEqual(Message.objects.filter(conversation=self.conversation).count(), 5)
+
+
+class MessageSearchTests(TestCase):
+    """메시지 검색 (n-gram 색인 + 역할별 범위)"""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user("teacher", password="pw", role="teacher")
+        self.student = User.objects.create_user("student", password="pw", role="student")
+        self.other = User.objects.create_user("other", password="pw", role="student")
+        organization = Organization.objects.create(name="학교")
+        classroom = Classroom.objects.create(organization=organization, name="1반", teacher=self.teacher)
+        character = Character.objects.create(name="과학 선생님", owner=self.teacher)
+
+        self.conversation = Conversation.objects.create(
+            user=self.student, character=character, classroom=classroom, title="과학 질문"
+        )
+        self.other_conversation = Conversation.objects.create(user=self.other, character=character)
+        self.api = APIClient()
+
+    def _add(self, user, conversation, content):
+        self.api.force_authenticate(user)
+        response = self.api.post(
+            f"/api/v1/conversations/{conversation.pk}/add_message/",
+            {"role": "user", "content": content},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def _search(self, user, **params):
+        self.api.force_authenticate(user)
+        return self.api.get("/api/v1/conversations/search/", params)
+
+    def test_search_korean_substring(self):
+        self._add(self.student, self.conversation, "광합성이 뭐야?")
+        self._add(self.student, self.conversation, "합성 광물은 뭐야?")
+
+        response = self._search(self.student, q="광합성")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hit["snippet"] for hit in response.data["results"]], ["광합성이 뭐야?"])
+        self.assertEqual(response.data["results"][0]["character_name"], "과학 선생님")
+
+        # 2글자 단어도 검색
+        response = self._search(self.student, q="광물")
+        self.assertEqual(response.data["count"], 1)
+
+    def test_search_is_scoped_by_role(self):
+        self._add(self.student, self.conversation, "광합성 실험 보고서")
+        self._add(self.other, self.other_conversation, "광합성 숙제")
+
+        self.assertEqual(self._search(self.student, q="광합성").data["count"], 1)
+        self.assertEqual(self._search(self.other, q="광합성").data["count"], 1)
+        # 교사는 자기 학급 대화만
+        response = self._search(self.teacher, q="광합성")
+        self.assertEqual([hit["conversation"] for hit in response.data["results"]], [self.conversation.pk])
+
+    def test_search_validation_and_archive(self):
+        self._add(self.student, self.conversation, "광합성 실험 보고서")
+        self.assertEqual(self._search(self.student, q="광").status_code, 400)
+
+        archive_conversation(self.conversation.pk)
+        self.assertEqual(self._search(self.student, q="광합성").data["count"], 0)
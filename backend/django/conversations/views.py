@@ -2,18 +2,89 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import Q
-from django.utils import timezone
 
+from media.views import is_worker_request
+from .archive import rehydrate_conversation
 from .models import Conversation, Message, ConversationReport
+from .pagination import encode_cursor, paginate_messages, parse_page_size
+from .search import index_messages, search_messages
 from .serializers import (
     ConversationListSerializer,
     ConversationDetailSerializer,
     ConversationCreateSerializer,
     MessageSerializer,
+    MessageCreateSerializer,
+    MessageBulkCreateSerializer,
+    MessageSearchResultSerializer,
     ConversationReportSerializer,
 )
 
+# bulk_add_messages 한 번에 받을 수 있는 최대 메시지 수
+BULK_MESSAGE_LIMIT = 1000
+
+# 워커 서비스 토큰(X-Worker-Token)이 있는 요청에서만 저장하는 필드 (FastAPI가 계산)
+WORKER_ONLY_FIELDS = ("token_usage", "model_version")
+
+# 메시지 검색 필터 (쿼리 파라미터 -> 필드)
+SEARCH_FILTERS = {
+    "conversation": "conversation_id",
+    "character": "conversation__character_id",
+    "classroom": "conversation__classroom_id",
+    "user": "conversation__user_id",
+}
+
+
+def visible_conversations(user):
+    """사용자 역할에 따라 조회 가능한 대화 (목록/검색 공통)"""
+    if user.role == "admin":
+        # 관리자는 모든 대화 조회 가능
+        return Conversation.objects.all()
+    elif user.role == "teacher":
+        # 교사는 자신의 학급 대화 조회 가능
+        return Conversation.objects.filter(
+            Q(user=user) | Q(classroom__teacher=user)
+        )
+    # 학생은 본인 대화만
+    return Conversation.objects.filter(user=user)
+
+
+def _drop_worker_fields(request, items):
+    """워커 요청이 아니면 token_usage, model_version 값을 무시 (사용자 JWT로 사용량 조작 방지)"""
+    if is_worker_request(request):
+        return
+    for item in items:
+        for field in WORKER_ONLY_FIELDS:
+            item.pop(field, None)
+
+
+def _dedupe_by_client_id(items, conversation_ids):
+    """
+    이미 저장됐거나 배치 안에서 반복된 client_id 항목 제외
+    (대화 행을 잠근 트랜잭션 안에서 호출해야 동시 재전송에도 중복되지 않음)
+    """
+    for item in items:
+        item["client_id"] = item.get("client_id") or None
+    client_ids = {item["client_id"] for item in items if item["client_id"]}
+    seen = set()
+    if client_ids:
+        seen = set(
+            Message.objects.filter(
+                conversation_id__in=conversation_ids, client_id__in=client_ids
+            ).values_list("conversation_id", "client_id")
+        )
+    
+    fresh = []
+    for item in items:
+        key = (item["conversation_id"], item["client_id"])
+        if item["client_id"]:
+            if key in seen:
+                continue
+            seen.add(key)
+        fresh.append(item)
+    return fresh
+
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """대화 소유자 또는 관리자만 접근 가능"""
@@ -46,20 +117,22 @@ class ConversationViewSet(viewsets.ModelViewSet):
         return ConversationDetailSerializer
     
     def get_queryset(self):
-        """사용자 역할에 따른 필터링"""
-        user = self.request.user
+        """
+        사용자 역할에 따른 필터링
+        - 목록: ?q=검색어 (제목/주제/마지막 메시지)
+        """
+        queryset = visible_conversations(self.request.user)
         
-        if user.role == "admin":
-            # 관리자는 모든 대화 조회 가능
-            return Conversation.objects.all().order_by("-updated_at")
-        elif user.role == "teacher":
-            # 교사는 자신의 학급 대화 조회 가능
-            return Conversation.objects.filter(
-                Q(user=user) | Q(classroom__teacher=user)
-            ).order_by("-updated_at")
-        else:
-            # 학생은 본인 대화만
-            return Conversation.objects.filter(user=user).order_by("-updated_at")
+        query = self.request.query_params.get("q", "").strip()
+        if self.action == "list" and query:
+            queryset = queryset.filter(
+                Q(title__icontains=query)
+                | Q(subject__icontains=query)
+                | Q(last_message_preview__icontains=query)
+            )
+        
+        # character_name/user_name은 JOIN으로 함께 로드 (메시지 수 등은 요약 컬럼)
+        return queryset.select_related("character", "user").order_by("-updated_at")
     
     def perform_create(self, serializer):
         """대화 생성 시 사용자 자동 설정"""
@@ -70,17 +143,118 @@ class ConversationViewSet(viewsets.ModelViewSet):
         """현재 사용자의 모든 대화 조회"""
         conversations = Conversation.objects.filter(
             user=request.user
-        ).order_by("-updated_at")
+        ).select_related("character", "user").order_by("-updated_at")
         serializer = ConversationListSerializer(conversations, many=True)
         return Response(serializer.data)
     
+    def retrieve(self, request, *args, **kwargs):
+        """
+        대화 상세 조회 (메시지는 messages 액션으로 페이지 단위 조회)
+        - ?include_messages=true: 전체 메시지 포함 (이전 클라이언트 호환용)
+        """
+        conversation = self.get_object()
+        data = self.get_serializer(conversation).data
+        if request.query_params.get("include_messages") == "true":
+            rehydrate_conversation(conversation)
+            data["messages"] = MessageSerializer(
+                conversation.messages.order_by("created_at", "id"), many=True
+            ).data
+        return Response(data)
+    
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        메시지 검색 (조회 가능한 대화 범위 안에서, 최신순)
+        - ?q=검색어 (2자 이상, 공백으로 구분한 단어를 모두 포함)
+        - 필터: ?conversation=, ?character=, ?classroom=, ?user=, ?role=
+        - 아카이브된 대화의 메시지는 복원되기 전까지 검색되지 않음
+        """
+        query = request.query_params.get("q", "").strip()
+        messages = Message.objects.filter(
+            conversation__in=visible_conversations(request.user).values("pk")
+        )
+        
+        for param, field in SEARCH_FILTERS.items():
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            if not value.isdigit():
+                return Response(
+                    {"detail": f"{param}은 양의 정수여야 합니다."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            messages = messages.filter(**{field: int(value)})
+        role = request.query_params.get("role")
+        if role:
+            messages = messages.filter(role=role)
+        
+        messages = search_messages(messages, query).select_related(
+            "conversation__character", "conversation__user"
+        ).order_by("-created_at", "-id")
+        
+        page = self.paginate_queryset(messages)
+        serializer = MessageSearchResultSerializer(page, many=True, context={"query": query})
+        return self.get_paginated_response(serializer.data)
+    
     @action(detail=True, methods=["get"])
     def messages(self, request, pk=None):
-        """특정 대화의 메시지 목록 조회"""
+        """
+        특정 대화의 메시지 이력 조회 (커서 페이지네이션, 시간순)
+        - 기본: 가장 최근 page_size개
+        - ?before=<커서>: 그보다 이전 메시지 (과거 이력 더 보기)
+        - ?since=<커서>: 그 이후 새 메시지만 (증분 동기화)
+        - ?page_size=N: 페이지 크기 (기본 50, 최대 200)
+        - 응답: {"results", "previous": 이전 페이지 커서 또는 null,
+                 "next": 다음 since 요청에 쓸 커서 (before 요청에서는 null),
+                 "has_more": since 요청에서 새 메시지가 더 남았는지}
+        - ?limit=N: 최근 N개만 리스트로 (FastAPI 컨텍스트 구성용, 기존 형식, 최대 200)
+        - 아카이브된 대화는 먼저 복원
+        """
         conversation = self.get_object()
-        messages = conversation.messages.all().order_by("created_at")
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        rehydrate_conversation(conversation)
+        
+        limit = request.query_params.get("limit")
+        if limit:
+            # 페이지 크기와 같은 상한 (Character.context_length 최대 100턴 = 200개)
+            limit = parse_page_size(limit, "limit")
+            recent = conversation.messages.order_by("-created_at", "-id")[:limit]
+            serializer = MessageSerializer(reversed(recent), many=True)
+            return Response(serializer.data)
+        
+        before = request.query_params.get("before")
+        since = request.query_params.get("since")
+        if before and since:
+            return Response(
+                {"detail": "before와 since는 함께 사용할 수 없습니다."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page_size = parse_page_size(request.query_params.get("page_size"))
+        page, has_more = paginate_messages(
+            conversation.messages.all(), before=before, since=since, page_size=page_size
+        )
+        
+        if since:
+            # 증분 동기화: 과거 방향 커서는 필요 없음
+            previous = None
+            has_newer = has_more
+        else:
+            previous = encode_cursor(page[0]) if has_more else None
+            has_newer = False
+        
+        if before:
+            # 과거 페이지의 마지막 메시지는 최신이 아니므로 동기화 커서를 주지 않음
+            next_cursor = None
+        elif page:
+            next_cursor = encode_cursor(page[-1])
+        else:
+            next_cursor = since or None
+        
+        return Response({
+            "results": MessageSerializer(page, many=True).data,
+            "previous": previous,
+            "next": next_cursor,
+            "has_more": has_newer,
+        })
     
     @action(detail=True, methods=["post"])
     def add_message(self, request, pk=None):
@@ -91,22 +265,88 @@ class ConversationViewSet(viewsets.ModelViewSet):
         if conversation.user != request.user:
             raise PermissionDenied("이 대화에 메시지를 추가할 권한이 없습니다.")
         
-        serializer = MessageSerializer(data=request.data)
+        serializer = MessageCreateSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(conversation=conversation)
-            
-            # 대화 updated_at 갱신
-            conversation.save()
+            _drop_worker_fields(request, [serializer.validated_data])
+            # 복원, 메시지 저장, 대화 요약(updated_at 포함), 검색 색인을 한 트랜잭션으로
+            with transaction.atomic():
+                # 대화 행을 잠가 복원 후 저장 전에 아카이브 작업이 끼어들지 않게 함
+                conversation = Conversation.objects.select_for_update().get(pk=conversation.pk)
+                rehydrate_conversation(conversation)
+                client_id = serializer.validated_data.get("client_id") or None
+                existing = client_id and conversation.messages.filter(client_id=client_id).first()
+                if existing:
+                    # 같은 client_id 재전송: 저장된 메시지 반환
+                    return Response(MessageSerializer(existing).data, status=status.HTTP_200_OK)
+                message = serializer.save(conversation=conversation, client_id=client_id)
+                Conversation.record_messages([message])
+                index_messages([message])
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=["post"])
+    def bulk_add_messages(self, request):
+        """
+        여러 대화에 메시지 일괄 추가 (이력 가져오기, FastAPI write-behind 배치 저장용)
+        - body: {"messages": [{"conversation": 1, "role": "user", "content": "..."}, ...]}
+        - 본인 대화에만 추가 가능
+        - bulk_create 1회 + 대화별 요약 UPDATE 1회
+        - client_id가 같은 메시지가 이미 있으면 건너뜀 (재전송 멱등, 응답의 duplicates)
+        """
+        messages = request.data.get("messages") if isinstance(request.data, dict) else None
+        if not isinstance(messages, list):
+            return Response(
+                {"detail": "messages 목록이 필요합니다."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = MessageBulkCreateSerializer(
+            data=messages,
+            many=True,
+            max_length=BULK_MESSAGE_LIMIT,
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        _drop_worker_fields(request, serializer.validated_data)
+        conversation_ids = {item["conversation_id"] for item in serializer.validated_data}
+        # 복원, 메시지 저장, 대화 요약(updated_at 포함), 검색 색인을 한 트랜잭션으로
+        with transaction.atomic():
+            # 권한 확인 (대화 수와 관계없이 쿼리 1회) + 대화 행 잠금
+            # (복원 후 저장 전에 아카이브 작업이 끼어들지 않도록, 교착 방지를 위해 ID 순서로)
+            owned = list(
+                Conversation.objects.select_for_update().filter(
+                    pk__in=conversation_ids, user=request.user
+                ).only("pk", "archived_at").order_by("pk")
+            )
+            if {conversation.pk for conversation in owned} != conversation_ids:
+                raise PermissionDenied("이 대화에 메시지를 추가할 권한이 없습니다.")
+            
+            # 아카이브된 대화는 먼저 복원 (메시지가 아카이브와 테이블에 나뉘지 않도록)
+            for conversation in owned:
+                rehydrate_conversation(conversation)
+            
+            items = _dedupe_by_client_id(serializer.validated_data, conversation_ids)
+            messages = Message.objects.bulk_create([Message(**item) for item in items])
+            Conversation.record_messages(messages)
+            index_messages(messages)
+        
+        return Response(
+            {
+                "created": len(messages),
+                "ids": [message.pk for message in messages],
+                "duplicates": len(serializer.validated_data) - len(messages),
+            },
+            status=status.HTTP_201_CREATED
+        )
+    
     @action(detail=True, methods=["post"])
     def toggle_active(self, request, pk=None):
         """대화 활성화/비활성화 토글"""
         conversation = self.get_object()
         conversation.is_active = not conversation.is_active
-        conversation.save()
+        # 요약 컬럼/archived_at을 읽은 시점 값으로 덮어쓰지 않도록 바뀐 필드만 저장
+        conversation.save(update_fields=["is_active", "updated_at"])
         
         return Response({
             "message": "대화 상태가 변경되었습니다.",
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("media", "0004_alter_generationjob_options_alter_mediaasset_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="mediaasset",
+            name="sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="파일 무결성 검증 및 중복 제거용",
+                max_length=64,
+                null=True,
+                verbose_name="SHA256 해시",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("media", "0005_mediaasset_sha256_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="stage",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "시작 전"),
+                    ("generated", "이미지 생성됨"),
+                    ("uploaded", "스토리지 업로드됨"),
+                    ("recorded", "결과 기록됨"),
+                ],
+                default="",
+                max_length=20,
+                verbose_name="완료 단계",
+            ),
+        ),
+        migrations.AddField(
+            model_name="generationjob",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True, max_length=255, null=True, verbose_name="멱등성 키"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="generationjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key__isnull", False)),
+                fields=("user", "idempotency_key"),
+                name="generation_job_user_idempotency_key",
+            ),
+        ),
+    ]
@@ -89,8 +89,9 @@ class MediaAsset(models.Model):
         max_length=64,
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="SHA256 해시",
-        help_text="파일 무결성 검증용"
+        help_text="파일 무결성 검증 및 중복 제거용"
     )
     
     scanned_at = models.DateTimeField(
@@ -136,6 +137,22 @@ class GenerationJob(models.Model):
         ("image", "이미지 생성"),
         ("variation", "이미지 변형"),
     ]
+
+    # 완료된 단계 (재시도 시 마지막 완료 단계 다음부터 재개)
+    STAGE_CHOICES = [
+        ("", "시작 전"),
+        ("generated", "이미지 생성됨"),
+        ("uploaded", "스토리지 업로드됨"),
+        ("recorded", "결과 기록됨"),
+    ]
+
+    # 허용되는 상태 전이 (API 업데이트 기준, 재시도 액션은 failed/completed -> pending)
+    STATUS_TRANSITIONS = {
+        "pending": {"pending", "processing", "completed", "failed"},
+        "processing": {"processing", "completed", "failed"},
+        "completed": {"completed"},
+        "failed": {"failed"},
+    }
     
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -186,6 +203,23 @@ class GenerationJob(models.Model):
         verbose_name="오류 메시지"
     )
     
+    # 진행 단계 (워커가 재시도 시 이어서 처리할 지점)
+    stage = models.CharField(
+        max_length=20,
+        choices=STAGE_CHOICES,
+        default="",
+        blank=True,
+        verbose_name="완료 단계"
+    )
+
+    # 같은 요청의 중복 생성을 막기 위한 클라이언트 키 (사용자별 고유)
+    idempotency_key = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name="멱등성 키"
+    )
+
     # Celery 작업 ID
     celery_task_id = models.CharField(
         max_length=255,
@@ -223,10 +257,21 @@ class GenerationJob(models.Model):
         verbose_name = "생성 작업 기록"
         verbose_name_plural = "생성 작업 기록"
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="generation_job_user_idempotency_key",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_job_type_display()} - {self.get_status_display()}"
 
+    def can_transition(self, status):
+        """현재 상태에서 status로 변경 가능한지 여부"""
+        return status in self.STATUS_TRANSITIONS.get(self.status, set())
+
     def save(self, *args, **kwargs):
         """상태 변경 시 자동으로 started_at, completed_at 업데이트"""
         from django.utils import timezone
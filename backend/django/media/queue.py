@@ -0,0 +1,80 @@
+"""
+이미지 생성 작업 재큐잉
+
+재시도 API에서 FastAPI를 거치지 않고 Celery 브로커에 직접 작업을 넣음
+- 태스크 이름/큐/우선순위 규칙은 FastAPI(app/scheduler.py, app/celery_app.py)와 동일하게 유지
+- 워커는 작업의 완료 단계(stage)와 체크포인트를 보고 남은 단계부터 재개
+"""
+
+import os
+
+from django.conf import settings
+
+
+IMAGE_TASK_NAME = "tasks.generate_image_task"
+IMAGE_QUEUE = os.getenv("IMAGE_QUEUE", "images")
+IMAGE_PRIORITY_QUEUE = os.getenv("IMAGE_PRIORITY_QUEUE", "images.priority")
+PRIORITY_ROLES = {"teacher", "admin"}
+
+_celery_app = None
+
+
+class QueueUnavailable(Exception):
+    """브로커가 설정되지 않았거나 연결할 수 없음"""
+
+
+def get_celery_app():
+    """태스크 전송 전용 Celery 앱 (최초 사용 시 생성)"""
+    global _celery_app
+
+    if _celery_app is None:
+        if not settings.REDIS_URL:
+            raise QueueUnavailable("REDIS_URL is not configured")
+
+        from celery import Celery
+
+        app = Celery("django", broker=settings.REDIS_URL)
+        app.conf.broker_transport_options = {
+            "queue_order_strategy": "priority",
+            "priority_steps": list(range(10)),
+        }
+        _celery_app = app
+    return _celery_app
+
+
+def enqueue_generation_job(job, user_token):
+    """
+    생성 작업을 Celery 큐에 다시 넣음
+
+    Returns:
+        Celery 태스크 ID
+    """
+    user = job.user
+    role = user.role or "student"
+    input_data = job.input_data or {}
+    priority_lane = role in PRIORITY_ROLES
+
+    try:
+        result = get_celery_app().send_task(
+            IMAGE_TASK_NAME,
+            kwargs={
+                "prompt": input_data.get("prompt", ""),
+                "size": input_data.get("size", "1024x1024"),
+                "quality": input_data.get("quality", "standard"),
+                "job_id": job.id,
+                "user_id": user.id,
+                "user_token": user_token,
+                "tenant": {
+                    "user_id": user.id,
+                    "organization_id": user.organization_id,
+                    "role": role,
+                },
+            },
+            queue=IMAGE_PRIORITY_QUEUE if priority_lane else IMAGE_QUEUE,
+            priority=0 if priority_lane else 1,
+        )
+    except QueueUnavailable:
+        raise
+    except Exception as e:
+        raise QueueUnavailable(str(e)) from e
+    return result.id
@@ -1,3 +1,238 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from .models import GenerationJob, MediaAsset
+
+
+WORKER_TOKEN = "worker-secret"
+
+
+@override_settings(WORKER_SERVICE_TOKEN=WORKER_TOKEN)
+class GenerationResultMediaTests(TestCase):
+    """작업 완료 시 MediaAsset 연결 (워커 토큰 + 소유자 범위)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw", role="student")
+        self.other = User.objects.create_user("other", password="pw", role="student")
+        self.other_asset = MediaAsset.objects.create(
+            user=self.other,
+            storage_path="generated/other/cat.png",
+            file_name="cat.png",
+            mime_type="image/png",
+            file_size=2048,
+            asset_type="generated",
+            sha256="a" * 64,
+        )
+        self.job = GenerationJob.objects.create(
+            user=self.user,
+            job_type="image",
+            status="processing",
+            input_data={"prompt": "cat"},
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user, token="user-jwt")
+
+    def _complete(self, asset, **headers):
+        return self.api.patch(
+            f"/api/v1/generation-jobs/{self.job.pk}/",
+            {
+                "status": "completed",
+                "result_data": {"url": "https://storage/cat.png", "asset": asset},
+            },
+            format="json",
+            **headers,
+        )
+
+    def test_user_patch_cannot_attach_asset(self):
+        response = self._complete({
+            "storage_path": "generated/student/cat.png",
+            "sha256": "a" * 64,
+            "file_size": 1,
+        })
+        self.assertEqual(response.status_code, 200)
+
+        self.job.refresh_from_db()
+        self.assertIsNone(self.job.result_media)
+        self.assertNotIn("asset", self.job.result_data)
+        self.assertEqual(MediaAsset.objects.count(), 1)
+
+    def test_worker_does_not_reuse_another_users_asset(self):
+        response = self._complete(
+            {
+                "storage_path": "generated/student/cat.png",
+                "sha256": "a" * 64,
+                "file_size": 4096,
+                "width": 1024,
+                "height": 1024,
+            },
+            HTTP_X_WORKER_TOKEN=WORKER_TOKEN,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.job.refresh_from_db()
+        self.assertIsNotNone(self.job.result_media)
+        self.assertNotEqual(self.job.result_media_id, self.other_asset.pk)
+        self.assertEqual(self.job.result_media.user, self.user)
+        self.assertEqual(self.job.result_media.file_size, 4096)
+
+    def test_worker_reuses_own_asset_by_hash(self):
+        own = MediaAsset.objects.create(
+            user=self.user,
+            storage_path="generated/student/old.png",
+            file_name="old.png",
+            mime_type="image/png",
+            file_size=2048,
+            asset_type="generated",
+            sha256="b" * 64,
+        )
+        self._complete(
+            {"storage_path": "generated/student/new.png", "sha256": "b" * 64},
+            HTTP_X_WORKER_TOKEN=WORKER_TOKEN,
+        )
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.result_media_id, own.pk)
+
+    def test_wrong_worker_token_is_treated_as_user(self):
+        self._complete(
+            {"storage_path": "generated/student/cat.png", "sha256": "c" * 64},
+            HTTP_X_WORKER_TOKEN="guess",
+        )
+
+        self.job.refresh_from_db()
+        self.assertIsNone(self.job.result_media)
+
+
+class GenerationJobStateTests(TestCase):
+    """생성 작업 상태 전이, 멱등 생성, 재시도 재큐잉"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("teacher", password="pw", role="teacher")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user, token="user-jwt")
+
+    def _job(self, **fields):
+        defaults = {"user": self.user, "job_type": "image", "input_data": {"prompt": "cat"}}
+        return GenerationJob.objects.create(**{**defaults, **fields})
+
+    def _patch(self, job, data):
+        return self.api.patch(f"/api/v1/generation-jobs/{job.pk}/", data, format="json")
+
+    def test_status_transitions(self):
+        job = self._job(status="pending")
+        self.assertTrue(job.can_transition("processing"))
+        self.assertTrue(job.can_transition("failed"))
+
+        for status, allowed in [
+            ("processing", {"processing", "completed", "failed"}),
+            ("completed", {"completed"}),
+            ("failed", {"failed"}),
+        ]:
+            job.status = status
+            for target in ("pending", "processing", "completed", "failed"):
+                self.assertEqual(job.can_transition(target), target in allowed, f"{status} -> {target}")
+
+    def test_late_processing_update_cannot_reopen_completed_job(self):
+        job = self._job(status="processing")
+        self.assertEqual(self._patch(job, {"status": "completed"}).status_code, 200)
+
+        response = self._patch(job, {"status": "processing"})
+        self.assertEqual(response.status_code, 400)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+
+    def test_idempotency_key_replays_existing_job(self):
+        data = {"job_type": "image", "input_data": {"prompt": "cat"}, "idempotency_key": "req-1"}
+
+        first = self.api.post("/api/v1/generation-jobs/", data, format="json")
+        second = self.api.post("/api/v1/generation-jobs/", data, format="json")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    def test_idempotency_key_race_returns_winner(self):
+        winner = self._job(status="pending", idempotency_key="req-1")
+        original_first = QuerySet.first
+        calls = []
+
+        def first(queryset):
+            # 사전 조회는 놓치고 INSERT에서 유니크 제약에 걸리는 동시 요청 재현
+            calls.append(queryset)
+            return None if len(calls) == 1 else original_first(queryset)
+
+        with mock.patch.object(QuerySet, "first", first):
+            response = self.api.post(
+                "/api/v1/generation-jobs/",
+                {"job_type": "image", "input_data": {"prompt": "cat"}, "idempotency_key": "req-1"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], winner.pk)
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    def test_retry_failed_job_resumes_from_checkpoint(self):
+        checkpoint = {"stage": "generated", "image_url": "https://dalle/tmp.png"}
+        job = self._job(
+            status="failed",
+            stage="generated",
+            attempts=1,
+            error_message="Supabase upload failed",
+            result_data={"checkpoint": checkpoint},
+        )
+
+        with mock.patch("media.queue.get_celery_app") as get_app:
+            get_app.return_value.send_task.return_value = mock.Mock(id="task-2")
+            response = self.api.post(f"/api/v1/generation-jobs/{job.pk}/retry/")
+
+        self.assertEqual(response.status_code, 200)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.stage, "generated")
+        self.assertEqual(job.result_data, {"checkpoint": checkpoint})
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.celery_task_id, "task-2")
+        self.assertIsNone(job.error_message)
+
+        args, kwargs = get_app.return_value.send_task.call_args
+        self.assertEqual(args, ("tasks.generate_image_task",))
+        self.assertEqual(kwargs["kwargs"]["job_id"], job.pk)
+        self.assertEqual(kwargs["kwargs"]["user_token"], "user-jwt")
+        # 교사는 우선순위 레인
+        self.assertEqual(kwargs["queue"], "images.priority")
+        self.assertEqual(kwargs["priority"], 0)
+
+    def test_retry_completed_job_starts_over(self):
+        job = self._job(status="completed", stage="recorded", result_data={"url": "https://storage/cat.png"})
+
+        with mock.patch("media.queue.get_celery_app") as get_app:
+            get_app.return_value.send_task.return_value = mock.Mock(id="task-3")
+            self.api.post(f"/api/v1/generation-jobs/{job.pk}/retry/")
+
+        job.refresh_from_db()
+        self.assertEqual(job.stage, "")
+        self.assertEqual(job.result_data, {})
+        self.assertIsNone(job.result_media)
+
+    @override_settings(REDIS_URL="")
+    def test_retry_without_broker_returns_503(self):
+        job = self._job(status="failed")
+
+        with mock.patch("media.queue._celery_app", None):
+            response = self.api.post(f"/api/v1/generation-jobs/{job.pk}/retry/")
+
+        self.assertEqual(response.status_code, 503)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_retry_rejects_running_job(self):
+        job = self._job(status="processing")
+        response = self.api.post(f"/api/v1/generation-jobs/{job.pk}/retry/")
+        self.assertEqual(response.status_code, 400)
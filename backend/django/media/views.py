@@ -1,12 +1,27 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
 
 from .models import MediaAsset, GenerationJob
+from .queue import QueueUnavailable, enqueue_generation_job
+
+
+WORKER_TOKEN_HEADER = "HTTP_X_WORKER_TOKEN"
+
+
+def is_worker_request(request):
+    """워커 서비스 토큰(X-Worker-Token)으로 인증된 요청인지"""
+    token = settings.WORKER_SERVICE_TOKEN
+    provided = request.META.get(WORKER_TOKEN_HEADER, "")
+    return bool(token) and hmac.compare_digest(provided.encode(), token.encode())
 
 
 class MediaAssetSerializer(serializers.ModelSerializer):
@@ -62,6 +77,8 @@ class GenerationJobSerializer(serializers.ModelSerializer):
             "result_data",
             "result_media",
             "error_message",
+            "stage",
+            "idempotency_key",
             "celery_task_id",
             "attempts",
             "created_at",
@@ -71,12 +88,15 @@ class GenerationJobSerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
             "user",
+            "idempotency_key",
             "created_at",
         ]
 
 
 class GenerationJobCreateSerializer(serializers.ModelSerializer):
-    """생성 작업 생성용 Serializer"""
+    """생성 작업 생성용 Serializer (역할/조직은 FastAPI 공정 스케줄링에 사용)"""
+    user_role = serializers.CharField(source="user.role", read_only=True)
+    organization = serializers.IntegerField(source="user.organization_id", read_only=True)
 
     class Meta:
         model = GenerationJob
@@ -84,12 +104,21 @@ class GenerationJobCreateSerializer(serializers.ModelSerializer):
             "id",
             "job_type",
             "input_data",
+            "idempotency_key",
             "status",
+            "stage",
+            "result_data",
+            "celery_task_id",
+            "user_role",
+            "organization",
             "created_at",
         ]
         read_only_fields = [
             "id",
             "status",
+            "stage",
+            "result_data",
+            "celery_task_id",
             "created_at",
         ]
 
@@ -146,6 +175,26 @@ class GenerationJobViewSet(viewsets.ModelViewSet):
             return GenerationJob.objects.all().order_by("-created_at")
         else:
             return GenerationJob.objects.filter(user=user).order_by("-created_at")
+
+    def create(self, request, *args, **kwargs):
+        """작업 생성 (같은 idempotency_key로 다시 요청하면 기존 작업 반환)"""
+        key = request.data.get("idempotency_key")
+        if key:
+            existing = GenerationJob.objects.filter(user=request.user, idempotency_key=key).first()
+            if existing:
+                serializer = self.get_serializer(existing)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except IntegrityError:
+            # 동시에 들어온 같은 키의 요청이 먼저 생성한 경우
+            existing = GenerationJob.objects.filter(user=request.user, idempotency_key=key).first()
+            if not key or existing is None:
+                raise
+            serializer = self.get_serializer(existing)
+            return Response(serializer.data, status=status.HTTP_200_OK)
     
     def perform_create(self, serializer):
         """작업 생성 시 사용자 자동 설정"""
@@ -170,6 +219,12 @@ class GenerationJobViewSet(viewsets.ModelViewSet):
         update_fields = {}
         
         logger.info(f"[GenerationJob] Updating job {instance.id}: {instance.status} -> {status}")
+
+        # 상태 전이 검증 (늦게 도착한 processing 업데이트가 완료된 작업을 덮어쓰지 않도록)
+        if status and not instance.can_transition(status):
+            raise ValidationError(
+                {"status": f"'{instance.status}'에서 '{status}'(으)로 변경할 수 없습니다."}
+            )
         
         # processing으로 변경될 때 started_at 설정
         if status == "processing" and not instance.started_at:
@@ -181,8 +236,57 @@ class GenerationJobViewSet(viewsets.ModelViewSet):
             update_fields["completed_at"] = timezone.now()
             logger.info(f"[GenerationJob] Setting completed_at for job {instance.id}")
         
-        serializer.save(**update_fields)
+        # 업로드 메타데이터는 워커만 기록 가능 (사용자가 임의 해시/크기로 자산을 연결하지 못하도록)
+        worker = is_worker_request(self.request)
+        result_data = serializer.validated_data.get("result_data")
+        if not worker and isinstance(result_data, dict) and "asset" in result_data:
+            serializer.validated_data["result_data"] = {
+                key: value for key, value in result_data.items() if key != "asset"
+            }
+        
+        job = serializer.save(**update_fields)
+
+        # 스토리지 업로드 결과가 있으면 MediaAsset 생성 후 연결
+        asset = (job.result_data or {}).get("asset")
+        if worker and status == "completed" and asset and job.result_media_id is None:
+            job.result_media = self._create_result_media(job, asset)
+            if job.result_media is not None:
+                job.save(update_fields=["result_media"])
+
         logger.info(f"[GenerationJob] Job {instance.id} updated successfully")
+
+    def _create_result_media(self, job, asset):
+        """
+        워커가 업로드하며 계산한 메타데이터로 MediaAsset 생성
+        - 같은 내용(sha256)/경로의 자산은 작업 소유자의 것일 때만 재사용
+        """
+        owned = MediaAsset.objects.filter(user=job.user)
+        if asset.get("sha256"):
+            existing = owned.filter(sha256=asset["sha256"]).order_by("id").first()
+            if existing:
+                return existing
+
+        existing = MediaAsset.objects.filter(storage_path=asset["storage_path"]).first()
+        if existing is not None:
+            if existing.user_id != job.user_id:
+                print(f"[GenerationJob] Job {job.id}: storage path belongs to another user, not linking")
+                return None
+            return existing
+
+        return MediaAsset.objects.create(
+            storage_path=asset["storage_path"],
+            user=job.user,
+            organization=job.user.organization,
+            file_name=asset.get("file_name") or asset["storage_path"].rsplit("/", 1)[-1],
+            mime_type=asset.get("mime_type") or "image/png",
+            file_size=asset.get("file_size") or 0,
+            width=asset.get("width"),
+            height=asset.get("height"),
+            sha256=asset.get("sha256"),
+            asset_type="generated",
+            generation_prompt=(job.input_data or {}).get("prompt"),
+            metadata={"url": job.result_data.get("url")},
+        )
     
     @action(detail=False, methods=["get"])
     def my_jobs(self, request):
@@ -205,13 +309,28 @@ class GenerationJobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 재시도 로직
+        # 완료된 작업은 새로 생성, 실패한 작업은 마지막으로 완료된 단계부터 재개
+        if job.status == "completed":
+            job.stage = ""
+            job.result_data = {}
+            job.result_media = None
         job.status = "pending"
         job.attempts += 1
         job.error_message = None
+        job.completed_at = None
         job.save()
-        
-        # TODO: FastAPI 호출 또는 Celery 작업 재트리거
-        
+
+        try:
+            job.celery_task_id = enqueue_generation_job(job, str(request.auth))
+        except QueueUnavailable as e:
+            job.status = "failed"
+            job.error_message = f"작업 큐에 추가하지 못했습니다: {e}"
+            job.save(update_fields=["status", "error_message", "completed_at"])
+            return Response(
+                {"detail": job.error_message},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        job.save(update_fields=["celery_task_id"])
+
         serializer = self.get_serializer(job)
         return Response(serializer.data)
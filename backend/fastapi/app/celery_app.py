@@ -6,10 +6,17 @@ Redis를 Broker로 사용하여 비동기 작업 처리
 
 import os
 from celery import Celery
+from kombu import Queue
+
+from .scheduler import IMAGE_QUEUE, IMAGE_PRIORITY_QUEUE, PRIORITY_LEVELS
 
 # Redis URL
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# 워커 풀: 태스크는 워커 이벤트 루프에서 I/O를 기다리므로 스레드 풀로 동시 작업 수를 늘림
+CELERY_WORKER_POOL = os.getenv("CELERY_WORKER_POOL", "threads")
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "32"))
+
 # Celery 애플리케이션 생성
 celery_app = Celery(
     "fastapi_app",
@@ -29,6 +36,19 @@ celery_app.conf.update(
     # 작업 타임아웃 (15분)
     task_soft_time_limit=900,
     task_time_limit=1200,
+    # 워커 풀 / 동시 작업 수 (CLI의 --pool, --concurrency로 덮어쓸 수 있음)
+    worker_pool=CELERY_WORKER_POOL,
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
+    # 이미지 작업 큐: 학생 레인 / 교사 레인 (워커는 두 큐를 모두 소비)
+    task_queues=[Queue(IMAGE_QUEUE), Queue(IMAGE_PRIORITY_QUEUE)],
+    task_default_queue=IMAGE_QUEUE,
+    # Redis 메시지 우선순위 0(가장 높음)~9를 모두 구분
+    broker_transport_options={
+        "queue_order_strategy": "priority",
+        "priority_steps": list(range(PRIORITY_LEVELS)),
+    },
+    # 미리 가져오는 메시지를 줄여 우선순위 순서가 유지되도록 함
+    worker_prefetch_multiplier=1,
 )
 
 print(f"[Celery] Broker: {REDIS_URL[:50]}...")
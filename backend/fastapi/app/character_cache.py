@@ -0,0 +1,183 @@
+"""
+캐릭터 정보 캐시
+
+채팅 턴마다 Django에서 캐릭터(system_prompt, creativity 등)를 다시 조회하지 않도록
+프로세스 내 LRU + TTL 캐시를 두고, Redis가 있으면 2차 캐시로 사용
+
+- 항목은 캐릭터 버전 스탬프(version + updated_at)와 함께 저장
+- Django가 Character를 저장하면 Redis 채널로 무효화 메시지를 발행
+  -> 모든 FastAPI 인스턴스가 구독하여 로컬 항목 제거
+- Redis가 없으면 TTL 만료로만 갱신됨
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .redis_client import get_async_redis
+
+
+CHARACTER_CACHE_SIZE = int(os.getenv("CHARACTER_CACHE_SIZE", "1000"))
+CHARACTER_CACHE_TTL = float(os.getenv("CHARACTER_CACHE_TTL", "300"))  # 초
+
+# Django characters/signals.py 와 동일한 값이어야 함
+CHARACTER_CACHE_KEY = "character:{id}"
+CHARACTER_INVALIDATE_CHANNEL = "character:invalidate"
+
+
+def character_stamp(data: Dict[str, Any]) -> str:
+    """캐릭터 버전 스탬프 (version + updated_at)"""
+    return f"{data.get('version', '')}:{data.get('updated_at', '')}"
+
+
+class CharacterCache:
+    """캐릭터 LRU + TTL 캐시 (선택적 Redis 백업)"""
+
+    def __init__(self, maxsize: int = CHARACTER_CACHE_SIZE, ttl: float = CHARACTER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # character_id -> (expires_at, stamp, data)
+        self._entries: "OrderedDict[int, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+
+        # 메트릭
+        self._hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    async def get(
+        self,
+        character_id: int,
+        loader: Callable[[int], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """캐시 조회, 없으면 loader로 가져와 저장"""
+        entry = self._entries.get(character_id)
+        if entry is not None:
+            expires_at, _, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(character_id)
+                self._hits += 1
+                return data
+            del self._entries[character_id]
+
+        data = await self._redis_get(character_id)
+        if data is not None:
+            self._redis_hits += 1
+            self._store(character_id, data)
+            return data
+
+        self._misses += 1
+        data = await loader(character_id)
+        if data is not None:
+            self._store(character_id, data)
+            await self._redis_set(character_id, data)
+        return data
+
+    def invalidate(self, character_id: int, stamp: Optional[str] = None) -> None:
+        """
+        로컬 항목 제거
+
+        stamp가 주어지면 이미 같은 버전을 들고 있는 경우 유지
+        """
+        entry = self._entries.get(character_id)
+        if entry is None:
+            return
+        if stamp is not None and entry[1] == stamp:
+            return
+        del self._entries[character_id]
+        self._invalidations += 1
+
+    def _store(self, character_id: int, data: Dict[str, Any]) -> None:
+        self._entries[character_id] = (time.monotonic() + self.ttl, character_stamp(data), data)
+        self._entries.move_to_end(character_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _redis_get(self, character_id: int) -> Optional[Dict[str, Any]]:
+        redis = get_async_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(CHARACTER_CACHE_KEY.format(id=character_id))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"[Character Cache] Redis get failed: {e}")
+            return None
+
+    async def _redis_set(self, character_id: int, data: Dict[str, Any]) -> None:
+        redis = get_async_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                CHARACTER_CACHE_KEY.format(id=character_id),
+                json.dumps(data),
+                ex=int(self.ttl),
+            )
+        except Exception as e:
+            print(f"[Character Cache] Redis set failed: {e}")
+
+    # ==================== 무효화 구독 ====================
+
+    async def start(self) -> None:
+        """Redis 무효화 채널 구독 시작 (lifespan 시작 시 호출)"""
+        if self._listener is None and get_async_redis() is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """구독 종료 (lifespan 종료 시 호출)"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_async_redis().pubsub()
+                await pubsub.subscribe(CHARACTER_INVALIDATE_CHANNEL)
+                print(f"[Character Cache] Subscribed to {CHARACTER_INVALIDATE_CHANNEL}")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    payload = json.loads(message["data"])
+                    self.invalidate(int(payload["id"]), payload.get("stamp"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Character Cache] Invalidation listener error: {e}")
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def metrics(self) -> Dict[str, Any]:
+        """캐시 메트릭"""
+        lookups = self._hits + self._redis_hits + self._misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._hits + self._redis_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self._invalidations,
+            "listening": self._listener is not None,
+        }
+
+
+# 싱글톤 인스턴스
+character_cache = CharacterCache()
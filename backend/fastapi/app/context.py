@@ -0,0 +1,174 @@
+"""
+대화 컨텍스트 구성
+
+브라우저가 매 요청마다 전체 이력을 보내지 않도록 FastAPI가 직접 컨텍스트를 구성
+- 최근 턴은 프로세스 내 캐시에 유지하고, 없으면 Django에서 최근 N개를 조회
+- 캐시가 있어도 매 턴 Django에 since 커서로 새 메시지만 조회해 병합
+  (다른 워커/인스턴스가 처리한 턴, Django에 직접 저장된 메시지 반영)
+- Django에서 새로 읽을 때는 아직 write-behind 큐에 있는 메시지를 뒤에 붙임
+- 이 프로세스가 추가한 메시지는 client_id로 Django 이력과 중복을 가려냄
+- 캐릭터의 context_length(턴 수)만큼만 유지
+- 토큰 예산을 넘으면 오래된 메시지부터 제거
+"""
+
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .django_client import django_client
+from .persistence import message_writer
+from .tokens import TOKENS_PER_MESSAGE, count_tokens
+
+
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "5000"))  # 대화 수
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", "1800"))  # 초
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+DEFAULT_CONTEXT_LENGTH = 50  # Character.context_length 기본값
+CONTEXT_ROLES = ("user", "assistant")
+
+
+def trim_to_budget(messages: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """토큰 예산을 넘지 않도록 오래된 메시지부터 제거"""
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for message in reversed(messages):
+        tokens = count_tokens(message["content"]) + TOKENS_PER_MESSAGE + 1  # role 포함
+        if used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept
+
+
+class _History:
+    """캐시된 대화 이력 + Django 동기화 커서"""
+
+    __slots__ = ("expires_at", "messages", "client_ids", "cursor")
+
+    def __init__(self, expires_at: float, maxlen: int, cursor: Optional[str]):
+        self.expires_at = expires_at
+        self.messages: Deque[Tuple[Optional[str], Dict[str, str]]] = deque(maxlen=maxlen)
+        self.client_ids: Set[str] = set()
+        self.cursor = cursor
+
+    def add(self, role: str, content: str, client_id: Optional[str] = None) -> None:
+        """메시지 추가 (이미 있는 client_id면 무시)"""
+        if client_id:
+            if client_id in self.client_ids:
+                return
+            self.client_ids.add(client_id)
+        if len(self.messages) == self.messages.maxlen:
+            # 밀려나는 메시지의 client_id도 정리
+            self.client_ids.discard(self.messages[0][0])
+        self.messages.append((client_id, {"role": role, "content": content}))
+
+    def merge(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Django 메시지 행 병합 (user/assistant만)"""
+        for row in rows:
+            if row.get("role") in CONTEXT_ROLES:
+                self.add(row["role"], row["content"], row.get("client_id"))
+
+    def as_list(self) -> List[Dict[str, str]]:
+        return [dict(message) for _, message in self.messages]
+
+
+class ConversationContextStore:
+    """대화별 최근 메시지 캐시"""
+
+    def __init__(self, maxsize: int = CONTEXT_CACHE_SIZE, ttl: float = CONTEXT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (conversation_id, user_token) -> 이력
+        # 사용자 토큰을 키에 포함하여 다른 사용자가 캐시로 대화 내용을 읽지 못하게 함
+        self._entries: "OrderedDict[Tuple[int, str], _History]" = OrderedDict()
+
+        # 메트릭
+        self._hits = 0
+        self._misses = 0
+        self._synced = 0  # 캐시 적중 후 since 조회로 병합한 메시지 수
+
+    async def get_history(
+        self,
+        conversation_id: int,
+        user_token: str,
+        context_length: int = DEFAULT_CONTEXT_LENGTH,
+    ) -> Optional[List[Dict[str, str]]]:
+        """
+        최근 context_length 턴(사용자+어시스턴트 쌍)의 메시지 반환
+
+        Returns:
+            [{"role": ..., "content": ...}] 또는 Django 조회 실패 시 None
+        """
+        max_messages = max(context_length, 1) * 2
+        key = (conversation_id, user_token)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic() and entry.messages.maxlen == max_messages:
+            page = await django_client.get_message_page(
+                conversation_id, max_messages, user_token, since=entry.cursor
+            )
+            if page is not None and not page.get("has_more"):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                before = len(entry.messages)
+                entry.merge(page["results"])
+                self._synced += len(entry.messages) - before
+                entry.cursor = page.get("next") or entry.cursor
+                return entry.as_list()
+            if page is None:
+                # 동기화 실패: 이 프로세스가 본 이력이라도 사용
+                self._hits += 1
+                return entry.as_list()
+            # 새 메시지가 한 페이지를 넘으면 최근 이력을 다시 읽음
+
+        self._misses += 1
+        page = await django_client.get_message_page(conversation_id, max_messages, user_token)
+        if page is None:
+            return None
+
+        history = _History(time.monotonic() + self.ttl, max_messages, page.get("next"))
+        history.merge(page["results"])
+        # 아직 저장되지 않은(write-behind 큐/저장 중) 메시지
+        history.merge(
+            {"role": message["role"], "content": message["content"], "client_id": message["client_id"]}
+            for message in message_writer.pending(conversation_id, user_token)
+        )
+        self._store(key, history)
+        return history.as_list()
+
+    def append(
+        self,
+        conversation_id: int,
+        user_token: str,
+        role: str,
+        content: str,
+        client_id: Optional[str] = None,
+    ) -> None:
+        """새 메시지를 캐시된 이력에 추가 (캐시에 없으면 다음 조회 때 Django에서 로드)"""
+        entry = self._entries.get((conversation_id, user_token))
+        if entry is not None:
+            entry.add(role, content, client_id)
+
+    def _store(self, key: Tuple[int, str], history: _History) -> None:
+        self._entries[key] = history
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        """캐시 메트릭"""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self._hits,
+            "misses": self._misses,
+            "synced_messages": self._synced,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 싱글톤 인스턴스
+context_store = ConversationContextStore()
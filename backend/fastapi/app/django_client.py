@@ -1,14 +1,27 @@
 """
 Django API Client for FastAPI
 FastAPI에서 Django API를 호출하여 데이터를 저장/조회
+
+- FastAPI lifespan 동안 하나의 커넥션 풀을 공유 (start/aclose)
+- 같은 캐릭터에 대한 동시 get_character 호출은 하나의 요청으로 합침
+- lifespan 밖(Celery 워커의 asyncio.run 등)에서는 호출마다 임시 클라이언트 사용
 """
+import asyncio
 import httpx
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable, List
 
 
 DJANGO_BASE_URL = os.getenv("DJANGO_BASE_URL", "")
 DJANGO_API_KEY = os.getenv("DJANGO_API_KEY", "")  # 선택적: API Key 인증
+# 워커 서비스 토큰 (Django가 업로드 결과 result_data.asset을 받아들이는 조건)
+WORKER_SERVICE_TOKEN = os.getenv("WORKER_SERVICE_TOKEN", "")
+
+# 커넥션 풀 설정
+DJANGO_MAX_CONNECTIONS = int(os.getenv("DJANGO_MAX_CONNECTIONS", "50"))
+DJANGO_MAX_KEEPALIVE = int(os.getenv("DJANGO_MAX_KEEPALIVE", "20"))
+DJANGO_KEEPALIVE_EXPIRY = float(os.getenv("DJANGO_KEEPALIVE_EXPIRY", "30"))
+DJANGO_TIMEOUT = float(os.getenv("DJANGO_TIMEOUT", "10"))
 
 
 class DjangoClient:
@@ -21,23 +34,132 @@ class DjangoClient:
         }
         if DJANGO_API_KEY:
             self.headers["Authorization"] = f"Bearer {DJANGO_API_KEY}"
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # 진행 중인 요청 (coalescing key -> Task)
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._coalesced = 0
+
+    async def start(self) -> None:
+        """커넥션 풀 생성 (lifespan 시작 시 호출)"""
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=DJANGO_MAX_CONNECTIONS,
+                max_keepalive_connections=DJANGO_MAX_KEEPALIVE,
+                keepalive_expiry=DJANGO_KEEPALIVE_EXPIRY,
+            ),
+            timeout=DJANGO_TIMEOUT,
+        )
+        print(f"[Django Client] Pool started: {self.base_url}")
+
+    async def aclose(self) -> None:
+        """커넥션 풀 종료 (lifespan 종료 시 호출)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            print("[Django Client] Pool closed")
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """공유 풀이 있으면 재사용, 없으면 임시 클라이언트로 요청"""
+        if self._client is not None:
+            return await self._client.request(method, path, **kwargs)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=DJANGO_TIMEOUT) as client:
+            return await client.request(method, path, **kwargs)
+
+    async def _coalesce(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """같은 key의 동시 요청은 하나의 업스트림 요청 결과를 공유"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 한 호출자의 취소가 공유 요청을 취소하지 않도록 shield
+        return await asyncio.shield(task)
+
+    def metrics(self) -> Dict[str, Any]:
+        """커넥션 풀 및 coalescing 메트릭"""
+        return {
+            "started": self._client is not None,
+            "max_connections": DJANGO_MAX_CONNECTIONS,
+            "in_flight_coalesced_keys": len(self._inflight),
+            "coalesced_requests": self._coalesced,
+        }
     
+    async def ping(self, timeout: float = 2.0) -> bool:
+        """Django 도달 가능 여부 (5xx/네트워크 오류가 아니면 True)"""
+        if not self.base_url:
+            return False
+        try:
+            response = await self._request("GET", "/api/v1/", headers=self.headers, timeout=timeout)
+            return response.status_code < 500
+        except Exception as e:
+            print(f"[Django Client] Ping failed: {e}")
+            return False
+
     async def get_character(self, character_id: int) -> Optional[Dict[str, Any]]:
-        """캐릭터 정보 조회"""
+        """캐릭터 정보 조회 (동시 요청 coalescing)"""
+        return await self._coalesce(
+            ("character", character_id),
+            lambda: self._fetch_character(character_id),
+        )
+
+    async def _fetch_character(self, character_id: int) -> Optional[Dict[str, Any]]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v1/characters/{character_id}/",
-                    headers=self.headers,
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return response.json()
-                return None
+            response = await self._request(
+                "GET",
+                f"/api/v1/characters/{character_id}/",
+                headers=self.headers,
+            )
+            if response.status_code == 200:
+                return response.json()
+            return None
         except Exception as e:
             print(f"[Django Client] Failed to get character: {e}")
             return None
     
+    async def get_message_page(
+        self,
+        conversation_id: int,
+        page_size: int,
+        user_token: str = None,
+        since: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        대화 메시지 한 페이지 조회 (시간순)
+
+        since가 없으면 최근 page_size개, 있으면 그 커서 이후의 새 메시지
+        Returns:
+            {"results", "next", "has_more", ...} 또는 실패 시 None
+        """
+        try:
+            headers = self.headers.copy()
+            if user_token:
+                headers["Authorization"] = f"Bearer {user_token}"
+
+            params: Dict[str, Any] = {"page_size": page_size}
+            if since:
+                params["since"] = since
+            response = await self._request(
+                "GET",
+                f"/api/v1/conversations/{conversation_id}/messages/",
+                params=params,
+                headers=headers,
+            )
+            if response.status_code == 200:
+                return response.json()
+            print(f"[Django Client] Failed to get messages: {response.status_code}")
+            return None
+        except Exception as e:
+            print(f"[Django Client] Failed to get messages: {e}")
+            return None
+    
     async def save_message(
         self,
         conversation_id: int,
@@ -46,74 +168,133 @@ class DjangoClient:
         user_token: str = None,
         token_usage: int = 0,
         model_version: str = "",
-        metadata: Dict = None
+        metadata: Dict = None,
+        client_id: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
-        """메시지 저장"""
+        """메시지 저장 (client_id: 컨텍스트 캐시가 이력과 중복을 가려내는 멱등 키)"""
         try:
             # 사용자 토큰이 있으면 사용, 없으면 기본 헤더 사용
             headers = self.headers.copy()
             if user_token:
                 headers["Authorization"] = f"Bearer {user_token}"
+            # token_usage, model_version은 워커 토큰이 있어야 저장됨
+            if WORKER_SERVICE_TOKEN:
+                headers["X-Worker-Token"] = WORKER_SERVICE_TOKEN
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/conversations/{conversation_id}/add_message/",
-                    json={
-                        "role": role,
-                        "content": content,
-                        "token_usage": token_usage,
-                        "model_version": model_version,
-                        "metadata": metadata or {},
-                    },
-                    headers=headers,
-                    timeout=10.0
-                )
-                if response.status_code in [200, 201]:
-                    return response.json()
-                else:
-                    print(f"[Django Client] Failed to save message: {response.status_code} - {response.text}")
-                    return None
+            response = await self._request(
+                "POST",
+                f"/api/v1/conversations/{conversation_id}/add_message/",
+                json={
+                    "role": role,
+                    "content": content,
+                    "token_usage": token_usage,
+                    "model_version": model_version,
+                    "metadata": metadata or {},
+                    "client_id": client_id,
+                },
+                headers=headers,
+            )
+            if response.status_code in [200, 201]:
+                return response.json()
+            else:
+                print(f"[Django Client] Failed to save message: {response.status_code} - {response.text}")
+                return None
         except Exception as e:
             print(f"[Django Client] Failed to save message: {e}")
             return None
     
+    async def save_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        user_token: str = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        메시지 일괄 저장 (여러 대화 가능, 각 항목에 conversation 포함)
+
+        4xx는 None 반환, 네트워크 오류/5xx는 예외 전달 (호출 측에서 재시도)
+        """
+        headers = self.headers.copy()
+        if user_token:
+            headers["Authorization"] = f"Bearer {user_token}"
+        # token_usage, model_version은 워커 토큰이 있어야 저장됨
+        if WORKER_SERVICE_TOKEN:
+            headers["X-Worker-Token"] = WORKER_SERVICE_TOKEN
+
+        response = await self._request(
+            "POST",
+            "/api/v1/conversations/bulk_add_messages/",
+            json={"messages": messages},
+            headers=headers,
+        )
+        if response.status_code in [200, 201]:
+            return response.json()
+        if 400 <= response.status_code < 500:
+            # 재시도해도 성공할 수 없는 요청 (권한/검증 오류)
+            print(f"[Django Client] Rejected message batch: {response.status_code} - {response.text}")
+            return None
+        response.raise_for_status()
+    
     async def create_generation_job(
         self,
         user_token: str,
         job_type: str,
-        input_data: Dict[str, Any]
+        input_data: Dict[str, Any],
+        idempotency_key: str = None
     ) -> Optional[Dict[str, Any]]:
-        """이미지 생성 작업 생성"""
+        """이미지 생성 작업 생성 (같은 idempotency_key면 기존 작업 반환)"""
         try:
             headers = self.headers.copy()
             if user_token:
                 headers["Authorization"] = f"Bearer {user_token}"
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/api/v1/generation-jobs/",
-                    json={
-                        "job_type": job_type,
-                        "input_data": input_data,
-                    },
-                    headers=headers,
-                    timeout=10.0
-                )
-                if response.status_code in [200, 201]:
-                    job_data = response.json()
-                    job_id = job_data.get("id")
-                    print(f"[Django Client] ✅ Job created successfully: ID={job_id}, Status={job_data.get('status')}")
-                    print(f"[Django Client] Full response: {job_data}")
-                    return job_data
-                else:
-                    print(f"[Django Client] ❌ Failed to create job: {response.status_code}")
-                    print(f"[Django Client] Response: {response.text}")
-                    return None
+            payload = {
+                "job_type": job_type,
+                "input_data": input_data,
+            }
+            if idempotency_key:
+                payload["idempotency_key"] = idempotency_key
+
+            response = await self._request(
+                "POST",
+                "/api/v1/generation-jobs/",
+                json=payload,
+                headers=headers,
+            )
+            if response.status_code in [200, 201]:
+                job_data = response.json()
+                job_id = job_data.get("id")
+                print(f"[Django Client] ✅ Job created successfully: ID={job_id}, Status={job_data.get('status')}")
+                print(f"[Django Client] Full response: {job_data}")
+                return job_data
+            else:
+                print(f"[Django Client] ❌ Failed to create job: {response.status_code}")
+                print(f"[Django Client] Response: {response.text}")
+                return None
         except Exception as e:
             print(f"[Django Client] ❌ Failed to create job: {e}")
             import traceback
             traceback.print_exc()
             return None
+
+    async def get_generation_job(self, job_id: int, user_token: str) -> Optional[Dict[str, Any]]:
+        """이미지 생성 작업 조회 (워커 재시도 시 완료 단계 확인용)"""
+        try:
+            headers = self.headers.copy()
+            if user_token:
+                headers["Authorization"] = f"Bearer {user_token}"
+
+            response = await self._request(
+                "GET",
+                f"/api/v1/generation-jobs/{job_id}/",
+                headers=headers,
+            )
+            if response.status_code == 200:
+                return response.json()
+            print(f"[Django Client] ❌ Failed to get job {job_id}: {response.status_code}")
+            return None
+        except Exception as e:
+            print(f"[Django Client] ❌ Failed to get job {job_id}: {e}")
+            return None
     
     async def update_generation_job(
         self,
@@ -121,7 +302,9 @@ class DjangoClient:
         status: str,
         result_data: Dict[str, Any] = None,
         error_message: str = None,
-        user_token: str = None
+        user_token: str = None,
+        stage: str = None,
+        celery_task_id: str = None
     ) -> Optional[Dict[str, Any]]:
         """이미지 생성 작업 상태 업데이트"""
         if job_id is None:
@@ -134,25 +317,30 @@ class DjangoClient:
                 payload["result_data"] = result_data
             if error_message:
                 payload["error_message"] = error_message
+            if stage is not None:
+                payload["stage"] = stage
+            if celery_task_id:
+                payload["celery_task_id"] = celery_task_id
 
             headers = self.headers.copy()
             if user_token:
                 headers["Authorization"] = f"Bearer {user_token}"
+            if WORKER_SERVICE_TOKEN:
+                headers["X-Worker-Token"] = WORKER_SERVICE_TOKEN
 
-            async with httpx.AsyncClient() as client:
-                response = await client.patch(
-                    f"{self.base_url}/api/v1/generation-jobs/{job_id}/",
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    print(f"[Django Client] ✅ Job {job_id} updated: {status}")
-                    return response.json()
-                else:
-                    print(f"[Django Client] ❌ Failed to update job {job_id}: {response.status_code}")
-                    print(f"[Django Client] Response: {response.text}")
-                    return None
+            response = await self._request(
+                "PATCH",
+                f"/api/v1/generation-jobs/{job_id}/",
+                json=payload,
+                headers=headers,
+            )
+            if response.status_code == 200:
+                print(f"[Django Client] ✅ Job {job_id} updated: {status}")
+                return response.json()
+            else:
+                print(f"[Django Client] ❌ Failed to update job {job_id}: {response.status_code}")
+                print(f"[Django Client] Response: {response.text}")
+                return None
         except Exception as e:
             print(f"[Django Client] ❌ Failed to update job {job_id}: {e}")
             import traceback
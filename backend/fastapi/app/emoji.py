@@ -0,0 +1,156 @@
+"""
+이모지 다양화 스트림 필터
+
+스트리밍 응답에서 최근에 쓴 이모지가 반복되면 문맥에 맞는 다른 이모지로 교체
+- 정규식/키워드 매처는 모듈 로드 시 한 번만 컴파일
+- 최근 이모지 기록은 대화별로 분리 (동시 사용자 간 공유 없음)
+- 델타 경계에서 잘린 이모지(변형 선택자, ZWJ 시퀀스 등)는 다음 델타와 합쳐 처리
+"""
+
+import random
+import re
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+
+# 이모지 풀 - 상황별로 분류
+EMOJI_POOLS = {
+    "happy": ["😊", "😃", "😄", "😁", "🙂", "😌", "🤗", "🥰", "✨", "💫", "🌟"],
+    "thinking": ["🤔", "🧐", "💭", "🤨", "😯", "😮"],
+    "excited": ["🤩", "😍", "🎉", "🎊", "⭐", "💫", "✨", "🌟"],
+    "love": ["😍", "🥰", "😘", "💕", "💖", "💗", "💝"],
+    "surprised": ["😮", "😯", "😲", "🤯", "😳"],
+    "sad": ["😔", "😕", "🙁", "☹️", "😢", "😥"],
+    "neutral": ["😐", "😑", "😶", "🙂"],
+    "playful": ["😏", "😜", "😝", "😛", "🤪", "😋"],
+}
+
+# 문맥 키워드 -> 풀 (앞에 있을수록 우선순위가 높음)
+CONTEXT_KEYWORDS = [
+    ("thinking", ["생각", "고민", "음", "어떻"]),
+    ("happy", ["기쁘", "좋", "환", "신나", "짱", "최고"]),
+    ("excited", ["와", "대단", "멋지", "놀라", "정말"]),
+    ("love", ["사랑", "좋아", "귀여", "예쁘"]),
+    ("sad", ["슬프", "아쉽", "안타", "걱정"]),
+    ("playful", ["재미", "장난", "웃", "하하"]),
+]
+DEFAULT_POOL = "happy"
+
+RECENT_WINDOW = 5  # 최근 몇 개의 이모지와 중복을 피할지
+CONTEXT_CHARS = 20  # 문맥 판단에 쓰는 앞뒤 글자 수
+MAX_CONVERSATIONS = 10000  # 이모지 기록을 유지할 대화 수
+
+# 이모지 문자 클래스 (한글/한자가 포함되지 않도록 범위를 한정)
+_EMOJI_CLASS = (
+    "["
+    "\U0001F600-\U0001F64F"  # 표정
+    "\U0001F300-\U0001F5FF"  # 기호 & 픽토그램
+    "\U0001F680-\U0001F6FF"  # 교통 & 지도
+    "\U0001F1E0-\U0001F1FF"  # 국기
+    "\U00002600-\U000027BF"  # 기타 기호 & 딩뱃
+    "\U0001F900-\U0001F9FF"  # 추가 이모지
+    "\U0001FA70-\U0001FAFF"  # 확장 이모지
+    "\U000024C2"             # Ⓜ
+    "\U0001F170-\U0001F251"  # 둘러싼 영숫자/표의문자
+    "\U0000FE0F\U0000200D"   # 변형 선택자, ZWJ (시퀀스를 한 덩어리로 유지)
+    "]"
+)
+EMOJI_PATTERN = re.compile(_EMOJI_CLASS + "+")
+TRAILING_EMOJI_PATTERN = re.compile(_EMOJI_CLASS + "+$")
+
+# 키워드 매처: 겹치는 매치를 모두 찾도록 lookahead 사용,
+# 같은 위치에서는 우선순위가 높은 풀의 키워드가 먼저 매치되도록 정렬
+_KEYWORD_POOL = {}
+for _pool_name, _words in CONTEXT_KEYWORDS:
+    for _word in _words:
+        _KEYWORD_POOL.setdefault(_word, _pool_name)
+_POOL_PRIORITY = {name: index for index, (name, _) in enumerate(CONTEXT_KEYWORDS)}
+KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(word) for word in _KEYWORD_POOL) + "))"
+)
+
+
+def select_pool(context: str) -> list:
+    """문맥 키워드로 이모지 풀 선택"""
+    best = None
+    for match in KEYWORD_PATTERN.finditer(context):
+        pool_name = _KEYWORD_POOL[match.group(1)]
+        if best is None or _POOL_PRIORITY[pool_name] < _POOL_PRIORITY[best]:
+            best = pool_name
+            if _POOL_PRIORITY[best] == 0:
+                break
+    return EMOJI_POOLS[best or DEFAULT_POOL]
+
+
+class EmojiDiversifier:
+    """한 번의 스트리밍 응답에 적용하는 이모지 필터"""
+
+    def __init__(self, recent: Optional[Deque[str]] = None):
+        self.recent: Deque[str] = recent if recent is not None else deque(maxlen=RECENT_WINDOW)
+        self._pending = ""  # 델타 끝에서 보류한 이모지
+        self._tail = ""  # 직전 출력의 끝부분 (문맥 판단용)
+
+    def feed(self, delta: str) -> str:
+        """델타를 처리하여 내보낼 텍스트 반환 (끝의 이모지는 다음 델타까지 보류)"""
+        text = self._pending + delta
+        match = TRAILING_EMOJI_PATTERN.search(text)
+        if match:
+            self._pending = text[match.start():]
+            text = text[:match.start()]
+        else:
+            self._pending = ""
+        return self._process(text) if text else ""
+
+    def flush(self) -> str:
+        """스트림 종료 시 보류 중인 이모지 처리"""
+        text, self._pending = self._pending, ""
+        return self._process(text) if text else ""
+
+    def _process(self, text: str) -> str:
+        prefix = self._tail
+        source = prefix + text
+        offset = len(prefix)
+
+        def replace_emoji(match):
+            emoji = match.group(0)
+            if emoji not in self.recent:
+                # 새로운 이모지는 그대로 유지
+                self.recent.append(emoji)
+                return emoji
+
+            # 이미 최근에 사용된 이모지면 주변 텍스트로 감정 판단 후 교체
+            start = match.start() + offset
+            context = source[max(0, start - CONTEXT_CHARS):start + len(emoji) + CONTEXT_CHARS].lower()
+            pool = select_pool(context)
+            available = [e for e in pool if e not in self.recent] or pool
+            new_emoji = random.choice(available)
+            self.recent.append(new_emoji)
+            return new_emoji
+
+        output = EMOJI_PATTERN.sub(replace_emoji, text)
+        self._tail = (prefix + output)[-CONTEXT_CHARS:]
+        return output
+
+
+class EmojiHistoryRegistry:
+    """대화별 최근 이모지 기록 (LRU)"""
+
+    def __init__(self, maxsize: int = MAX_CONVERSATIONS):
+        self.maxsize = maxsize
+        self._recent: "OrderedDict[int, Deque[str]]" = OrderedDict()
+
+    def diversifier(self, conversation_id: int) -> EmojiDiversifier:
+        """대화의 이모지 기록을 이어받는 새 필터"""
+        recent = self._recent.get(conversation_id)
+        if recent is None:
+            recent = deque(maxlen=RECENT_WINDOW)
+            self._recent[conversation_id] = recent
+            while len(self._recent) > self.maxsize:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(conversation_id)
+        return EmojiDiversifier(recent)
+
+
+# 싱글톤 인스턴스
+emoji_history = EmojiHistoryRegistry()
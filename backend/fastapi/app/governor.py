@@ -0,0 +1,311 @@
+"""
+업스트림(OpenAI) 요청 속도 제어
+
+수업 시작 시각에 요청이 몰려도 429가 사용자에게 그대로 전달되지 않도록
+요청을 보내기 전에 RPM/TPM 예산을 확인 (모델별 토큰 버킷)
+- 버킷 상태는 Redis에 저장하여 FastAPI / Celery 워커 프로세스가 공유 (Redis 미사용 시 프로세스 내 버킷)
+- 예산 한도와 남은 양은 응답의 x-ratelimit-* 헤더로 보정, 429 응답 시 Retry-After 동안 차단
+- 레인: 채팅(interactive)은 버킷 전체 사용, 이미지(background)는 예비분을 남겨 두고 사용
+- 예산이 부족하면 레인별 최대 대기 시간까지 기다리고, 그래도 부족하면 요청을 보내지 않고 UpstreamBusy 발생
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .redis_client import get_async_redis
+
+
+# 응답 헤더를 받기 전 기본 한도 (분당)
+GOVERNOR_DEFAULT_RPM = float(os.getenv("GOVERNOR_DEFAULT_RPM", "500"))
+GOVERNOR_DEFAULT_TPM = float(os.getenv("GOVERNOR_DEFAULT_TPM", "200000"))
+GOVERNOR_IMAGE_RPM = float(os.getenv("GOVERNOR_IMAGE_RPM", "50"))
+
+# 레인별 설정
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+GOVERNOR_BACKGROUND_RESERVE = float(os.getenv("GOVERNOR_BACKGROUND_RESERVE", "0.2"))  # 채팅용으로 남겨 둘 비율
+LANE_MAX_WAIT = {
+    INTERACTIVE: float(os.getenv("GOVERNOR_INTERACTIVE_MAX_WAIT", "10")),  # 초
+    BACKGROUND: float(os.getenv("GOVERNOR_BACKGROUND_MAX_WAIT", "30")),
+}
+GOVERNOR_POLL_INTERVAL = 1.0  # 대기 중 예산 재확인 최대 간격 (초)
+
+BUCKET_KEY = "ratelimit:{scope}"
+BUCKET_TTL = 600  # 사용하지 않는 버킷 정리 (초)
+
+# 예산 확인 및 차감 (원자적으로 처리)
+# KEYS: 버킷 / ARGV: now, token_cost, reserve, default_rpm, default_tpm, ttl
+# 반환: 대기해야 할 초 (문자열, "0"이면 확보 성공)
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local h = redis.call('HMGET', KEYS[1], 'rpm', 'tpm', 'req', 'tok', 'ts', 'blocked_until')
+local rpm = tonumber(h[1]) or tonumber(ARGV[4])
+local tpm = tonumber(h[2]) or tonumber(ARGV[5])
+local req = tonumber(h[3]) or rpm
+local tok = tonumber(h[4]) or tpm
+local ts = tonumber(h[5]) or now
+local blocked_until = tonumber(h[6]) or 0
+
+local elapsed = math.max(0, now - ts)
+req = math.min(rpm, req + elapsed * rpm / 60)
+tok = math.min(tpm, tok + elapsed * tpm / 60)
+cost = math.min(cost, tpm * (1 - reserve))
+
+local wait = 0
+if now < blocked_until then
+    wait = blocked_until - now
+else
+    local need_req = 1 + rpm * reserve
+    local need_tok = cost + tpm * reserve
+    if req >= need_req and tok >= need_tok then
+        req = req - 1
+        tok = tok - cost
+    else
+        wait = math.max((need_req - req) * 60 / rpm, (need_tok - tok) * 60 / tpm)
+    end
+end
+
+redis.call('HSET', KEYS[1], 'rpm', rpm, 'tpm', tpm, 'req', req, 'tok', tok, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(wait)
+"""
+
+# 응답 헤더로 한도/남은 양 보정 (서버 값보다 많이 남았다고 보지 않음)
+# KEYS: 버킷 / ARGV: now, rpm, tpm, remaining_req, remaining_tok, blocked_until, ttl (빈 문자열은 미지정)
+_OBSERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local h = redis.call('HMGET', KEYS[1], 'req', 'tok', 'blocked_until')
+if ARGV[2] ~= '' then redis.call('HSET', KEYS[1], 'rpm', ARGV[2]) end
+if ARGV[3] ~= '' then redis.call('HSET', KEYS[1], 'tpm', ARGV[3]) end
+if ARGV[4] ~= '' then
+    local req = tonumber(h[1])
+    redis.call('HSET', KEYS[1], 'req', req and math.min(req, tonumber(ARGV[4])) or ARGV[4], 'ts', now)
+end
+if ARGV[5] ~= '' then
+    local tok = tonumber(h[2])
+    redis.call('HSET', KEYS[1], 'tok', tok and math.min(tok, tonumber(ARGV[5])) or ARGV[5], 'ts', now)
+end
+if ARGV[6] ~= '' and tonumber(ARGV[6]) > (tonumber(h[3]) or 0) then
+    redis.call('HSET', KEYS[1], 'blocked_until', ARGV[6])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return 1
+"""
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class UpstreamBusy(Exception):
+    """속도 제한 예산 부족으로 요청을 보내지 않음"""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Upstream rate limit budget exhausted for {scope}, retry in {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* 값 ("1s", "6m0s", "20ms") -> 초"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def scope_for(path: str, model: Optional[str]) -> str:
+    """버킷 단위 (OpenAI 한도는 모델별)"""
+    return model or path.strip("/").replace("/", ":")
+
+
+class _LocalBucket:
+    """Redis를 쓸 수 없을 때 프로세스 내 토큰 버킷 (Lua 스크립트와 같은 규칙)"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.req = rpm
+        self.tok = tpm
+        self.ts = time.time()
+        self.blocked_until = 0.0
+
+    def acquire(self, now: float, cost: float, reserve: float) -> float:
+        elapsed = max(0.0, now - self.ts)
+        self.req = min(self.rpm, self.req + elapsed * self.rpm / 60)
+        self.tok = min(self.tpm, self.tok + elapsed * self.tpm / 60)
+        self.ts = now
+        cost = min(cost, self.tpm * (1 - reserve))
+
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        need_req = 1 + self.rpm * reserve
+        need_tok = cost + self.tpm * reserve
+        if self.req >= need_req and self.tok >= need_tok:
+            self.req -= 1
+            self.tok -= cost
+            return 0.0
+        return max((need_req - self.req) * 60 / self.rpm, (need_tok - self.tok) * 60 / self.tpm)
+
+    def observe(self, now: float, rpm, tpm, remaining_req, remaining_tok, blocked_until) -> None:
+        if rpm:
+            self.rpm = rpm
+        if tpm:
+            self.tpm = tpm
+        if remaining_req is not None:
+            self.req = min(self.req, remaining_req)
+            self.ts = now
+        if remaining_tok is not None:
+            self.tok = min(self.tok, remaining_tok)
+            self.ts = now
+        if blocked_until:
+            self.blocked_until = max(self.blocked_until, blocked_until)
+
+
+class UpstreamGovernor:
+    """모델별 RPM/TPM 토큰 버킷 (채팅 우선)"""
+
+    def __init__(self):
+        self._acquire_script = None
+        self._observe_script = None
+        self._local: Dict[str, _LocalBucket] = {}
+
+        # 메트릭 (프로세스별)
+        self._granted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._delayed = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._shed = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._wait_seconds = {INTERACTIVE: 0.0, BACKGROUND: 0.0}
+        self._throttled_responses = 0
+
+    def _defaults(self, scope: str) -> Tuple[float, float]:
+        if scope.startswith("dall-e") or scope.startswith("images") or scope.startswith("gpt-image"):
+            # 이미지 한도는 분당 이미지 수만 적용 (토큰 비용 0)
+            return GOVERNOR_IMAGE_RPM, GOVERNOR_DEFAULT_TPM
+        return GOVERNOR_DEFAULT_RPM, GOVERNOR_DEFAULT_TPM
+
+    def _local_bucket(self, scope: str) -> _LocalBucket:
+        bucket = self._local.get(scope)
+        if bucket is None:
+            bucket = self._local[scope] = _LocalBucket(*self._defaults(scope))
+        return bucket
+
+    async def _try_acquire(self, scope: str, tokens: int, reserve: float) -> float:
+        now = time.time()
+        client = get_async_redis()
+        if client is not None:
+            if self._acquire_script is None:
+                self._acquire_script = client.register_script(_ACQUIRE_SCRIPT)
+            rpm, tpm = self._defaults(scope)
+            try:
+                wait = await self._acquire_script(
+                    keys=[BUCKET_KEY.format(scope=scope)],
+                    args=[now, tokens, reserve, rpm, tpm, BUCKET_TTL],
+                )
+                return float(wait)
+            except Exception as e:
+                print(f"[Governor] Redis bucket unavailable, using local bucket: {e}")
+        return self._local_bucket(scope).acquire(now, tokens, reserve)
+
+    async def acquire(self, scope: str, tokens: int = 0, lane: str = INTERACTIVE) -> float:
+        """
+        요청 1건과 토큰 예산 확보 (부족하면 레인별 최대 대기 시간까지 대기)
+
+        Args:
+            scope: 버킷 단위 (모델명)
+            tokens: 예상 토큰 수 (프롬프트 + max_tokens)
+            lane: INTERACTIVE(채팅) 또는 BACKGROUND(이미지 작업)
+
+        Returns:
+            대기한 시간 (초)
+
+        Raises:
+            UpstreamBusy: 최대 대기 시간 안에 예산을 확보하지 못함
+        """
+        reserve = GOVERNOR_BACKGROUND_RESERVE if lane == BACKGROUND else 0.0
+        max_wait = LANE_MAX_WAIT.get(lane, 0.0)
+        started = time.monotonic()
+        delayed = False
+
+        while True:
+            wait = await self._try_acquire(scope, tokens, reserve)
+            waited = time.monotonic() - started if delayed else 0.0
+            if wait <= 0:
+                self._granted[lane] += 1
+                if delayed:
+                    self._delayed[lane] += 1
+                    self._wait_seconds[lane] += waited
+                return waited
+            if waited + wait > max_wait:
+                self._shed[lane] += 1
+                self._wait_seconds[lane] += waited
+                print(f"[Governor] Shedding {lane} request for {scope} (retry in {wait:.1f}s)")
+                raise UpstreamBusy(scope, wait)
+            delayed = True
+            await asyncio.sleep(min(wait, GOVERNOR_POLL_INTERVAL))
+
+    async def observe(self, scope: str, status_code: int, headers: Mapping[str, str], retry_after: Optional[float] = None) -> None:
+        """응답 헤더로 버킷 보정 (429면 Retry-After 또는 reset까지 차단)"""
+        rpm = _header_float(headers, "x-ratelimit-limit-requests")
+        tpm = _header_float(headers, "x-ratelimit-limit-tokens")
+        remaining_req = _header_float(headers, "x-ratelimit-remaining-requests")
+        remaining_tok = _header_float(headers, "x-ratelimit-remaining-tokens")
+
+        now = time.time()
+        blocked_until = None
+        if status_code == 429:
+            self._throttled_responses += 1
+            delay = retry_after
+            if delay is None:
+                resets = [parse_reset(headers.get(name)) for name in
+                          ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+                delay = max([r for r in resets if r is not None], default=1.0)
+            blocked_until = now + delay
+
+        if all(v is None for v in (rpm, tpm, remaining_req, remaining_tok, blocked_until)):
+            return
+
+        client = get_async_redis()
+        if client is not None:
+            if self._observe_script is None:
+                self._observe_script = client.register_script(_OBSERVE_SCRIPT)
+            args = [now] + ["" if v is None else v for v in (rpm, tpm, remaining_req, remaining_tok, blocked_until)]
+            try:
+                await self._observe_script(keys=[BUCKET_KEY.format(scope=scope)], args=args + [BUCKET_TTL])
+                return
+            except Exception as e:
+                print(f"[Governor] Failed to update Redis bucket: {e}")
+        self._local_bucket(scope).observe(now, rpm, tpm, remaining_req, remaining_tok, blocked_until)
+
+    def metrics(self) -> Dict[str, Any]:
+        """레인별 허용/지연/거절 수 (이 프로세스 기준)"""
+        return {
+            "granted": dict(self._granted),
+            "delayed": dict(self._delayed),
+            "shed": dict(self._shed),
+            "wait_seconds": {lane: round(s, 3) for lane, s in self._wait_seconds.items()},
+            "throttled_responses": self._throttled_responses,
+            "background_reserve": GOVERNOR_BACKGROUND_RESERVE,
+        }
+
+
+# 싱글톤 인스턴스
+upstream_governor = UpstreamGovernor()
@@ -0,0 +1,161 @@
+"""
+백그라운드 헬스 프로버
+
+/health, /readiness가 요청마다 Celery 브로드캐스트(inspect().ping())를 하지 않도록
+주기적으로 의존성 상태를 확인하고 결과를 스냅샷으로 캐시
+- 브로커 연결, 워커 수, 큐 길이 (Celery)
+- Redis, Django 도달 가능 여부
+- 프로브 엔드포인트는 스냅샷만 읽음
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .django_client import django_client
+from .redis_client import get_async_redis
+
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))  # 초
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))  # 개별 확인 타임아웃
+# 길이를 확인할 Celery 큐 (비어 있으면 설정된 모든 큐)
+HEALTH_QUEUES = [q.strip() for q in os.getenv("HEALTH_QUEUES", "").split(",") if q.strip()]
+
+
+def _check_broker(queues: List[str]) -> Dict[str, int]:
+    """브로커 연결 확인 및 큐 길이 조회 (블로킹, 스레드에서 실행)"""
+    from .celery_app import celery_app
+
+    names = queues or [q.name for q in celery_app.conf.task_queues or []] or [celery_app.conf.task_default_queue]
+    depths: Dict[str, int] = {}
+    with celery_app.connection_for_read() as conn:
+        conn.ensure_connection(max_retries=1, interval_start=0, timeout=HEALTH_PROBE_TIMEOUT)
+        channel = conn.default_channel
+        for name in names:
+            try:
+                depths[name] = channel.queue_declare(queue=name, passive=True).message_count
+            except Exception:
+                # 아직 선언되지 않은 큐
+                depths[name] = 0
+    return depths
+
+
+def _check_workers() -> int:
+    """응답한 Celery 워커 수 (블로킹, 스레드에서 실행)"""
+    from .celery_app import celery_app
+
+    replies = celery_app.control.inspect(timeout=HEALTH_PROBE_TIMEOUT).ping()
+    return len(replies or {})
+
+
+class HealthProber:
+    """의존성 상태를 주기적으로 확인하고 최신 스냅샷 유지"""
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL, queues: Optional[List[str]] = None):
+        self.interval = interval
+        self.queues = queues if queues is not None else HEALTH_QUEUES
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Dict[str, Any] = {
+            "checked_at": None,
+            "broker": False,
+            "workers": 0,
+            "queues": {},
+            "queue_depth": 0,
+            "redis": None,
+            "django": False,
+        }
+
+        # 메트릭
+        self._probes = 0
+        self._failures = 0
+        self._last_duration_ms = 0.0
+
+    async def start(self) -> None:
+        """프로브 루프 시작 (lifespan 시작 시 호출)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"[Health] Prober started (interval {self.interval}s)")
+
+    async def stop(self) -> None:
+        """프로브 루프 종료 (lifespan 종료 시 호출)"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failures += 1
+                print(f"[Health] Probe failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe(self) -> Dict[str, Any]:
+        """모든 의존성을 동시에 확인하고 스냅샷 갱신"""
+        started = time.monotonic()
+        broker, workers, redis_ok, django_ok = await asyncio.gather(
+            self._guard(asyncio.to_thread(_check_broker, self.queues), "broker"),
+            self._guard(asyncio.to_thread(_check_workers), "workers"),
+            self._guard(self._check_redis(), "redis"),
+            self._guard(django_client.ping(HEALTH_PROBE_TIMEOUT), "django"),
+        )
+        queues = broker or {}
+        self._snapshot = {
+            "checked_at": time.time(),
+            "broker": broker is not None,
+            "workers": workers or 0,
+            "queues": queues,
+            "queue_depth": sum(queues.values()),
+            "redis": redis_ok,
+            "django": bool(django_ok),
+        }
+        self._probes += 1
+        self._last_duration_ms = round((time.monotonic() - started) * 1000, 1)
+        return self._snapshot
+
+    async def _guard(self, awaitable, name: str) -> Any:
+        """타임아웃/예외 시 None (느린 의존성이 다른 확인을 막지 않도록)"""
+        try:
+            # 스레드 호출은 자체 타임아웃이 있지만, 브로커 장애 시를 대비해 한 번 더 제한
+            return await asyncio.wait_for(awaitable, HEALTH_PROBE_TIMEOUT * 2)
+        except Exception as e:
+            print(f"[Health] {name} check failed: {e}")
+            return None
+
+    async def _check_redis(self) -> Optional[bool]:
+        """Redis ping (REDIS_URL 미설정 시 None)"""
+        client = get_async_redis()
+        if client is None:
+            return None
+        return bool(await client.ping())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """마지막 확인 결과 (age: 확인 후 경과 초, stale: 주기의 3배 이상 갱신되지 않음)"""
+        snapshot = dict(self._snapshot)
+        checked_at = snapshot["checked_at"]
+        age = time.time() - checked_at if checked_at else None
+        snapshot["age"] = round(age, 3) if age is not None else None
+        snapshot["stale"] = age is None or age > self.interval * 3
+        return snapshot
+
+    def metrics(self) -> Dict[str, Any]:
+        """프로버 메트릭"""
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "probes": self._probes,
+            "failures": self._failures,
+            "last_duration_ms": self._last_duration_ms,
+        }
+
+
+# 싱글톤 인스턴스
+health_prober = HealthProber()
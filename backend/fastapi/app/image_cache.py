@@ -0,0 +1,136 @@
+"""
+이미지 생성 결과 캐시
+
+같은 프롬프트(한 반 학생들이 같은 과제 프롬프트를 입력하는 경우 등)로
+DALL-E를 반복 호출하지 않도록 생성 결과를 Redis에 캐시
+- 키: 정규화한 프롬프트 + size + quality + model
+- 요청에서 use_cache=True인 경우에만 사용 (opt-in)
+- 스토리지에 업로드된 결과만 캐시 (DALL-E 임시 URL은 1시간 후 만료)
+- 적중률, 절약한 비용, 중복 제거된 바이트 수를 Redis에 집계 (프로세스/워커 공통)
+"""
+
+import hashlib
+import json
+import os
+import unicodedata
+from typing import Any, Dict, Optional
+
+from .redis_client import get_async_redis
+
+
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))  # 초
+IMAGE_CACHE_PREFIX = "image_cache:"
+IMAGE_CACHE_STATS_KEY = "image_cache:stats"
+
+# 이미지 1장당 가격 (USD) - (model, quality, size)
+IMAGE_PRICES = {
+    ("dall-e-3", "standard", "1024x1024"): 0.040,
+    ("dall-e-3", "standard", "1024x1792"): 0.080,
+    ("dall-e-3", "standard", "1792x1024"): 0.080,
+    ("dall-e-3", "hd", "1024x1024"): 0.080,
+    ("dall-e-3", "hd", "1024x1792"): 0.120,
+    ("dall-e-3", "hd", "1792x1024"): 0.120,
+    ("dall-e-2", "standard", "1024x1024"): 0.020,
+    ("dall-e-2", "standard", "512x512"): 0.018,
+    ("dall-e-2", "standard", "256x256"): 0.016,
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """대소문자, 공백, 끝 문장부호 차이를 무시하도록 정규화"""
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    return " ".join(text.split()).rstrip(".!?。 ")
+
+
+def image_price(model: str, quality: str, size: str) -> float:
+    """이미지 1장 가격 (표에 없으면 0)"""
+    return IMAGE_PRICES.get((model, quality, size), 0.0)
+
+
+class ImageResultCache:
+    """Redis 기반 이미지 생성 결과 캐시"""
+
+    def key(self, prompt: str, size: str, quality: str, model: str) -> str:
+        """캐시 키"""
+        raw = "\x1f".join([normalize_prompt(prompt), size, quality, model])
+        return IMAGE_CACHE_PREFIX + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, price: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        캐시된 결과 조회 (적중/미스 집계 포함)
+
+        Args:
+            price: 적중 시 절약한 비용으로 집계할 금액
+        """
+        client = get_async_redis()
+        if client is None:
+            return None
+
+        try:
+            raw = await client.get(key)
+            async with client.pipeline(transaction=False) as pipe:
+                if raw is not None:
+                    pipe.hincrby(IMAGE_CACHE_STATS_KEY, "hits", 1)
+                    pipe.hincrbyfloat(IMAGE_CACHE_STATS_KEY, "cost_saved_usd", price)
+                else:
+                    pipe.hincrby(IMAGE_CACHE_STATS_KEY, "misses", 1)
+                await pipe.execute()
+        except Exception as e:
+            print(f"[Image Cache] Lookup failed: {e}")
+            return None
+
+        return json.loads(raw) if raw is not None else None
+
+    async def put(self, key: str, result: Dict[str, Any]) -> None:
+        """생성 결과 저장"""
+        client = get_async_redis()
+        if client is None:
+            return
+
+        try:
+            await client.set(key, json.dumps(result, ensure_ascii=False), ex=IMAGE_CACHE_TTL)
+        except Exception as e:
+            print(f"[Image Cache] Store failed: {e}")
+
+    async def record_dedup(self, file_size: int) -> None:
+        """스토리지에 이미 있던 바이트 동일 이미지 집계"""
+        client = get_async_redis()
+        if client is None:
+            return
+
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(IMAGE_CACHE_STATS_KEY, "dedup_uploads", 1)
+                pipe.hincrby(IMAGE_CACHE_STATS_KEY, "dedup_bytes", file_size)
+                await pipe.execute()
+        except Exception as e:
+            print(f"[Image Cache] Failed to record dedup: {e}")
+
+    async def metrics(self) -> Dict[str, Any]:
+        """적중률, 절약 비용, 중복 제거 통계"""
+        client = get_async_redis()
+        if client is None:
+            return {"enabled": False}
+
+        try:
+            stats = await client.hgetall(IMAGE_CACHE_STATS_KEY)
+        except Exception as e:
+            print(f"[Image Cache] Failed to read stats: {e}")
+            return {"enabled": True, "error": str(e)}
+
+        hits = int(stats.get("hits", 0))
+        misses = int(stats.get("misses", 0))
+        lookups = hits + misses
+        return {
+            "enabled": True,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "cost_saved_usd": round(float(stats.get("cost_saved_usd", 0)), 4),
+            "dedup_uploads": int(stats.get("dedup_uploads", 0)),
+            "dedup_bytes": int(stats.get("dedup_bytes", 0)),
+        }
+
+
+# 싱글톤 인스턴스
+image_cache = ImageResultCache()
@@ -0,0 +1,147 @@
+"""
+이미지 생성 작업 상태 이벤트
+
+클라이언트가 /image/status를 반복 폴링하지 않도록 작업 상태 변경을 Redis pub/sub으로 전달
+- 워커: 단계별 PROGRESS를 update_state로 기록하고 image_job:{task_id} 채널에 발행
+- 워커: 작업 종료(task_postrun, 결과 저장 이후)에 최종 상태 발행
+- API: 채널 구독 후 현재 상태를 한 번 읽고, 이후에는 발행된 이벤트만 전달
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from celery import states
+from celery.signals import task_postrun
+
+from .redis_client import get_async_redis, get_redis
+
+
+IMAGE_STATUS_CHANNEL = "image_job:{task_id}"
+IMAGE_STATUS_STREAM_TIMEOUT = float(os.getenv("IMAGE_STATUS_STREAM_TIMEOUT", "900"))  # 초
+IMAGE_STATUS_HEARTBEAT = float(os.getenv("IMAGE_STATUS_HEARTBEAT", "15"))  # 이벤트가 없을 때 상태 재확인 주기
+IMAGE_STATUS_POLL_INTERVAL = 2.0  # Redis pub/sub을 쓸 수 없을 때 상태 확인 주기
+PROGRESS_TOTAL = 100
+
+
+def status_payload(task_id: str, state: str, info: Any) -> Dict[str, Any]:
+    """작업 상태 응답 (/image/status와 스트림 이벤트 공통 형식)"""
+    payload: Dict[str, Any] = {
+        "task_id": task_id,
+        "status": state,
+        "state": state,
+    }
+    if state == states.SUCCESS:
+        payload["result"] = info
+        payload["success"] = True
+    elif state == states.FAILURE:
+        payload["error"] = str(info)
+        payload["success"] = False
+    elif state == "PROGRESS" and isinstance(info, dict):
+        payload["current"] = info.get("current", 0)
+        payload["total"] = info.get("total", PROGRESS_TOTAL)
+        payload["status_message"] = info.get("status", "Processing...")
+    return payload
+
+
+def task_status(task_id: str) -> Dict[str, Any]:
+    """Celery 결과 백엔드에서 현재 상태 조회 (블로킹)"""
+    from .celery_app import celery_app
+
+    result = celery_app.AsyncResult(task_id)
+    return status_payload(task_id, result.state, result.info)
+
+
+def _channel(task_id: str) -> str:
+    return IMAGE_STATUS_CHANNEL.format(task_id=task_id)
+
+
+async def report_progress(task, task_id: Optional[str], current: int, message: str) -> None:
+    """
+    워커에서 진행 상태 기록 및 발행 (태스크 ID가 없으면 무시)
+
+    task.request는 스레드 로컬이라 워커 루프 스레드에서는 비어 있으므로
+    태스크 ID는 태스크 스레드에서 읽어 전달
+    """
+    if not task_id:
+        return
+
+    meta = {"current": current, "total": PROGRESS_TOTAL, "status": message}
+    try:
+        # update_state는 결과 백엔드에 동기로 기록하므로 워커 루프를 막지 않도록 스레드에서 실행
+        await asyncio.to_thread(task.update_state, task_id=task_id, state="PROGRESS", meta=meta)
+    except Exception as e:
+        print(f"[Job Events] Failed to store progress: {e}")
+
+    client = get_async_redis()
+    if client is None:
+        return
+    try:
+        payload = status_payload(task_id, "PROGRESS", meta)
+        await client.publish(_channel(task_id), json.dumps(payload, ensure_ascii=False))
+    except Exception as e:
+        print(f"[Job Events] Failed to publish progress: {e}")
+
+
+@task_postrun.connect
+def _publish_final_state(sender=None, task_id=None, retval=None, state=None, **kwargs) -> None:
+    """작업 종료 시 최종 상태 발행 (결과 백엔드 저장 이후 호출됨)"""
+    if sender is None or sender.name != "tasks.generate_image_task" or state not in states.READY_STATES:
+        return
+
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        payload = status_payload(task_id, state, retval)
+        client.publish(_channel(task_id), json.dumps(payload, ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"[Job Events] Failed to publish final state: {e}")
+
+
+async def stream_status(task_id: str, timeout: float = IMAGE_STATUS_STREAM_TIMEOUT) -> AsyncIterator[Dict[str, Any]]:
+    """
+    작업 상태 이벤트 스트림 (최종 상태 또는 timeout에서 종료)
+
+    구독을 먼저 시작한 뒤 현재 상태를 읽어 그 사이에 발행된 이벤트를 놓치지 않음
+    """
+    client = get_async_redis()
+    pubsub = None
+    if client is not None:
+        try:
+            pubsub = client.pubsub()
+            await pubsub.subscribe(_channel(task_id))
+        except Exception as e:
+            print(f"[Job Events] Subscribe failed, falling back to polling: {e}")
+            pubsub = None
+
+    try:
+        current = await asyncio.to_thread(task_status, task_id)
+        yield current
+
+        deadline = time.monotonic() + timeout
+        while current["state"] not in states.READY_STATES and time.monotonic() < deadline:
+            message: Optional[Dict[str, Any]] = None
+            if pubsub is not None:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=IMAGE_STATUS_HEARTBEAT,
+                )
+            else:
+                await asyncio.sleep(IMAGE_STATUS_POLL_INTERVAL)
+
+            if message is not None:
+                current = json.loads(message["data"])
+            else:
+                # 이벤트가 없으면 결과 백엔드를 다시 확인 (하트비트 겸 누락 대비)
+                current = await asyncio.to_thread(task_status, task_id)
+            yield current
+    finally:
+        if pubsub is not None:
+            try:
+                await pubsub.unsubscribe()
+                await pubsub.aclose()
+            except Exception:
+                pass
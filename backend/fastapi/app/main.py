@@ -1,21 +1,61 @@
 from fastapi import FastAPI, HTTPException, Header, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+import asyncio
 import os
+import uuid
 from dotenv import load_dotenv
 import uvicorn
 import httpx
 import json
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Optional
 from .django_client import django_client
 
 # Load environment variables
 load_dotenv()
 
+# 환경변수 로드 후 import (모듈 로드 시 OPENAI_*, REDIS_URL 설정을 읽음)
+from .upstream import upstream_client
+from .router import ROUTER_HEDGE, provider_router
+from .character_cache import character_cache
+from .persistence import message_writer
+from .context import context_store, trim_to_budget, CONTEXT_TOKEN_BUDGET, DEFAULT_CONTEXT_LENGTH
+from .tokens import build_usage, count_message_tokens, count_tokens, warm_encoding
+from .governor import INTERACTIVE, UpstreamBusy, upstream_governor
+from .emoji import EmojiDiversifier, emoji_history
+from .health import health_prober
+from .image_cache import image_cache, image_price
+from .response_cache import response_cache
+from .job_events import stream_status, task_status
+from .scheduler import build_tenant, image_scheduler
+from . import sse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 수명 동안 공유 리소스 관리"""
+    await warm_encoding()
+    await upstream_client.start()
+    await provider_router.start()
+    await django_client.start()
+    await character_cache.start()
+    await message_writer.start()
+    await health_prober.start()
+    yield
+    await health_prober.stop()
+    await message_writer.stop()
+    await character_cache.stop()
+    await django_client.aclose()
+    await provider_router.aclose()
+    await upstream_client.aclose()
+
+
 app = FastAPI(
     title="EduChat FastAPI",
     description="OpenAI streaming & image generation service for EduChat",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS (configure from env, default to studyverse.store + localhost for development)
@@ -35,6 +75,11 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 DJANGO_BASE_URL = os.getenv("DJANGO_BASE_URL", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 DALLE_MODEL = os.getenv("DALLE_MODEL", "dall-e-3")
+# 스트림 마지막에 usage 블록 요청 (stream_options 미지원 호환 API는 false로 설정)
+OPENAI_STREAM_USAGE = os.getenv("OPENAI_STREAM_USAGE", "true").lower() == "true"
+# SSE 프레임 병합 기본값 (요청에서 coalesce_ms를 지정하지 않으면 사용, 0이면 델타마다 전송)
+SSE_COALESCE_MS = int(os.getenv("SSE_COALESCE_MS", "0"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "1024"))
 
 if not OPENAI_API_KEY:
     raise ValueError("❌ OPENAI_API_KEY 환경변수가 설정되지 않았습니다! .env 파일을 확인하세요.")
@@ -48,151 +93,81 @@ def root():
         "endpoints": [
             "/health",
             "/readiness",
+            "/metrics",
             "/chat/stream",
             "/image/generate"
         ]
     }
 
 @app.get("/health")
-def health():
-    """헬스 체크"""
-    from .celery_app import celery_app
-
-    celery_status = "connected"
-    try:
-        celery_app.control.inspect().ping()
-    except Exception as e:
-        print(f"[Health] Celery ping failed: {e}")
-        celery_status = "disconnected"
-
+async def health():
+    """헬스 체크 (백그라운드 프로버의 마지막 스냅샷)"""
+    snapshot = health_prober.snapshot()
     return {
         "ok": True,
-        "celery": celery_status
+        "celery": "connected" if snapshot["broker"] else "disconnected",
+        "workers": snapshot["workers"],
+        "queue_depth": snapshot["queue_depth"],
+        "checked_at": snapshot["checked_at"],
+        "stale": snapshot["stale"],
     }
 
 @app.get("/readiness")
-def readiness():
-    """준비 상태 확인"""
-    from .celery_app import celery_app
-
-    celery_ready = False
-    try:
-        celery_app.control.inspect().ping()
-        celery_ready = True
-    except Exception as e:
-        print(f"[Readiness] Celery check failed: {e}")
-        celery_ready = False
-
+async def readiness():
+    """준비 상태 확인 (백그라운드 프로버의 마지막 스냅샷)"""
+    snapshot = health_prober.snapshot()
     return {
         "ready": True,
-        "celery": celery_ready,
+        "celery": snapshot["broker"],
         "openai": bool(OPENAI_API_KEY),
-        "django": bool(DJANGO_BASE_URL)
+        "django": snapshot["django"],
+        "checks": snapshot,
     }
 
+@app.get("/metrics")
+async def metrics():
+    """커넥션 풀 및 캐시 메트릭"""
+    return {
+        "upstream": upstream_client.metrics(),
+        "router": provider_router.metrics(),
+        "django": django_client.metrics(),
+        "character_cache": character_cache.metrics(),
+        "message_writer": message_writer.metrics(),
+        "context": context_store.metrics(),
+        "health": health_prober.metrics(),
+        "image_cache": await image_cache.metrics(),
+        "image_scheduler": image_scheduler.metrics(),
+        "governor": upstream_governor.metrics(),
+        "response_cache": response_cache.metrics(),
+    }
 
-# ==================== Chat Streaming (OpenAI) ====================
-
-import random
-import re
-
-# 이모지 풀 - 상황별로 분류
-EMOJI_POOLS = {
-    "happy": ["😊", "😃", "😄", "😁", "🙂", "😌", "🤗", "🥰", "✨", "💫", "🌟"],
-    "thinking": ["🤔", "🧐", "💭", "🤨", "😯", "😮"],
-    "excited": ["🤩", "😍", "🎉", "🎊", "⭐", "💫", "✨", "🌟"],
-    "love": ["😍", "🥰", "😘", "💕", "💖", "💗", "💝"],
-    "surprised": ["😮", "😯", "😲", "🤯", "😳"],
-    "sad": ["😔", "😕", "🙁", "☹️", "😢", "😥"],
-    "neutral": ["😐", "😑", "😶", "🙂"],
-    "playful": ["😏", "😜", "😝", "😛", "🤪", "😋"],
-}
-
-# 반복되는 이모지 추적 (최근 5개)
-recent_emojis = []
-
-def diversify_emoji(text: str) -> str:
-    """
-    반복되는 이모지를 다양한 이모지로 교체
-    """
-    global recent_emojis
-    
-    # 이모지 패턴 찾기 (유니코드 이모지)
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # 표정
-        "\U0001F300-\U0001F5FF"  # 기호 & 픽토그램
-        "\U0001F680-\U0001F6FF"  # 교통 & 지도
-        "\U0001F1E0-\U0001F1FF"  # 국기
-        "\U00002600-\U000027BF"  # 기타 기호
-        "\U0001F900-\U0001F9FF"  # 추가 이모지
-        "\U0001FA70-\U0001FAFF"  # 확장 이모지
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "]+",
-        flags=re.UNICODE
-    )
-    
-    def replace_emoji(match):
-        global recent_emojis
-        emoji = match.group(0)
-        
-        # 이미 최근에 사용된 이모지면 교체
-        if emoji in recent_emojis[-5:]:
-            # 주변 텍스트로 감정 판단
-            context = text[max(0, match.start()-20):match.end()+20].lower()
-            
-            # 컨텍스트 기반 풀 선택
-            if any(word in context for word in ["생각", "고민", "음", "어떻"]):
-                pool = EMOJI_POOLS["thinking"]
-            elif any(word in context for word in ["기쁘", "좋", "환", "신나", "짱", "최고"]):
-                pool = EMOJI_POOLS["happy"]
-            elif any(word in context for word in ["와", "대단", "멋지", "놀라", "정말"]):
-                pool = EMOJI_POOLS["excited"]
-            elif any(word in context for word in ["사랑", "좋아", "귀여", "예쁘"]):
-                pool = EMOJI_POOLS["love"]
-            elif any(word in context for word in ["슬프", "아쉽", "안타", "걱정"]):
-                pool = EMOJI_POOLS["sad"]
-            elif any(word in context for word in ["재미", "장난", "웃", "하하"]):
-                pool = EMOJI_POOLS["playful"]
-            else:
-                # 기본적으로 happy 풀 사용
-                pool = EMOJI_POOLS["happy"]
-            
-            # 최근 사용하지 않은 이모지 선택
-            available = [e for e in pool if e not in recent_emojis[-5:]]
-            if not available:
-                available = pool
-            
-            new_emoji = random.choice(available)
-            recent_emojis.append(new_emoji)
-            if len(recent_emojis) > 10:
-                recent_emojis.pop(0)
-            
-            return new_emoji
-        else:
-            # 새로운 이모지는 그대로 유지
-            recent_emojis.append(emoji)
-            if len(recent_emojis) > 10:
-                recent_emojis.pop(0)
-            return emoji
-    
-    return emoji_pattern.sub(replace_emoji, text)
 
+# ==================== Chat Streaming (OpenAI) ====================
 
 async def stream_chat_response(
     messages: list,
     system_prompt: str,
     temperature: float = 0.7,
     max_tokens: int = 2000,
-) -> AsyncGenerator[str, None]:
+    emoji_filter: Optional[EmojiDiversifier] = None,
+    hedge: bool = ROUTER_HEDGE,
+    route: Optional[dict] = None,
+) -> AsyncGenerator[dict, None]:
     """
     Stream chat response from OpenAI API
+
+    SSE 문자열 대신 이벤트 dict를 생성 (직렬화는 응답 직전에 sse.encode_stream에서 한 번만)
+    - {"content": str, "done": False}
+    - {"usage": {...}, "done": False}
+    - {"done": True}
+    - {"error": str} (속도 제한 예산 부족 시 "retry_after" 포함)
+
+    공급자는 provider_router가 선택 (hedge=True면 느린 첫 토큰에 대비해 중복 요청),
+    route dict를 넘기면 선택된 공급자 이름과 모델을 기록
     """
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    # 이모지 다양화 필터 (대화별 기록을 넘겨받지 않으면 이번 응답에서만 유지)
+    if emoji_filter is None:
+        emoji_filter = EmojiDiversifier()
 
     payload = {
         "model": OPENAI_MODEL,
@@ -204,43 +179,58 @@ async def stream_chat_response(
         "max_tokens": max_tokens,
         "stream": True,
     }
+    if OPENAI_STREAM_USAGE:
+        payload["stream_options"] = {"include_usage": True}
 
     try:
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{OPENAI_BASE_URL}/chat/completions",
-                json=payload,
-                headers=headers
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    error_message = error_text.decode('utf-8') if error_text else 'Unknown error'
-                    yield f"data: {json.dumps({'error': f'OpenAI API error: {response.status_code} - {error_message}'})}\n\n"
-                    return
-
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data_str = line[6:]  # Remove "data: " prefix
-                        if data_str == "[DONE]":
-                            yield f"data: {json.dumps({'done': True})}\n\n"
-                            break
-
-                        try:
-                            data = json.loads(data_str)
-                            if "choices" in data and len(data["choices"]) > 0:
-                                delta = data["choices"][0].get("delta", {})
-                                if "content" in delta:
-                                    # 이모지 다양화 적용
-                                    content = diversify_emoji(delta['content'])
-                                    yield f"data: {json.dumps({'content': content, 'done': False})}\n\n"
-                        except json.JSONDecodeError:
-                            continue
+        # 공급자별 공유 커넥션 풀 사용 (lifespan에서 생성)
+        # 채팅은 interactive 레인 (이미지 작업보다 먼저 예산 사용), TPM은 프롬프트 + 최대 응답 토큰으로 예약
+        async with provider_router.stream_chat(
+            payload,
+            lane=INTERACTIVE,
+            tokens=count_message_tokens(payload["messages"], OPENAI_MODEL) + max_tokens,
+            hedge=hedge,
+        ) as response:
+            if route is not None:
+                route.update(provider=response.provider.name, model=response.provider.model)
+            if response.status_code != 200:
+                error_text = await response.aread()
+                error_message = error_text.decode('utf-8') if error_text else 'Unknown error'
+                yield {"error": f"OpenAI API error: {response.status_code} - {error_message}"}
+                return
+
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data_str = line[6:]  # Remove "data: " prefix
+                    if data_str == "[DONE]":
+                        # 델타 끝에서 보류한 이모지 내보내기
+                        content = emoji_filter.flush()
+                        if content:
+                            yield {"content": content, "done": False}
+                        yield {"done": True}
+                        break
 
+                    try:
+                        data = sse.loads(data_str)
+                        if data.get("usage"):
+                            # include_usage: 마지막 청크(choices 비어 있음)에 토큰 사용량 포함
+                            yield {"usage": data["usage"], "done": False}
+                        if "choices" in data and len(data["choices"]) > 0:
+                            delta = data["choices"][0].get("delta", {})
+                            if delta.get("content"):
+                                # 이모지 다양화 적용
+                                content = emoji_filter.feed(delta['content'])
+                                if content:
+                                    yield {"content": content, "done": False}
+                    except json.JSONDecodeError:
+                        continue
+
+    except UpstreamBusy as e:
+        yield {"error": "요청이 많아 잠시 후 다시 시도해 주세요.", "retry_after": round(e.retry_after, 1)}
     except httpx.RequestError as e:
-        yield f"data: {json.dumps({'error': f'Request error: {str(e)}'})}\n\n"
+        yield {"error": f"Request error: {str(e)}"}
     except Exception as e:
-        yield f"data: {json.dumps({'error': f'Unexpected error: {str(e)}'})}\n\n"
+        yield {"error": f"Unexpected error: {str(e)}"}
 
 
 from pydantic import BaseModel, Field
@@ -252,10 +242,13 @@ class ChatStreamRequest(BaseModel):
     character_id: int = Field(..., description="Character ID from Django")
     user_message: str = Field(..., description="User's message")
     user_token: str = Field(default="", description="User's JWT token for Django API")
-    messages: list = Field(default=[], description="Previous message history [{'role': 'user|assistant', 'content': '...'}]")
+    messages: list = Field(default=[], description="(Deprecated) Previous message history - used only when server-side history is unavailable")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     max_tokens: int = Field(default=2000, ge=100, le=4000)
     save_to_db: bool = Field(default=True, description="Save messages to Django DB")
+    coalesce_ms: Optional[int] = Field(default=None, ge=0, le=1000, description="Merge deltas into one SSE frame every N ms (0 = per-delta frames, default from SSE_COALESCE_MS)")
+    coalesce_bytes: Optional[int] = Field(default=None, ge=1, le=65536, description="Flush a merged frame early once it reaches M bytes (default from SSE_COALESCE_BYTES)")
+    hedge: Optional[bool] = Field(default=None, description="Send a second upstream request if the first token is slower than p95 (default from ROUTER_HEDGE)")
 
 
 class ImageGenerationRequest(BaseModel):
@@ -265,6 +258,21 @@ class ImageGenerationRequest(BaseModel):
     size: str = Field(default="1024x1024", description="Image size (1024x1024, 1024x1792, 1792x1024)")
     quality: str = Field(default="standard", description="Quality (standard or hd)")
     save_to_db: bool = Field(default=True, description="Save to Django DB")
+    use_cache: bool = Field(default=False, description="Reuse a stored result for the same normalized prompt/size/quality/model")
+    idempotency_key: Optional[str] = Field(default=None, max_length=255, description="Client key; repeating it returns the existing job instead of generating again")
+
+
+async def persist_message(**message) -> str:
+    """
+    메시지를 write-behind 큐에 추가 (큐 사용 불가 시 Django에 직접 저장)
+
+    Returns:
+        메시지 client_id (컨텍스트 캐시가 Django 이력과 중복을 가려낼 때 사용)
+    """
+    message["client_id"] = uuid.uuid4().hex
+    if not message_writer.enqueue(**message):
+        await django_client.save_message(**message)
+    return message["client_id"]
 
 
 @app.post("/chat/stream")
@@ -273,14 +281,15 @@ async def chat_stream(request: ChatStreamRequest):
     Stream chat response from OpenAI
 
     1. Fetch character system prompt from Django API
-    2. Save user message to Django DB
-    3. Stream response from OpenAI
-    4. Save assistant response to Django DB
-    5. Return SSE stream
+    2. Build conversation context server-side (Character.context_length + token budget)
+    3. Queue user message for Django DB (write-behind)
+    4. Stream response from OpenAI
+    5. Queue assistant response for Django DB (write-behind)
+    6. Return SSE stream
     """
     try:
-        # 1. Fetch character system prompt from Django
-        character_data = await django_client.get_character(request.character_id)
+        # 1. Fetch character system prompt (cache -> Redis -> Django)
+        character_data = await character_cache.get(request.character_id, django_client.get_character)
         if not character_data:
             raise HTTPException(
                 status_code=404,
@@ -290,56 +299,122 @@ async def chat_stream(request: ChatStreamRequest):
         system_prompt = character_data.get("system_prompt", "You are a helpful assistant.")
         temperature = character_data.get("creativity", request.temperature)
         
-        # 2. Save user message to DB (optional)
+        # 2. Build context from server-side history (캐시 -> Django)
+        context_length = character_data.get("context_length") or DEFAULT_CONTEXT_LENGTH
+        history = None
+        if request.user_token:
+            history = await context_store.get_history(
+                request.conversation_id, request.user_token, context_length
+            )
+            if history == [] and character_data.get("greeting_message"):
+                # 새 대화: 화면에 보인 인사말을 첫 어시스턴트 메시지로 포함
+                history = [{"role": "assistant", "content": character_data["greeting_message"]}]
+        if history is None:
+            # 서버 측 이력을 가져올 수 없을 때만 클라이언트가 보낸 이력 사용 (구버전 호환)
+            history = request.messages[-context_length * 2:]
+        context = trim_to_budget(history, CONTEXT_TOKEN_BUDGET)
+        all_messages = context + [
+            {"role": "user", "content": request.user_message}
+        ]
+
+        # 응답 캐시 (캐릭터 opt-in, 맥락이 없거나 짧은 턴만)
+        cache_bucket = None
+        cached_answer = None
+        question_vectors = None
+        if response_cache.eligible(character_data, context):
+            cache_bucket = response_cache.bucket_key(request.character_id, system_prompt, context)
+            found, question_vectors = await response_cache.lookup(
+                cache_bucket, request.character_id, request.user_message
+            )
+            if found:
+                cached_answer, similarity = found
+                print(f"[FastAPI] Response cache hit (character {request.character_id}, similarity {similarity:.2f})")
+        
+        # 3. Queue user message for DB (optional, 스트림 시작을 기다리게 하지 않음)
         if request.save_to_db:
-            await django_client.save_message(
+            client_id = await persist_message(
                 conversation_id=request.conversation_id,
                 role="user",
                 content=request.user_message,
                 user_token=request.user_token,
+                token_usage=count_tokens(request.user_message),
                 model_version=OPENAI_MODEL,
             )
-        
-        # 3. Prepare messages for OpenAI
-        all_messages = request.messages + [{"role": "user", "content": request.user_message}]
+            context_store.append(
+                request.conversation_id, request.user_token, "user", request.user_message, client_id
+            )
         
         # 4. Stream response and collect for saving
         collected_response = []
+        upstream_usage = {}
+        route = {}
         
         async def stream_and_collect():
-            """Stream from OpenAI and collect response"""
-            async for chunk in stream_chat_response(
-                messages=all_messages,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                max_tokens=request.max_tokens,
-            ):
-                # Parse SSE chunk
-                if chunk.startswith("data: "):
-                    try:
-                        data = json.loads(chunk[6:])
-                        if data.get("content"):
-                            collected_response.append(data["content"])
-                    except:
-                        pass
+            """Stream from OpenAI and collect response (이벤트 dict 그대로 수집, 재파싱 없음)"""
+            if cached_answer is not None:
+                route.update(provider="response_cache")
+                source = response_cache.replay(cached_answer)
+            else:
+                source = stream_chat_response(
+                    messages=all_messages,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=request.max_tokens,
+                    emoji_filter=emoji_history.diversifier(request.conversation_id),
+                    hedge=ROUTER_HEDGE if request.hedge is None else request.hedge,
+                    route=route,
+                )
+
+            completed = False
+            async for event in source:
+                if "content" in event:
+                    collected_response.append(event["content"])
+                elif "usage" in event:
+                    upstream_usage.update(event["usage"])
+                elif event.get("done"):
+                    completed = True
                 
-                yield chunk
+                yield event
+
+            # 정상 완료된 답변만 캐시에 저장
+            if cache_bucket is not None and cached_answer is None and completed and collected_response:
+                await response_cache.store(
+                    cache_bucket, request.user_message, "".join(collected_response), question_vectors
+                )
             
-            # 5. Save assistant response to DB after streaming completes
+            # 5. Queue assistant response for DB after streaming completes
             if request.save_to_db and collected_response:
                 full_response = "".join(collected_response)
-                await django_client.save_message(
+                usage = build_usage(
+                    [{"role": "system", "content": system_prompt}, *all_messages],
+                    full_response,
+                    upstream_usage,
+                )
+                client_id = await persist_message(
                     conversation_id=request.conversation_id,
                     role="assistant",
                     content=full_response,
                     user_token=request.user_token,
-                    token_usage=len(full_response.split()),  # 간단한 토큰 추정
-                    model_version=OPENAI_MODEL,
+                    token_usage=usage["total_tokens"],
+                    model_version=route.get("model", OPENAI_MODEL),
+                    metadata={"usage": usage, "provider": route.get("provider")},
+                )
+                context_store.append(
+                    request.conversation_id, request.user_token, "assistant", full_response, client_id
                 )
         
+        events = stream_and_collect()
+        coalesce_ms = SSE_COALESCE_MS if request.coalesce_ms is None else request.coalesce_ms
+        if coalesce_ms > 0:
+            events = sse.coalesce_events(
+                events,
+                interval_ms=coalesce_ms,
+                max_bytes=request.coalesce_bytes or SSE_COALESCE_BYTES,
+            )
+
         # Return SSE stream
         return StreamingResponse(
-            stream_and_collect(),
+            sse.encode_stream(events),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -372,7 +447,18 @@ async def generate_image(request: ImageGenerationRequest):
     job_id = None
 
     try:
+        # 0. 캐시 조회 (opt-in)
+        cache_key = None
+        cached = None
+        if request.use_cache:
+            cache_key = image_cache.key(request.prompt, request.size, request.quality, DALLE_MODEL)
+            cached = await image_cache.get(
+                cache_key,
+                price=image_price(DALLE_MODEL, request.quality, request.size),
+            )
+
         # 1. Create generation job in Django (status: pending)
+        job_data = None
         if request.save_to_db and request.user_token:
             job_data = await django_client.create_generation_job(
                 user_token=request.user_token,
@@ -382,13 +468,56 @@ async def generate_image(request: ImageGenerationRequest):
                     "size": request.size,
                     "quality": request.quality,
                     "model": DALLE_MODEL,
-                }
+                },
+                idempotency_key=request.idempotency_key,
             )
             if job_data:
                 job_id = job_data.get("id")
         elif request.save_to_db:
             print("[FastAPI] Warning: save_to_db=True but no user_token provided")
 
+        # 같은 idempotency_key로 이미 큐잉/완료된 작업: 다시 생성하지 않고 기존 작업 반환
+        if request.idempotency_key and job_data and (
+            job_data.get("celery_task_id") or job_data.get("status") == "completed"
+        ):
+            existing_task_id = job_data.get("celery_task_id")
+            print(f"[FastAPI] Idempotent replay (Job ID: {job_id}, Task ID: {existing_task_id})")
+            replay = {
+                "job_id": job_id,
+                "task_id": existing_task_id,
+                "status": job_data.get("status"),
+                "idempotent_replay": True,
+                "success": True,
+            }
+            if job_data.get("status") == "completed":
+                replay["url"] = (job_data.get("result_data") or {}).get("url")
+            elif existing_task_id:
+                replay["check_url"] = f"/image/status/{existing_task_id}"
+                replay["stream_url"] = f"/image/status/{existing_task_id}/stream"
+            return replay
+
+        # 캐시 적중: 생성하지 않고 저장된 결과(기존 MediaAsset)로 바로 완료
+        if cached:
+            print(f"[FastAPI] Image cache hit (Job ID: {job_id})")
+            if job_id:
+                await django_client.update_generation_job(
+                    job_id=job_id,
+                    status="completed",
+                    result_data={**cached, "cached": True},
+                    user_token=request.user_token,
+                    stage="recorded",
+                )
+            return {
+                "job_id": job_id,
+                "task_id": None,
+                "status": "completed",
+                "url": cached["url"],
+                "revised_prompt": cached.get("revised_prompt"),
+                "model": cached.get("model"),
+                "cached": True,
+                "success": True,
+            }
+
         # 2. Celery 비동기 작업으로 전환
         print(f"[FastAPI] Queueing image generation task (Job ID: {job_id})")
 
@@ -405,26 +534,42 @@ async def generate_image(request: ImageGenerationRequest):
             except Exception as e:
                 print(f"[FastAPI] Failed to extract user_id from token: {e}")
 
-        # Celery 태스크 큐에 추가
-        task = generate_image_task.delay(
-            prompt=request.prompt,
-            size=request.size,
-            quality=request.quality,
-            job_id=job_id,
-            user_id=user_id,
-            user_token=request.user_token,
+        # 공정 스케줄링: 역할/조직은 Django 작업 생성 응답 기준
+        tenant = build_tenant(
+            user_id,
+            organization_id=(job_data or {}).get("organization"),
+            role=(job_data or {}).get("user_role", ""),
         )
+        task_id = str(uuid.uuid4())
+        options = await image_scheduler.plan(tenant, task_id)
 
-        print(f"[FastAPI] Task queued: {task.id}")
-
-        # processing 상태로 변경
+        # processing 상태로 변경 및 태스크 연결 (워커의 완료 기록보다 먼저 반영되도록 큐잉 전에 수행)
         if job_id and request.save_to_db and request.user_token:
             await django_client.update_generation_job(
                 job_id=job_id,
                 status="processing",
-                user_token=request.user_token
+                user_token=request.user_token,
+                celery_task_id=task_id,
             )
 
+        # Celery 태스크 큐에 추가
+        task = generate_image_task.apply_async(
+            kwargs={
+                "prompt": request.prompt,
+                "size": request.size,
+                "quality": request.quality,
+                "job_id": job_id,
+                "user_id": user_id,
+                "user_token": request.user_token,
+                "cache_key": cache_key,
+                "tenant": tenant,
+            },
+            task_id=task_id,
+            **options,
+        )
+
+        print(f"[FastAPI] Task queued: {task.id} ({options['queue']}, priority {options['priority']})")
+
         # 3. 즉시 응답 (작업은 백그라운드에서 처리)
         return {
             "job_id": job_id,
@@ -432,6 +577,7 @@ async def generate_image(request: ImageGenerationRequest):
             "status": "processing",
             "message": "Image generation queued. Check status with /image/status/{task_id}",
             "check_url": f"/image/status/{task.id}",
+            "stream_url": f"/image/status/{task.id}/stream",
             "success": True
         }
 
@@ -452,7 +598,7 @@ async def generate_image(request: ImageGenerationRequest):
 @app.get("/image/status/{task_id}")
 async def get_image_status(task_id: str):
     """
-    Celery 작업 상태 확인
+    Celery 작업 상태 확인 (한 번 조회, 실시간 상태는 /image/status/{task_id}/stream 사용)
 
     Returns: {
         "task_id": str,
@@ -461,30 +607,8 @@ async def get_image_status(task_id: str):
         "error": str (실패 시)
     }
     """
-    from .celery_app import celery_app
-
     try:
-        task = celery_app.AsyncResult(task_id)
-
-        response = {
-            "task_id": task_id,
-            "status": task.status,
-            "state": task.state,
-        }
-
-        if task.successful():
-            response["result"] = task.result
-            response["success"] = True
-        elif task.failed():
-            response["error"] = str(task.info)
-            response["success"] = False
-        elif task.state == "PROGRESS":
-            response["current"] = task.info.get("current", 0)
-            response["total"] = task.info.get("total", 100)
-            response["status_message"] = task.info.get("status", "Processing...")
-
-        return response
-
+        return await asyncio.to_thread(task_status, task_id)
     except Exception as e:
         raise HTTPException(
             status_code=404,
@@ -492,6 +616,24 @@ async def get_image_status(task_id: str):
         )
 
 
+@app.get("/image/status/{task_id}/stream")
+async def stream_image_status(task_id: str):
+    """
+    Celery 작업 상태 SSE 스트림
+
+    현재 상태를 먼저 보내고, 이후 PROGRESS/SUCCESS/FAILURE 변경을 Redis pub/sub으로 전달
+    최종 상태(SUCCESS/FAILURE)를 보낸 뒤 스트림 종료
+    """
+    return StreamingResponse(
+        sse.encode_stream(stream_status(task_id)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
 if __name__ == "__main__":
     import socket
 
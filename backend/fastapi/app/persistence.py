@@ -0,0 +1,189 @@
+"""
+채팅 메시지 write-behind 저장
+
+채팅 턴의 메시지를 Django에 바로 저장하지 않고 로컬 비동기 큐에 넣은 뒤,
+백그라운드 태스크가 모아서 일괄 저장 엔드포인트로 전송
+- 첫 토큰까지의 시간이 Django 쓰기 지연에 영향받지 않음
+- (사용자 토큰, 대화) 단위로 묶어 bulk_add_messages 1회 (bulk_create 1회)로 저장
+  (한 대화가 거절돼도(삭제/권한 4xx) 다른 대화의 메시지는 저장)
+- 메시지마다 client_id(멱등 키)를 붙여, Django가 커밋한 뒤 타임아웃으로 재전송해도 중복 저장되지 않음
+- 단일 소비자이므로 같은 대화의 메시지 순서 유지
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .django_client import django_client
+
+
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "50"))
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.5"))  # 초
+MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", "10000"))
+MESSAGE_MAX_RETRIES = int(os.getenv("MESSAGE_MAX_RETRIES", "3"))
+
+
+class MessageWriter:
+    """메시지 write-behind 큐"""
+
+    def __init__(
+        self,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+        max_queue: int = MESSAGE_QUEUE_SIZE,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 아직 Django 저장이 끝나지 않은 메시지 (client_id -> (user_token, message), 큐에 넣은 순서)
+        self._pending: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+
+        # 메트릭
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+
+    async def start(self) -> None:
+        """백그라운드 flush 태스크 시작 (lifespan 시작 시 호출)"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """남은 메시지를 모두 저장한 뒤 종료 (lifespan 종료 시 호출)"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None  # 이후 enqueue는 직접 저장으로 전환
+        print(f"[Message Writer] Flushing {self._queue.qsize()} pending messages before shutdown")
+        await self._queue.put(None)
+        await task
+
+    def enqueue(
+        self,
+        conversation_id: int,
+        user_token: str,
+        role: str,
+        content: str,
+        token_usage: int = 0,
+        model_version: str = "",
+        metadata: Dict = None,
+        client_id: Optional[str] = None,
+    ) -> bool:
+        """
+        메시지를 저장 큐에 추가
+
+        Args:
+            client_id: 멱등 키 (없으면 생성)
+
+        Returns:
+            큐에 들어가면 True, 워커가 없거나 큐가 가득 차면 False (호출 측에서 직접 저장)
+        """
+        if self._task is None or self._queue.full():
+            return False
+
+        message = {
+            "client_id": client_id or uuid.uuid4().hex,
+            "conversation": conversation_id,
+            "role": role,
+            "content": content,
+            "token_usage": token_usage,
+            "model_version": model_version,
+            "metadata": metadata or {},
+        }
+        self._queue.put_nowait((user_token or "", message))
+        self._pending[message["client_id"]] = (user_token or "", message)
+        self._enqueued += 1
+        return True
+
+    def pending(self, conversation_id: int, user_token: str) -> List[Dict[str, Any]]:
+        """대화에서 아직 Django에 저장되지 않은 메시지 (저장 중인 배치 포함, 큐에 넣은 순서)"""
+        return [
+            message for token, message in self._pending.values()
+            if token == (user_token or "") and message["conversation"] == conversation_id
+        ]
+
+    async def _run(self) -> None:
+        """큐에서 batch_size 또는 flush_interval 단위로 모아 저장 (None 수신 시 종료)"""
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        (사용자 토큰, 대화) 단위로 묶어 일괄 저장
+        (Django 인증이 사용자별이고, 거절은 대화 단위로 격리)
+        """
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for user_token, message in batch:
+            groups.setdefault((user_token, message["conversation"]), []).append(message)
+
+        for (user_token, conversation_id), messages in groups.items():
+            await self._write(user_token, conversation_id, messages)
+
+    async def _write(self, user_token: str, conversation_id: int, messages: List[Dict[str, Any]]) -> None:
+        try:
+            await self._send(user_token, conversation_id, messages)
+        finally:
+            for message in messages:
+                self._pending.pop(message["client_id"], None)
+
+    async def _send(self, user_token: str, conversation_id: int, messages: List[Dict[str, Any]]) -> None:
+        # 재시도는 같은 client_id로 보내므로 이전 시도가 커밋됐어도 중복 저장되지 않음
+        for attempt in range(MESSAGE_MAX_RETRIES + 1):
+            try:
+                result = await django_client.save_messages(
+                    messages=messages,
+                    user_token=user_token,
+                )
+                if result is None:
+                    print(f"[Message Writer] ❌ Dropping {len(messages)} messages for conversation {conversation_id}")
+                    self._dropped += len(messages)
+                else:
+                    self._written += len(messages)
+                    self._batches += 1
+                return
+            except Exception as e:
+                print(f"[Message Writer] Batch save failed (attempt {attempt + 1}): {e}")
+                if attempt < MESSAGE_MAX_RETRIES:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        print(f"[Message Writer] ❌ Dropping batch of {len(messages)} messages for conversation {conversation_id}")
+        self._dropped += len(messages)
+
+    def metrics(self) -> Dict[str, Any]:
+        """큐 메트릭"""
+        return {
+            "running": self._task is not None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "batches": self._batches,
+            "dropped": self._dropped,
+        }
+
+
+# 싱글톤 인스턴스
+message_writer = MessageWriter()
@@ -9,14 +9,20 @@ RQ (Redis Queue)를 사용한 비동기 작업 처리:
 import os
 from typing import Optional
 import redis
-from rq import Queue
+import redis.asyncio as aioredis
+
+try:
+    from rq import Queue
+except ImportError:  # RQ 미설치 시 큐 없이 Redis 클라이언트만 사용
+    Queue = None
 
 # Redis 연결 설정
 REDIS_URL = os.getenv("REDIS_URL", "")
 
 # Redis 클라이언트 초기화
 redis_client: Optional[redis.Redis] = None
-image_queue: Optional[Queue] = None
+image_queue: Optional["Queue"] = None
+async_redis_client: Optional[aioredis.Redis] = None
 
 if REDIS_URL:
     try:
@@ -31,11 +37,12 @@ if REDIS_URL:
         # 연결 테스트
         redis_client.ping()
         
-        # 이미지 생성 전용 큐
-        image_queue = Queue('image_generation', connection=redis_client)
-        
         print(f"[Redis] Connected to Redis: {REDIS_URL[:30]}...")
-        print(f"[Redis] Image queue initialized")
+
+        # 이미지 생성 전용 큐
+        if Queue is not None:
+            image_queue = Queue('image_generation', connection=redis_client)
+            print(f"[Redis] Image queue initialized")
     except Exception as e:
         print(f"[Redis] Connection failed: {e}")
         print(f"[Redis] Running without Redis - synchronous mode")
@@ -50,7 +57,24 @@ def get_redis() -> Optional[redis.Redis]:
     return redis_client
 
 
-def get_image_queue() -> Optional[Queue]:
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """비동기 Redis 클라이언트 반환 (FastAPI 이벤트 루프에서 사용)"""
+    global async_redis_client
+
+    if redis_client is None:
+        return None
+
+    if async_redis_client is None:
+        async_redis_client = aioredis.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+        )
+    return async_redis_client
+
+
+def get_image_queue() -> Optional["Queue"]:
     """이미지 생성 큐 반환"""
     return image_queue
 
@@ -0,0 +1,260 @@
+"""
+채팅 응답 캐시 (유사 질문)
+
+같은 반 학생들이 같은 캐릭터에게 거의 같은 질문("광합성이 뭐야?")을 반복할 때
+업스트림 호출 없이 저장된 답변을 스트림으로 재생
+- 캐릭터별 opt-in (Character.response_cache_enabled)
+- 대화 맥락이 없거나 짧은 턴에만 사용 (맥락은 인사말 포함 RESPONSE_CACHE_MAX_CONTEXT개 메시지 이하)
+- 버킷: 캐릭터 ID + 시스템 프롬프트 해시 + 맥락 해시 (프롬프트나 맥락이 다르면 공유하지 않음)
+- 버킷 안에서 정규화한 질문이 같으면 바로 적중, 아니면 질문 벡터 코사인 유사도로 검색
+  (RESPONSE_CACHE_EMBEDDING_MODEL 설정 시 임베딩 API, 아니면 문자 n-gram 벡터)
+- 질문에 들어 있는 숫자가 다르면 유사도와 관계없이 적중으로 보지 않음 ("1592년" / "1598년")
+- 인덱스는 프로세스 내 메모리 (버킷별 LRU + TTL)
+"""
+
+import hashlib
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .image_cache import normalize_prompt
+
+
+# 임베딩 모델 (비우면 로컬 n-gram 벡터만 사용)
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "")
+RESPONSE_CACHE_EMBEDDING_TIMEOUT = float(os.getenv("RESPONSE_CACHE_EMBEDDING_TIMEOUT", "2"))  # 초
+# 코사인 유사도 기준 (벡터 종류별로 분포가 달라 따로 설정)
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.9"))  # n-gram
+RESPONSE_CACHE_EMBEDDING_THRESHOLD = float(os.getenv("RESPONSE_CACHE_EMBEDDING_THRESHOLD", "0.92"))
+RESPONSE_CACHE_MAX_CONTEXT = int(os.getenv("RESPONSE_CACHE_MAX_CONTEXT", "1"))  # 허용할 이전 메시지 수
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))  # 초
+RESPONSE_CACHE_BUCKET_SIZE = int(os.getenv("RESPONSE_CACHE_BUCKET_SIZE", "256"))  # 버킷당 답변 수
+RESPONSE_CACHE_MAX_BUCKETS = int(os.getenv("RESPONSE_CACHE_MAX_BUCKETS", "1000"))
+REPLAY_CHUNK_CHARS = 24  # 재생 시 content 이벤트 크기
+
+NGRAM_SIZES = (1, 2)
+NGRAM = "ngram"
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+# 벡터: 차원(n-gram 또는 임베딩 인덱스) -> L2 정규화된 가중치
+Vector = Dict[Any, float]
+
+
+def embed(text: str) -> Vector:
+    """문자 n-gram 빈도 벡터 (L2 정규화, 공백 무시)"""
+    compact = normalize_prompt(text).replace(" ", "")
+    grams: Counter = Counter()
+    for n in NGRAM_SIZES:
+        if len(compact) < n:
+            # n보다 짧은 질문은 전체를 하나의 n-gram으로
+            if compact:
+                grams[compact] += 1
+            continue
+        grams.update(compact[i:i + n] for i in range(len(compact) - n + 1))
+    norm = math.sqrt(sum(count * count for count in grams.values())) or 1.0
+    return {gram: count / norm for gram, count in grams.items()}
+
+
+def numbers(text: str) -> Tuple[str, ...]:
+    """질문에 들어 있는 숫자 (연도, 수량 등 - 하나만 달라도 다른 질문)"""
+    return tuple(_NUMBER.findall(normalize_prompt(text)))
+
+
+def _normalize(values: List[float]) -> Vector:
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return {i: v / norm for i, v in enumerate(values)}
+
+
+async def embed_remote(text: str) -> Optional[Vector]:
+    """임베딩 API로 질문 벡터 계산 (실패 시 None)"""
+    from .governor import INTERACTIVE
+    from .tokens import count_tokens
+    from .upstream import upstream_client
+
+    try:
+        response = await upstream_client.request(
+            "POST",
+            "/embeddings",
+            lane=INTERACTIVE,
+            tokens=count_tokens(text),
+            json={"model": RESPONSE_CACHE_EMBEDDING_MODEL, "input": text},
+            timeout=RESPONSE_CACHE_EMBEDDING_TIMEOUT,
+        )
+        if response.status_code != 200:
+            print(f"[Response Cache] Embedding failed: {response.status_code}")
+            return None
+        return _normalize(response.json()["data"][0]["embedding"])
+    except Exception as e:  # 속도 제한 예산 부족(UpstreamBusy) 포함
+        print(f"[Response Cache] Embedding failed: {e!r}")
+        return None
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class _Entry:
+    __slots__ = ("question", "numbers", "vectors", "answer", "expires_at", "hits")
+
+    def __init__(self, question: str, vectors: Dict[str, Vector], answer: str, expires_at: float):
+        self.question = question
+        self.numbers = numbers(question)
+        self.vectors = vectors  # 벡터 종류(ngram / 임베딩 모델) -> 벡터
+        self.answer = answer
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class ResponseCache:
+    """캐릭터별 유사 질문 답변 캐시"""
+
+    def __init__(self):
+        # bucket key -> (정규화 질문 -> 항목)
+        self._buckets: "OrderedDict[str, OrderedDict[str, _Entry]]" = OrderedDict()
+
+        # 메트릭
+        self._hits = 0
+        self._misses = 0
+        self._skipped = 0
+        self._stored = 0
+        self._by_character: Dict[int, List[int]] = {}  # character_id -> [hits, misses]
+
+    def eligible(self, character: Dict[str, Any], history: List[Dict[str, str]]) -> bool:
+        """캐시 사용 가능 여부 (캐릭터 opt-in + 맥락이 없거나 짧은 턴)"""
+        if not character.get("response_cache_enabled"):
+            return False
+        if len(history) > RESPONSE_CACHE_MAX_CONTEXT:
+            self._skipped += 1
+            return False
+        return True
+
+    def bucket_key(self, character_id: int, system_prompt: str, history: List[Dict[str, str]]) -> str:
+        """버킷 키 (캐릭터 + 시스템 프롬프트 + 맥락)"""
+        context = "\x1e".join(f"{m.get('role')}\x1f{m.get('content')}" for m in history)
+        return f"{character_id}:{_digest(system_prompt)}:{_digest(context)}"
+
+    def _record(self, character_id: int, hit: bool) -> None:
+        counts = self._by_character.setdefault(character_id, [0, 0])
+        counts[0 if hit else 1] += 1
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    async def vectors(self, question: str) -> Dict[str, Vector]:
+        """질문 벡터 (n-gram은 항상, 임베딩은 설정 시)"""
+        vectors = {NGRAM: embed(question)}
+        if RESPONSE_CACHE_EMBEDDING_MODEL:
+            remote = await embed_remote(question)
+            if remote is not None:
+                vectors[RESPONSE_CACHE_EMBEDDING_MODEL] = remote
+        return vectors
+
+    async def lookup(
+        self, bucket_key: str, character_id: int, question: str
+    ) -> Tuple[Optional[Tuple[str, float]], Optional[Dict[str, Vector]]]:
+        """
+        유사 질문의 답변 조회
+
+        Returns:
+            ((답변, 유사도) 또는 None, 계산한 질문 벡터 - 미스 후 store에 재사용)
+        """
+        bucket = self._buckets.get(bucket_key)
+        now = time.monotonic()
+        best: Optional[_Entry] = None
+        best_score = 0.0
+        vectors = None
+
+        if bucket is not None:
+            self._buckets.move_to_end(bucket_key)
+            for key, entry in list(bucket.items()):
+                if entry.expires_at <= now:
+                    del bucket[key]
+
+            exact = bucket.get(normalize_prompt(question))
+            if exact is not None:
+                best, best_score = exact, 1.0
+            elif bucket:
+                vectors = await self.vectors(question)
+                # 임베딩 벡터가 있으면 임베딩 기준으로만 비교
+                kind = RESPONSE_CACHE_EMBEDDING_MODEL if RESPONSE_CACHE_EMBEDDING_MODEL in vectors else NGRAM
+                threshold = RESPONSE_CACHE_THRESHOLD if kind == NGRAM else RESPONSE_CACHE_EMBEDDING_THRESHOLD
+                question_numbers = numbers(question)
+                for entry in bucket.values():
+                    if kind not in entry.vectors or entry.numbers != question_numbers:
+                        continue
+                    score = cosine(vectors[kind], entry.vectors[kind])
+                    if score >= threshold and score > best_score:
+                        best, best_score = entry, score
+
+        if best is None:
+            self._record(character_id, hit=False)
+            return None, vectors
+
+        best.hits += 1
+        self._record(character_id, hit=True)
+        return (best.answer, best_score), vectors
+
+    async def store(
+        self, bucket_key: str, question: str, answer: str, vectors: Optional[Dict[str, Vector]] = None
+    ) -> None:
+        """완료된 답변 저장"""
+        if not answer:
+            return
+        if vectors is None:
+            vectors = await self.vectors(question)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = OrderedDict()
+            while len(self._buckets) > RESPONSE_CACHE_MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+
+        normalized = normalize_prompt(question)
+        bucket[normalized] = _Entry(question, vectors, answer, time.monotonic() + RESPONSE_CACHE_TTL)
+        bucket.move_to_end(normalized)
+        while len(bucket) > RESPONSE_CACHE_BUCKET_SIZE:
+            bucket.popitem(last=False)
+        self._stored += 1
+
+    async def replay(self, answer: str) -> AsyncIterator[dict]:
+        """저장된 답변을 채팅 스트림과 같은 이벤트로 재생"""
+        for i in range(0, len(answer), REPLAY_CHUNK_CHARS):
+            yield {"content": answer[i:i + REPLAY_CHUNK_CHARS], "done": False}
+        yield {"done": True}
+
+    def metrics(self) -> Dict[str, Any]:
+        """적중률 (전체 / 캐릭터별)"""
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "skipped_long_context": self._skipped,
+            "stored": self._stored,
+            "buckets": len(self._buckets),
+            "entries": sum(len(bucket) for bucket in self._buckets.values()),
+            "characters": {
+                character_id: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+                for character_id, (hits, misses) in self._by_character.items()
+            },
+        }
+
+
+# 싱글톤 인스턴스
+response_cache = ResponseCache()
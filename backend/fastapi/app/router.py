@@ -0,0 +1,344 @@
+"""
+채팅 업스트림 라우터
+
+여러 OpenAI 호환 엔드포인트/모델 중 가장 빠르고 정상인 곳으로 채팅 요청을 보냄
+- 공급자 목록: UPSTREAM_PROVIDERS (JSON 배열), 없으면 OPENAI_BASE_URL / OPENAI_MODEL 하나만 사용
+  예: [{"name": "openai", "base_url": "https://api.openai.com/v1", "model": "gpt-4o"},
+       {"name": "azure", "base_url": "https://.../v1", "model": "gpt-4o", "api_key_env": "AZURE_OPENAI_KEY"}]
+- 공급자별 최근 첫 토큰 시간(TTFT)과 오류율을 기록하고, 오류율이 높으면 잠시 제외
+- 장애 조치: 첫 요청이 예외 / 429 / 5xx로 실패하면 다음 공급자로 한 번 더 시도 (다른 4xx는 그대로 전달)
+- 헤징(선택): 첫 요청이 p95 TTFT 안에 첫 토큰을 보내지 않으면 다음 공급자로 두 번째 요청을 보내고,
+  먼저 첫 토큰을 보낸 쪽만 사용 (나머지는 취소)
+- 공급자가 하나뿐이면 장애 조치/헤징 없이 그대로 전송
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+import httpx
+
+from .governor import UpstreamBusy
+from .upstream import OPENAI_API_KEY, OPENAI_BASE_URL, UpstreamClient, upstream_client
+
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+UPSTREAM_PROVIDERS = os.getenv("UPSTREAM_PROVIDERS", "")
+
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))  # 공급자별 최근 요청 수
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+ROUTER_MIN_SAMPLES = 5  # 오류율 판단에 필요한 최소 요청 수
+ROUTER_COOLDOWN = float(os.getenv("ROUTER_COOLDOWN", "30"))  # 제외 후 다시 시도하기까지 (초)
+ROUTER_HEDGE = os.getenv("ROUTER_HEDGE", "false").lower() == "true"  # 요청에서 지정하지 않을 때 기본값
+ROUTER_HEDGE_MIN_DELAY = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.2"))  # 초
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", "2.0"))  # TTFT 기록이 없을 때
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Provider:
+    """OpenAI 호환 엔드포인트 + 모델 하나"""
+
+    def __init__(self, name: str, client: UpstreamClient, model: str):
+        self.name = name
+        self.client = client
+        self.model = model
+
+        self._ttft: Deque[float] = deque(maxlen=ROUTER_WINDOW)
+        self._outcomes: Deque[bool] = deque(maxlen=ROUTER_WINDOW)  # True = 오류
+        self._unhealthy_until = 0.0
+        self.requests = 0
+        self.hedges_won = 0
+
+    def record_success(self, ttft: float) -> None:
+        self._ttft.append(ttft)
+        self._outcomes.append(False)
+
+    def record_error(self) -> None:
+        self._outcomes.append(True)
+        if len(self._outcomes) >= ROUTER_MIN_SAMPLES and self.error_rate > ROUTER_MAX_ERROR_RATE:
+            if not self.cooling_down:
+                print(f"[Router] {self.name} error rate {self.error_rate:.0%}, excluding for {ROUTER_COOLDOWN}s")
+            self._unhealthy_until = time.monotonic() + ROUTER_COOLDOWN
+            # 쿨다운 후에는 새 기록으로 다시 판단
+            self._outcomes.clear()
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self._unhealthy_until
+
+    def ttft(self, q: float) -> Optional[float]:
+        return _percentile(list(self._ttft), q)
+
+    def metrics(self) -> Dict[str, Any]:
+        p50, p95 = self.ttft(0.5), self.ttft(0.95)
+        return {
+            "base_url": self.client.base_url,
+            "model": self.model,
+            "healthy": not self.cooling_down,
+            "requests": self.requests,
+            "error_rate": round(self.error_rate, 4),
+            "ttft_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "ttft_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class RoutedResponse:
+    """선택된 공급자의 스트리밍 응답 (첫 토큰 확인을 위해 읽은 줄을 먼저 돌려줌)"""
+
+    def __init__(self, provider: Provider, response: httpx.Response, lines: AsyncIterator[str], buffered: List[str]):
+        self.provider = provider
+        self.response = response
+        self.status_code = response.status_code
+        self._lines = lines
+        self._buffered = buffered
+
+    async def aread(self) -> bytes:
+        return await self.response.aread()
+
+    async def aiter_lines(self) -> AsyncIterator[str]:
+        for line in self._buffered:
+            yield line
+        self._buffered = []
+        async for line in self._lines:
+            yield line
+
+
+class _Attempt:
+    """한 공급자로 보낸 요청 (첫 data 줄까지 읽은 상태)"""
+
+    def __init__(self, provider: Provider, hedged: bool = False):
+        self.provider = provider
+        self.hedged = hedged
+        self.stack = AsyncExitStack()
+        self.routed: Optional[RoutedResponse] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.routed is not None and self.routed.status_code == 200
+
+    @property
+    def retryable(self) -> bool:
+        """다른 공급자로 다시 보낼 만한 실패인지 (429 / 5xx, 요청 자체의 4xx는 어디서든 같은 결과)"""
+        status = self.routed.status_code if self.routed is not None else None
+        return status is not None and (status == 429 or status >= 500)
+
+    async def open(self, payload: Dict[str, Any], lane: Optional[str], tokens: int) -> "_Attempt":
+        provider = self.provider
+        provider.requests += 1
+        started = time.monotonic()
+        try:
+            response = await self.stack.enter_async_context(provider.client.stream(
+                "POST",
+                "/chat/completions",
+                lane=lane,
+                tokens=tokens,
+                json={**payload, "model": provider.model},
+            ))
+            lines = response.aiter_lines()
+            buffered: List[str] = []
+            if response.status_code == 200:
+                # 첫 data 줄(첫 토큰 또는 역할 델타)까지 읽어 TTFT 측정
+                async for line in lines:
+                    buffered.append(line)
+                    if line.startswith("data: "):
+                        break
+            self.routed = RoutedResponse(provider, response, lines, buffered)
+        except (asyncio.CancelledError, UpstreamBusy):
+            # 취소(헤지 패배) / 속도 제한 예산 부족은 공급자 오류로 보지 않음
+            await self.close()
+            raise
+        except Exception:
+            provider.record_error()
+            await self.close()
+            raise
+
+        if response.status_code == 200:
+            provider.record_success(time.monotonic() - started)
+        elif response.status_code == 429 or response.status_code >= 500:
+            provider.record_error()
+        return self
+
+    async def close(self) -> None:
+        try:
+            await self.stack.aclose()
+        except Exception:
+            pass
+
+
+class ProviderRouter:
+    """TTFT/오류율 기반 공급자 선택 및 헤징"""
+
+    def __init__(self, providers: List[Provider]):
+        self.providers = providers
+
+        # 메트릭
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    @classmethod
+    def from_env(cls) -> "ProviderRouter":
+        """UPSTREAM_PROVIDERS 설정으로 생성 (기본 공급자는 공유 upstream_client 사용)"""
+        if not UPSTREAM_PROVIDERS:
+            return cls([Provider("default", upstream_client, OPENAI_MODEL)])
+
+        providers = []
+        for i, spec in enumerate(json.loads(UPSTREAM_PROVIDERS)):
+            base_url = spec.get("base_url", OPENAI_BASE_URL)
+            api_key = spec.get("api_key") or os.getenv(spec.get("api_key_env", ""), "") or OPENAI_API_KEY
+            if base_url == upstream_client.base_url and api_key == upstream_client.api_key:
+                client = upstream_client
+            else:
+                client = UpstreamClient(base_url=base_url, api_key=api_key)
+            providers.append(Provider(spec.get("name", f"provider-{i}"), client, spec.get("model", OPENAI_MODEL)))
+        return cls(providers)
+
+    async def start(self) -> None:
+        """공급자별 커넥션 풀 생성 (lifespan 시작 시 호출)"""
+        for client in {id(p.client): p.client for p in self.providers}.values():
+            await client.start()
+
+    async def aclose(self) -> None:
+        """공급자별 커넥션 풀 종료"""
+        for client in {id(p.client): p.client for p in self.providers}.values():
+            await client.aclose()
+
+    def ranked(self) -> List[Provider]:
+        """
+        정상 공급자를 오류율로 보정한 p50 TTFT 순으로 정렬
+        (아직 요청하지 않은 공급자를 먼저 시도, 모두 제외 상태면 전체)
+        """
+        healthy = [p for p in self.providers if not p.cooling_down] or list(self.providers)
+
+        def key(provider: Provider):
+            if not provider.requests:
+                return (0, 0.0)
+            p50 = provider.ttft(0.5)
+            return (1, float("inf") if p50 is None else p50 * (1 + provider.error_rate))
+
+        return sorted(healthy, key=key)
+
+    def _hedge_delay(self, provider: Provider) -> float:
+        p95 = provider.ttft(0.95)
+        if p95 is None:
+            return ROUTER_HEDGE_DEFAULT_DELAY
+        return max(p95, ROUTER_HEDGE_MIN_DELAY)
+
+    @asynccontextmanager
+    async def stream_chat(
+        self,
+        payload: Dict[str, Any],
+        lane: Optional[str] = None,
+        tokens: int = 0,
+        hedge: bool = False,
+    ) -> AsyncIterator[RoutedResponse]:
+        """
+        채팅 스트리밍 요청을 가장 빠른 공급자로 전송
+
+        Args:
+            payload: chat/completions 요청 본문 (model은 공급자 모델로 교체)
+            lane / tokens: 속도 제한 레인과 예상 토큰 수 (UpstreamClient.stream과 동일)
+            hedge: 첫 토큰이 p95 TTFT 안에 오지 않으면 다음 공급자로 중복 요청
+        """
+        ranked = self.ranked()
+        primary = ranked[0]
+        # 공급자가 하나뿐이면 헤징/장애 조치 없음 (같은 엔드포인트로 유료 요청을 중복해서 보내지 않음)
+        secondary = ranked[1] if len(ranked) > 1 else None
+
+        attempts: Dict[asyncio.Task, _Attempt] = {}
+
+        def launch(provider: Provider, hedged: bool = False) -> None:
+            attempt = _Attempt(provider, hedged)
+            attempts[asyncio.ensure_future(attempt.open(payload, lane, tokens))] = attempt
+
+        launch(primary)
+        timeout = self._hedge_delay(primary) if hedge and secondary is not None else None
+        failed_over = False
+        winner: Optional[_Attempt] = None
+        fallback: Optional[_Attempt] = None  # 모두 실패 시 그대로 전달할 오류 응답
+        last_error: Optional[BaseException] = None
+        try:
+            while winner is None:
+                pending = {task for task in attempts if not task.done()}
+                if not pending:
+                    if secondary is None or failed_over or len(attempts) > 1:
+                        break
+                    if fallback is not None and not fallback.retryable:
+                        # 400/401/422 등은 다른 공급자로 보내도 같은 결과이므로 그대로 전달
+                        break
+                    # 첫 요청이 예외 / 429 / 5xx로 실패하면 다음 공급자로 한 번 더 시도
+                    failed_over = True
+                    print(f"[Router] {primary.name} failed, failing over to {secondary.name}")
+                    launch(secondary)
+                    continue
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 헤지 지연 초과: 두 번째 요청 시작 (한 번만)
+                    self._hedged += 1
+                    print(f"[Router] Hedging {primary.name} -> {secondary.name} after {timeout:.2f}s")
+                    launch(secondary, hedged=True)
+                    timeout = None
+                    continue
+                timeout = None
+
+                for task in done:
+                    attempt = attempts[task]
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                    elif attempt.ok and winner is None:
+                        winner = attempt
+                    else:
+                        if fallback is not None:
+                            await fallback.close()
+                        fallback = attempt
+        finally:
+            for task, attempt in attempts.items():
+                if attempt is winner or (winner is None and attempt is fallback):
+                    continue
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except BaseException:
+                        pass
+                await attempt.close()
+
+        if winner is None:
+            winner = fallback
+        if winner is None:
+            raise last_error or httpx.RequestError("No upstream provider available")
+        if winner.hedged and winner.ok:
+            self._hedge_wins += 1
+            winner.provider.hedges_won += 1
+
+        try:
+            yield winner.routed
+        finally:
+            await winner.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """공급자별 TTFT / 오류율 및 헤징 통계"""
+        return {
+            "providers": {p.name: p.metrics() for p in self.providers},
+            "hedged_requests": self._hedged,
+            "hedge_wins": self._hedge_wins,
+        }
+
+
+# 싱글톤 인스턴스
+provider_router = ProviderRouter.from_env()
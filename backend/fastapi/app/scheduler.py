@@ -0,0 +1,180 @@
+"""
+이미지 생성 작업 공정 스케줄링
+
+한 사용자가 프롬프트를 수십 개 보내도 반 전체가 막히지 않도록 사용자/조직 단위로 공정하게 배분
+- 큐잉 시점 (/image/generate): 사용자/조직의 대기+실행 작업 수로 메시지 우선순위 결정
+  (N번째 작업은 우선순위 N → 모든 사용자의 첫 작업이 두 번째 작업보다 먼저 처리되는 가중 라운드로빈)
+- 교사/관리자는 별도 레인 큐(images.priority)와 한 단계 높은 우선순위 사용
+- 워커 시작 시점: 사용자/조직별 동시 실행 수 상한, 초과 시 잠시 후 같은 우선순위로 다시 큐잉
+- 상태는 Redis sorted set (task_id -> 시각)으로 관리하며, 오래된 항목은 유실된 작업으로 보고 정리
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+from celery.exceptions import Ignore
+
+from .redis_client import get_async_redis, get_redis
+
+
+IMAGE_QUEUE = os.getenv("IMAGE_QUEUE", "images")
+IMAGE_PRIORITY_QUEUE = os.getenv("IMAGE_PRIORITY_QUEUE", "images.priority")
+PRIORITY_ROLES = {"teacher", "admin"}
+
+PRIORITY_LEVELS = 10  # 0(가장 높음) ~ 9
+IMAGE_ORG_FAIR_SHARE = int(os.getenv("IMAGE_ORG_FAIR_SHARE", "4"))  # 조직 작업이 이만큼 쌓일 때마다 한 단계 낮춤
+IMAGE_USER_CONCURRENCY = int(os.getenv("IMAGE_USER_CONCURRENCY", "2"))
+IMAGE_ORG_CONCURRENCY = int(os.getenv("IMAGE_ORG_CONCURRENCY", "8"))
+IMAGE_DEFER_SECONDS = float(os.getenv("IMAGE_DEFER_SECONDS", "2"))
+IMAGE_SCHEDULER_STALE = float(os.getenv("IMAGE_SCHEDULER_STALE", "1800"))  # 이보다 오래된 항목은 정리 (초)
+
+ACTIVE_KEY = "image_sched:active:{tenant}"  # 대기 + 실행 중
+RUNNING_KEY = "image_sched:running:{tenant}"  # 실행 중
+
+# 사용자/조직 동시 실행 수를 확인하고 슬롯 확보 (원자적으로 처리)
+# KEYS: 사용자 running, 조직 running / ARGV: now, stale_before, task_id, user_cap, org_cap, has_org
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZSCORE', KEYS[1], ARGV[3]) then
+    return 1
+end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+    return 0
+end
+if ARGV[6] == '1' then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+    if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[2], ARGV[1], ARGV[3])
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[3])
+return 1
+"""
+
+
+def build_tenant(user_id: Optional[int], organization_id: Optional[int] = None, role: str = "") -> Dict[str, Any]:
+    """스케줄링 단위 (JSON 직렬화 가능한 dict로 태스크 인자에 전달)"""
+    return {"user_id": user_id, "organization_id": organization_id, "role": role or "student"}
+
+
+def _user_key(template: str, tenant: Dict[str, Any]) -> str:
+    return template.format(tenant=f"user:{tenant['user_id']}")
+
+
+def _org_key(template: str, tenant: Dict[str, Any]) -> Optional[str]:
+    if tenant.get("organization_id") is None:
+        return None
+    return template.format(tenant=f"org:{tenant['organization_id']}")
+
+
+class ImageScheduler:
+    """이미지 작업 큐 선택 / 우선순위 / 동시 실행 제한"""
+
+    def __init__(self):
+        self._acquire_script = None
+
+        # 메트릭 (프로세스별)
+        self._enqueued = {IMAGE_QUEUE: 0, IMAGE_PRIORITY_QUEUE: 0}
+        self._deferred = 0
+
+    def lane(self, tenant: Dict[str, Any]) -> str:
+        """역할별 레인 큐"""
+        return IMAGE_PRIORITY_QUEUE if tenant.get("role") in PRIORITY_ROLES else IMAGE_QUEUE
+
+    async def plan(self, tenant: Dict[str, Any], task_id: str) -> Dict[str, Any]:
+        """
+        큐잉 옵션 결정 및 대기 작업 등록 (/image/generate에서 호출)
+
+        Returns:
+            apply_async에 전달할 {"queue", "priority"}
+        """
+        queue = self.lane(tenant)
+        base_level = 0 if queue == IMAGE_PRIORITY_QUEUE else 1
+        self._enqueued[queue] += 1
+
+        client = get_async_redis()
+        if client is None or tenant.get("user_id") is None:
+            return {"queue": queue, "priority": base_level}
+
+        now = time.time()
+        user_key = _user_key(ACTIVE_KEY, tenant)
+        org_key = _org_key(ACTIVE_KEY, tenant)
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key in filter(None, (user_key, org_key)):
+                    pipe.zremrangebyscore(key, "-inf", now - IMAGE_SCHEDULER_STALE)
+                    pipe.zcard(key)
+                    pipe.zadd(key, {task_id: now})
+                    pipe.expire(key, int(IMAGE_SCHEDULER_STALE))
+                results = await pipe.execute()
+        except Exception as e:
+            print(f"[Scheduler] Failed to read backlog: {e}")
+            return {"queue": queue, "priority": base_level}
+
+        user_backlog = results[1]
+        org_backlog = results[5] if org_key else 0
+        level = base_level + max(user_backlog, org_backlog // IMAGE_ORG_FAIR_SHARE)
+        return {"queue": queue, "priority": min(level, PRIORITY_LEVELS - 1)}
+
+    def acquire(self, tenant: Dict[str, Any], task_id: str) -> bool:
+        """워커에서 실행 슬롯 확보 (Redis 미사용 또는 오류 시 제한 없이 실행)"""
+        client = get_redis()
+        if client is None or tenant.get("user_id") is None or not task_id:
+            return True
+
+        if self._acquire_script is None:
+            self._acquire_script = client.register_script(_ACQUIRE_SCRIPT)
+
+        now = time.time()
+        org_key = _org_key(RUNNING_KEY, tenant)
+        try:
+            return bool(self._acquire_script(
+                keys=[_user_key(RUNNING_KEY, tenant), org_key or _user_key(RUNNING_KEY, tenant)],
+                args=[now, now - IMAGE_SCHEDULER_STALE, task_id,
+                      IMAGE_USER_CONCURRENCY, IMAGE_ORG_CONCURRENCY, "1" if org_key else "0"],
+            ))
+        except Exception as e:
+            print(f"[Scheduler] Failed to acquire slot: {e}")
+            return True
+
+    def release(self, tenant: Dict[str, Any], task_id: str) -> None:
+        """작업 종료 시 실행/대기 목록에서 제거"""
+        client = get_redis()
+        if client is None or tenant.get("user_id") is None or not task_id:
+            return
+
+        try:
+            pipe = client.pipeline(transaction=False)
+            for template in (RUNNING_KEY, ACTIVE_KEY):
+                pipe.zrem(_user_key(template, tenant), task_id)
+                org_key = _org_key(template, tenant)
+                if org_key:
+                    pipe.zrem(org_key, task_id)
+            pipe.execute()
+        except Exception as e:
+            print(f"[Scheduler] Failed to release slot: {e}")
+
+    def defer(self, task) -> None:
+        """동시 실행 상한 초과: 같은 큐/우선순위로 잠시 후 다시 큐잉 (재시도 횟수는 소모하지 않음)"""
+        self._deferred += 1
+        task.signature_from_request(
+            task.request,
+            countdown=IMAGE_DEFER_SECONDS,
+            retries=task.request.retries,
+        ).apply_async()
+        raise Ignore()
+
+    def metrics(self) -> Dict[str, Any]:
+        """레인별 큐잉 수 (이 프로세스 기준)"""
+        return {
+            "enqueued": dict(self._enqueued),
+            "deferred": self._deferred,
+            "user_concurrency": IMAGE_USER_CONCURRENCY,
+            "org_concurrency": IMAGE_ORG_CONCURRENCY,
+        }
+
+
+# 싱글톤 인스턴스
+image_scheduler = ImageScheduler()
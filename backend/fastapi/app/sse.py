@@ -0,0 +1,112 @@
+"""
+SSE 인코딩
+
+스트리밍 경로에서는 dict 이벤트를 그대로 주고받고, 응답으로 내보낼 때 한 번만 직렬화
+- orjson 설치 시 orjson 사용 (UTF-8 그대로 출력, 표준 json보다 빠름)
+- 미설치 시 표준 json으로 대체
+- 선택적으로 작은 content 델타를 N ms / M bytes 단위 프레임으로 병합
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 표준 json 사용
+    orjson = None
+
+
+def loads(data: str) -> Any:
+    """업스트림 SSE data 파싱"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(payload: Dict[str, Any]) -> bytes:
+    """이벤트 직렬화"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """이벤트 하나를 SSE 프레임으로 인코딩"""
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+async def encode_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """이벤트 스트림을 SSE 바이트 스트림으로 변환 (StreamingResponse용)"""
+    async for event in events:
+        yield encode_event(event)
+
+
+async def coalesce_events(
+    events: AsyncIterator[Dict[str, Any]],
+    interval_ms: int,
+    max_bytes: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    content 이벤트를 interval_ms 또는 max_bytes 중 먼저 도달하는 시점에 하나로 병합
+
+    - 첫 content는 바로 내보냄 (첫 토큰까지의 시간 유지)
+    - content 외 이벤트(usage, done, error)는 버퍼를 먼저 비운 뒤 그대로 전달
+    - 업스트림이 멈춰 있어도 interval_ms가 지나면 버퍼를 내보냄
+    """
+    interval = interval_ms / 1000
+    buffer: List[str] = []
+    buffered_bytes = 0
+    deadline = 0.0
+    first_sent = False
+
+    def drain() -> Dict[str, Any]:
+        nonlocal buffer, buffered_bytes
+        event = {"content": "".join(buffer), "done": False}
+        buffer, buffered_bytes = [], 0
+        return event
+
+    iterator = events.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            if buffer:
+                done, _ = await asyncio.wait({pending}, timeout=max(deadline - time.monotonic(), 0))
+                if not done:
+                    yield drain()
+                    continue
+
+            try:
+                event = await pending
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if "content" not in event:
+                if buffer:
+                    yield drain()
+                yield event
+                continue
+
+            if not first_sent:
+                first_sent = True
+                yield event
+                continue
+
+            if not buffer:
+                deadline = time.monotonic() + interval
+            buffer.append(event["content"])
+            buffered_bytes += len(event["content"].encode("utf-8"))
+            if buffered_bytes >= max_bytes:
+                yield drain()
+
+        if buffer:
+            yield drain()
+    finally:
+        if pending is not None:
+            pending.cancel()
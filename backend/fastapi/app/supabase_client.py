@@ -1,17 +1,35 @@
 """
 Supabase 스토리지 클라이언트
 이미지 생성 후 Supabase에 저장
+
+워커 이벤트 루프에서 사용하는 비동기 경로:
+- 다운로드 응답 본문을 청크 단위로 Storage REST API 업로드에 바로 전달 (메모리 사용량 제한)
+- 전달 중에 SHA-256, 바이트 크기, 이미지 해상도를 계산 (MediaAsset 메타데이터)
+- 업로드 후 SHA-256 기반 경로로 이동하여 바이트가 같은 이미지는 한 번만 저장 (content-addressed)
+- 다운로드/업로드 모두 공유 httpx 커넥션 풀 사용
 """
 
+import hashlib
 import os
+import struct
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
 from supabase import create_client, Client
 
 # 환경변수
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "generated-images")
+DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
+DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("IMAGE_DOWNLOAD_MAX_CONNECTIONS", "50"))
+UPLOAD_TIMEOUT = float(os.getenv("IMAGE_UPLOAD_TIMEOUT", "60"))
+TRANSFER_CHUNK_SIZE = 64 * 1024  # 전송 청크 크기 (bytes)
+# 업로드한 이미지를 sha256/{앞 2자리}/{sha256}.{확장자} 경로로 이동
+CONTENT_ADDRESSED_STORAGE = os.getenv("IMAGE_CONTENT_ADDRESSED", "true").lower() == "true"
+
+MIME_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
 
 # Supabase 클라이언트 초기화
 supabase_client: Optional[Client] = None
@@ -38,13 +56,150 @@ def is_supabase_available() -> bool:
     return supabase_client is not None
 
 
-def upload_image_to_supabase(
+# 비동기 HTTP 클라이언트 (워커 이벤트 루프에 묶임)
+_download_client: Optional[httpx.AsyncClient] = None
+_storage_client: Optional[httpx.AsyncClient] = None
+
+
+def get_download_client() -> httpx.AsyncClient:
+    """생성된 이미지 다운로드용 공유 HTTP 클라이언트"""
+    global _download_client
+
+    if _download_client is None:
+        _download_client = httpx.AsyncClient(
+            timeout=DOWNLOAD_TIMEOUT,
+            limits=httpx.Limits(max_connections=DOWNLOAD_MAX_CONNECTIONS),
+            follow_redirects=True,
+        )
+    return _download_client
+
+
+def get_storage_client() -> httpx.AsyncClient:
+    """Supabase Storage REST API용 공유 HTTP 클라이언트"""
+    global _storage_client
+
+    if _storage_client is None:
+        _storage_client = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL.rstrip('/')}/storage/v1",
+            timeout=UPLOAD_TIMEOUT,
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "apikey": SUPABASE_SERVICE_KEY,
+            },
+        )
+    return _storage_client
+
+
+async def close_clients() -> None:
+    """비동기 클라이언트 종료 (워커 종료 시 호출)"""
+    global _download_client, _storage_client
+
+    for client in (_download_client, _storage_client):
+        if client is not None:
+            await client.aclose()
+    _download_client = _storage_client = None
+
+
+def get_public_url(file_path: str) -> str:
+    """공개 버킷 객체 URL"""
+    return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{SUPABASE_BUCKET}/{file_path}"
+
+
+def content_address(sha256: str, mime_type: str) -> str:
+    """해시 기반 저장 경로"""
+    return f"sha256/{sha256[:2]}/{sha256}{MIME_EXTENSIONS.get(mime_type, '')}"
+
+
+async def _move_to_content_address(staged_path: str, sha256: str, mime_type: str) -> Tuple[str, bool]:
+    """
+    업로드한 객체를 해시 경로로 이동
+
+    Returns:
+        (최종 경로, 이미 같은 내용이 저장되어 있었는지 여부)
+    """
+    client = get_storage_client()
+    destination = content_address(sha256, mime_type)
+
+    moved = await client.post(
+        "/object/move",
+        json={"bucketId": SUPABASE_BUCKET, "sourceKey": staged_path, "destinationKey": destination},
+    )
+    if moved.status_code == 200:
+        return destination, False
+
+    if "exists" not in moved.text.lower():
+        # 이동 실패: 업로드한 경로를 그대로 사용
+        print(f"[Supabase] ⚠️ Move to content address failed: {moved.status_code} {moved.text[:200]}")
+        return staged_path, False
+
+    # 같은 내용이 이미 있음: 방금 올린 사본 삭제
+    await client.request("DELETE", f"/object/{SUPABASE_BUCKET}", json={"prefixes": [staged_path]})
+    return destination, True
+
+
+class ImageDigest:
+    """스트림을 통과하는 바이트로 SHA-256, 크기, 해상도 계산"""
+
+    HEAD_BYTES = 64 * 1024  # 해상도 파싱을 위해 보관하는 앞부분 최대 크기
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._head = bytearray()
+        self.file_size = 0
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+
+    def update(self, chunk: bytes) -> None:
+        self._sha256.update(chunk)
+        self.file_size += len(chunk)
+        if self.width is None and len(self._head) < self.HEAD_BYTES:
+            self._head += chunk[:self.HEAD_BYTES - len(self._head)]
+            self._parse_dimensions()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def _parse_dimensions(self) -> None:
+        head = bytes(self._head)
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            # IHDR: 시그니처(8) + 길이(4) + 타입(4) 뒤에 width, height
+            if len(head) >= 24:
+                self.width, self.height = struct.unpack(">II", head[16:24])
+        elif head.startswith(b"\xff\xd8"):
+            self._parse_jpeg(head)
+
+    def _parse_jpeg(self, head: bytes) -> None:
+        """SOF 마커에서 해상도 추출 (앞부분에 마커가 아직 없으면 다음 청크에서 재시도)"""
+        offset = 2
+        while offset + 9 <= len(head):
+            if head[offset] != 0xFF:
+                return
+            marker = head[offset + 1]
+            length = struct.unpack(">H", head[offset + 2:offset + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2):
+                self.height, self.width = struct.unpack(">HH", head[offset + 5:offset + 9])
+                return
+            offset += 2 + length
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "sha256": self.sha256,
+            "file_size": self.file_size,
+            "width": self.width,
+            "height": self.height,
+        }
+
+
+async def upload_image_to_supabase(
     image_url: str,
     user_id: int,
     filename: str = "image.png"
-) -> Optional[str]:
+) -> Optional[Dict[str, Any]]:
     """
-    이미지를 URL에서 다운로드한 후 Supabase에 업로드
+    이미지를 URL에서 스트리밍으로 받아 Supabase에 바로 업로드
+
+    전체 이미지를 메모리에 올리지 않고 TRANSFER_CHUNK_SIZE 단위로 전달
 
     Args:
         image_url: DALL-E에서 생성된 이미지 URL
@@ -52,28 +207,19 @@ def upload_image_to_supabase(
         filename: 저장할 파일명
 
     Returns:
-        Supabase 공개 URL 또는 None
+        {"url", "storage_path", "file_name", "mime_type", "deduplicated",
+         "sha256", "file_size", "width", "height"}
+        또는 실패 시 None
     """
     if not supabase_client:
         print("[Supabase] ❌ Supabase client not available")
         return None
 
     try:
-        import requests
-        from io import BytesIO
-
         print(f"\n[Supabase] ========================================")
-        print(f"[Supabase] Downloading image from DALL-E URL...")
+        print(f"[Supabase] Streaming image from DALL-E URL...")
         print(f"[Supabase] URL: {image_url[:80]}...")
 
-        # DALL-E URL에서 이미지 다운로드
-        response = requests.get(image_url, timeout=30)
-        if response.status_code != 200:
-            print(f"[Supabase] ❌ Failed to download image: {response.status_code}")
-            return None
-
-        image_data = BytesIO(response.content)
-
         # 파일 경로 구성: {user_id}/{YYYY-MM-DD}/{timestamp}_{filename}
         now = datetime.utcnow()
         date_folder = now.strftime("%Y-%m-%d")
@@ -85,21 +231,57 @@ def upload_image_to_supabase(
         print(f"[Supabase] Uploading to bucket: {SUPABASE_BUCKET}")
         print(f"[Supabase] File path: {file_path}")
 
-        # Supabase에 업로드
-        result = supabase_client.storage.from_(SUPABASE_BUCKET).upload(
-            path=file_path,
-            file=image_data.getvalue(),
-            file_options={"content-type": "image/png"}
-        )
+        digest = ImageDigest()
+
+        async with get_download_client().stream("GET", image_url) as download:
+            if download.status_code != 200:
+                print(f"[Supabase] ❌ Failed to download image: {download.status_code}")
+                return None
+
+            mime_type = download.headers.get("content-type", "image/png").split(";")[0]
+
+            async def body() -> AsyncIterator[bytes]:
+                async for chunk in download.aiter_bytes(TRANSFER_CHUNK_SIZE):
+                    digest.update(chunk)
+                    yield chunk
+
+            headers = {"content-type": mime_type, "x-upsert": "false"}
+            # 길이를 알면 chunked 대신 Content-Length로 전송 (압축 전송 시 길이가 달라지므로 제외)
+            content_length = download.headers.get("content-length")
+            if content_length and "content-encoding" not in download.headers:
+                headers["content-length"] = content_length
+
+            upload = await get_storage_client().post(
+                f"/object/{SUPABASE_BUCKET}/{file_path}",
+                content=body(),
+                headers=headers,
+            )
+            if upload.status_code not in (200, 201):
+                print(f"[Supabase] ❌ Upload failed: {upload.status_code} {upload.text[:200]}")
+                return None
+
+        deduplicated = False
+        if CONTENT_ADDRESSED_STORAGE:
+            file_path, deduplicated = await _move_to_content_address(file_path, digest.sha256, mime_type)
+            if deduplicated:
+                print(f"[Supabase] ♻️ Identical image already stored: {file_path}")
 
         # 공개 URL 생성
-        public_url = supabase_client.storage.from_(SUPABASE_BUCKET).get_public_url(file_path)
+        public_url = get_public_url(file_path)
 
         print(f"[Supabase] ✅ Image uploaded successfully!")
         print(f"[Supabase] Public URL: {public_url}")
+        print(f"[Supabase] Size: {digest.file_size} bytes, {digest.width}x{digest.height}")
         print(f"[Supabase] ========================================\n")
 
-        return public_url
+        return {
+            "url": public_url,
+            "storage_path": file_path,
+            "file_name": file_name,
+            "mime_type": mime_type,
+            "deduplicated": deduplicated,
+            **digest.as_dict(),
+        }
 
     except Exception as e:
         print(f"\n[Supabase] ❌ ========================================")
@@ -2,11 +2,63 @@
 Celery 비동기 작업 정의
 
 Redis를 통해 실행되는 백그라운드 작업들
+- 태스크 본문은 코루틴으로 작성하고 워커 이벤트 루프(worker_loop)에서 실행
+- HTTP 호출은 워커 프로세스의 공유 커넥션 풀 사용
+- 이미지 생성은 단계(generated → uploaded → recorded)마다 체크포인트를 Django 작업에 기록하고,
+  재시도 시 마지막으로 완료된 단계 다음부터 재개 (이미 생성한 이미지는 다시 생성하지 않음)
 """
 
+import concurrent.futures
 import os
-from typing import Dict, Any, Optional
+import random
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional
+
+import httpx
+
 from .celery_app import celery_app
+from .job_events import report_progress
+from .scheduler import build_tenant, image_scheduler
+from .worker import worker_loop
+
+
+# 이미지 생성 API 타임아웃 (초)
+IMAGE_GENERATION_TIMEOUT = float(os.getenv("IMAGE_GENERATION_TIMEOUT", "60"))
+
+# 재시도 지수 백오프 (초, Retry-After 헤더가 더 길면 헤더 값 사용)
+IMAGE_RETRY_BASE_DELAY = float(os.getenv("IMAGE_RETRY_BASE_DELAY", "5"))
+IMAGE_RETRY_MAX_DELAY = float(os.getenv("IMAGE_RETRY_MAX_DELAY", "300"))
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# DALL-E 임시 URL 유효 시간 (1시간)보다 짧게 잡아, 지난 체크포인트는 다시 생성
+GENERATED_URL_TTL = float(os.getenv("GENERATED_URL_TTL", "3300"))
+
+STAGES = ("", "generated", "uploaded", "recorded")
+
+
+class RetryableJobError(Exception):
+    """일시적 오류 (429/5xx, 네트워크, 스토리지 업로드 실패) - 체크포인트부터 재시도"""
+
+    def __init__(self, message: str, checkpoint: Optional[Dict[str, Any]] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.checkpoint = checkpoint
+        self.retry_after = retry_after
+
+
+class PermanentJobError(Exception):
+    """재시도해도 같은 결과인 오류 (잘못된 프롬프트, 콘텐츠 정책 위반 등)"""
+
+
+def retry_delay(retries: int, retry_after: Optional[float] = None) -> float:
+    """지수 백오프 + 지터, Retry-After보다 짧지 않게"""
+    backoff = min(IMAGE_RETRY_MAX_DELAY, IMAGE_RETRY_BASE_DELAY * (2 ** retries))
+    delay = random.uniform(backoff / 2, backoff)
+    return max(delay, retry_after or 0.0)
+
+
+def _stage_index(checkpoint: Optional[Dict[str, Any]]) -> int:
+    stage = (checkpoint or {}).get("stage", "")
+    return STAGES.index(stage) if stage in STAGES else 0
 
 
 @celery_app.task(bind=True, max_retries=3, name="tasks.generate_image_task")
@@ -18,6 +70,9 @@ def generate_image_task(
     job_id: Optional[int] = None,
     user_id: Optional[int] = None,
     user_token: str = "",
+    cache_key: Optional[str] = None,
+    tenant: Optional[Dict[str, Any]] = None,
+    checkpoint: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     이미지 생성 백그라운드 작업
@@ -29,16 +84,171 @@ def generate_image_task(
         job_id: Django DB의 GenerationJob ID
         user_id: 사용자 ID (Supabase 저장용)
         user_token: 사용자 JWT 토큰
+        cache_key: 결과를 저장할 이미지 캐시 키 (use_cache 요청인 경우)
+        tenant: 공정 스케줄링 단위 (user_id, organization_id, role)
+        checkpoint: 이전 시도에서 완료한 단계 (재시도 시 전달됨)
 
     Returns:
         결과 딕셔너리 (url, revised_prompt 등)
+
+    Raises:
+        일시적 오류는 백오프 후 재시도하고, 재시도 횟수를 모두 쓰거나 영구 오류면
+        작업을 failed로 기록한 뒤 예외를 그대로 올림 (Celery 상태 FAILURE)
     """
+    # request는 스레드 로컬이므로 워커 루프로 넘어가기 전에 읽어 둠
+    task_id = self.request.id
+
+    # 사용자/조직 동시 실행 상한 초과 시 잠시 후 다시 큐잉
+    tenant = tenant or build_tenant(user_id)
+    if not image_scheduler.acquire(tenant, task_id):
+        print(f"[Task] Concurrency cap reached for user {tenant['user_id']}, deferring")
+        image_scheduler.defer(self)
+
+    async def progress(current: int, message: str) -> None:
+        await report_progress(self, task_id, current, message)
+
+    final_attempt = self.request.retries >= self.max_retries
+    try:
+        return worker_loop.run(_generate_image(
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            job_id=job_id,
+            user_id=user_id,
+            user_token=user_token,
+            cache_key=cache_key,
+            checkpoint=checkpoint,
+            task_id=task_id,
+            progress=progress,
+        ), timeout=celery_app.conf.task_time_limit)
+    except (RetryableJobError, concurrent.futures.TimeoutError) as e:
+        error = e if isinstance(e, RetryableJobError) else RetryableJobError("Image generation timed out", checkpoint)
+        if not final_attempt:
+            countdown = retry_delay(self.request.retries, error.retry_after)
+            print(f"[Task] Retrying job {job_id} in {countdown:.1f}s "
+                  f"(attempt {self.request.retries + 1}/{self.max_retries}): {error}")
+            raise self.retry(
+                exc=error,
+                countdown=countdown,
+                kwargs={**self.request.kwargs, "checkpoint": error.checkpoint or checkpoint},
+            )
+        worker_loop.run(_mark_failed(job_id, user_token, str(error)))
+        raise
+    except Exception as e:
+        worker_loop.run(_mark_failed(job_id, user_token, str(e)))
+        raise
+    finally:
+        image_scheduler.release(tenant, task_id)
+
+
+async def _mark_failed(job_id: Optional[int], user_token: str, error_message: str) -> None:
+    """Django 작업을 failed로 기록 (체크포인트는 유지되어 재시도 API에서 이어서 처리)"""
+    from .django_client import django_client
+
+    print(f"\n[Task] ❌ ========================================")
+    print(f"[Task] Image generation failed!")
+    print(f"[Task] Error: {error_message}")
+    print(f"[Task] ========================================\n")
+
+    if job_id and user_token:
+        print(f"[Task] Updating Django job {job_id} to failed...")
+        try:
+            await django_client.update_generation_job(
+                job_id=job_id,
+                status="failed",
+                error_message=error_message,
+                user_token=user_token
+            )
+        except Exception as update_error:
+            print(f"[Task] ❌ Failed to update Django: {update_error}")
+
+
+async def _save_checkpoint(job_id: Optional[int], user_token: str, checkpoint: Dict[str, Any], task_id: Optional[str]) -> None:
+    """완료한 단계를 Django 작업에 기록 (실패해도 재시도 인자로 체크포인트가 전달됨)"""
     from .django_client import django_client
+
+    if not (job_id and user_token):
+        return
+    result = await django_client.update_generation_job(
+        job_id=job_id,
+        status="processing",
+        result_data={"checkpoint": checkpoint},
+        user_token=user_token,
+        stage=checkpoint["stage"],
+        celery_task_id=task_id,
+    )
+    if result is None:
+        print(f"[Task] ⚠️ Failed to store checkpoint '{checkpoint['stage']}' for job {job_id}")
+
+
+async def _request_generation(prompt: str, size: str, quality: str, model: str) -> Dict[str, Any]:
+    """DALL-E 호출 (속도 제한 예산 부족/429/5xx/네트워크 오류는 RetryableJobError, 그 외 오류는 PermanentJobError)"""
+    from .governor import BACKGROUND, UpstreamBusy
+    from .upstream import retry_after, upstream_client
+
+    # 인증 헤더는 업스트림 클라이언트에 설정됨
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "n": 1,
+        "size": size,
+        "quality": quality,
+    }
+    try:
+        # 이미지 작업은 background 레인 (채팅용 예비 예산은 사용하지 않음)
+        response = await upstream_client.request(
+            "POST",
+            "/images/generations",
+            lane=BACKGROUND,
+            json=payload,
+            timeout=IMAGE_GENERATION_TIMEOUT,
+        )
+    except UpstreamBusy as e:
+        raise RetryableJobError(str(e), retry_after=e.retry_after) from e
+    except httpx.TransportError as e:
+        raise RetryableJobError(f"DALL-E request failed: {e!r}") from e
+
+    if response.status_code == 200:
+        return response.json()["data"][0]
+
+    try:
+        error_message = response.json().get("error", {}).get("message", "Unknown error")
+    except ValueError:
+        error_message = response.text[:200] or "Unknown error"
+    print(f"[Task] ❌ DALL-E API Error: {response.status_code}")
+    print(f"[Task] Error Message: {error_message}")
+
+    if response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500:
+        raise RetryableJobError(
+            f"DALL-E API error ({response.status_code}): {error_message}",
+            retry_after=retry_after(response),
+        )
+    raise PermanentJobError(f"DALL-E API error: {error_message}")
+
+
+async def _generate_image(
+    prompt: str,
+    size: str,
+    quality: str,
+    job_id: Optional[int],
+    user_id: Optional[int],
+    user_token: str,
+    cache_key: Optional[str] = None,
+    checkpoint: Optional[Dict[str, Any]] = None,
+    task_id: Optional[str] = None,
+    progress: Optional[Callable[[int, str], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    이미지 생성 → 스토리지 업로드 → Django 작업 갱신 (단계마다 progress 보고)
+
+    각 단계가 끝나면 체크포인트를 저장하고, 이미 완료된 단계는 건너뜀
+    """
+    from .django_client import django_client
+    from .image_cache import image_cache
     from .supabase_client import upload_image_to_supabase
 
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
     DALLE_MODEL = os.getenv("DALLE_MODEL", "dall-e-3")
+    track = bool(job_id and user_token)
 
     print(f"\n[Task] ========================================")
     print(f"[Task] Starting image generation task")
@@ -48,113 +258,125 @@ def generate_image_task(
     print(f"[Task] Model: {DALLE_MODEL}")
     print(f"[Task] ========================================\n")
     
-    try:
-        # DALL-E API 호출
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        payload = {
+    async def report(current: int, message: str) -> None:
+        if progress is not None:
+            await progress(current, message)
+
+    # Django에 기록된 진행 상황 확인 (재시도 API로 다시 큐잉된 경우 체크포인트는 DB에만 있음)
+    if track:
+        job = await django_client.get_generation_job(job_id, user_token)
+        if job:
+            saved = job.get("result_data") or {}
+            if job.get("status") == "completed" or job.get("stage") == "recorded":
+                print(f"[Task] Job {job_id} already recorded, skipping")
+                return {
+                    "success": True,
+                    "url": saved.get("url"),
+                    "revised_prompt": saved.get("revised_prompt"),
+                    "model": saved.get("model", DALLE_MODEL),
+                }
+            if _stage_index(saved.get("checkpoint")) > _stage_index(checkpoint):
+                checkpoint = saved["checkpoint"]
+            if job.get("status") == "pending":
+                await django_client.update_generation_job(
+                    job_id=job_id,
+                    status="processing",
+                    user_token=user_token,
+                    celery_task_id=task_id,
+                )
+
+    checkpoint = dict(checkpoint or {})
+    if checkpoint.get("stage") == "generated" and time.time() - checkpoint.get("generated_at", 0) > GENERATED_URL_TTL:
+        print(f"[Task] ⚠️ Generated image URL expired before upload, generating again")
+        checkpoint = {}
+
+    # 1. 생성
+    if _stage_index(checkpoint) < STAGES.index("generated"):
+        await report(10, "Generating image...")
+        try:
+            generated = await _request_generation(prompt, size, quality, DALLE_MODEL)
+        except RetryableJobError as e:
+            e.checkpoint = checkpoint
+            raise
+
+        checkpoint = {
+            "stage": "generated",
+            "generated_at": time.time(),
+            "image_url": generated["url"],
+            "revised_prompt": generated.get("revised_prompt", prompt),
             "model": DALLE_MODEL,
-            "prompt": prompt,
-            "n": 1,
-            "size": size,
-            "quality": quality,
         }
-        
-        # 동기 HTTP 요청 (백그라운드 워커에서는 동기 방식 사용)
-        import requests
-        response = requests.post(
-            f"{OPENAI_BASE_URL}/images/generations",
-            json=payload,
-            headers=headers,
-            timeout=60.0
-        )
-        
-        if response.status_code != 200:
-            error_data = response.json()
-            error_message = error_data.get('error', {}).get('message', 'Unknown error')
-            print(f"[Task] ❌ DALL-E API Error: {response.status_code}")
-            print(f"[Task] Error Message: {error_message}")
-            raise Exception(f"DALL-E API error: {error_message}")
-
-        result = response.json()
-        image_url = result["data"][0]["url"]
-        revised_prompt = result["data"][0].get("revised_prompt", prompt)
-
         print(f"\n[Task] ✅ Image generated successfully!")
-        print(f"[Task] URL: {image_url[:80]}...")
-        print(f"[Task] Revised Prompt: {revised_prompt[:50]}...")
+        print(f"[Task] URL: {checkpoint['image_url'][:80]}...")
+        print(f"[Task] Revised Prompt: {checkpoint['revised_prompt'][:50]}...")
+        await _save_checkpoint(job_id, user_token, checkpoint, task_id)
+    else:
+        print(f"[Task] Resuming job {job_id} after stage '{checkpoint['stage']}'")
 
-        # Supabase 스토리지에 업로드
-        final_image_url = image_url
+    # 2. Supabase 스토리지에 업로드
+    if _stage_index(checkpoint) < STAGES.index("uploaded"):
+        upload = None
         if user_id:
             print(f"[Task] Uploading to Supabase Storage...")
-            supabase_url = upload_image_to_supabase(
-                image_url=image_url,
+            await report(60, "Uploading image...")
+            upload = await upload_image_to_supabase(
+                image_url=checkpoint["image_url"],
                 user_id=user_id,
                 filename="generated_image.png"
             )
-            if supabase_url:
-                final_image_url = supabase_url
-                print(f"[Task] ✅ Supabase URL: {final_image_url}")
-            else:
-                print(f"[Task] ⚠️ Supabase upload failed, using DALL-E URL")
+            if upload is None:
+                # 생성 비용은 이미 지불했으므로 업로드만 다시 시도
+                # 마지막 시도면 failed로 기록하고 "generated" 체크포인트는 남겨 재시도 API로 이어서 처리
+                # (곧 만료되는 DALL-E 임시 URL을 결과로 기록하지 않음)
+                raise RetryableJobError("Supabase upload failed", checkpoint)
         else:
             print(f"[Task] ⚠️ user_id not provided, skipping Supabase upload")
 
-        # Django DB 업데이트 (비동기 함수를 동기로 실행)
-        if job_id and user_token:
-            print(f"[Task] Updating Django job {job_id} to completed...")
-            import asyncio
-            result = asyncio.run(django_client.update_generation_job(
-                job_id=job_id,
-                status="completed",
-                result_data={
-                    "url": final_image_url,
-                    "revised_prompt": revised_prompt,
-                    "model": DALLE_MODEL,
-                    "size": size,
-                    "quality": quality,
-                },
-                user_token=user_token
-            ))
-            print(f"[Task] Django update result: {result}")
-        else:
-            print(f"[Task] ⚠️ Skipping Django update: job_id={job_id}, user_token={bool(user_token)}")
+        checkpoint = {**checkpoint, "stage": "uploaded", "url": checkpoint["image_url"]}
+        if upload:
+            checkpoint["url"] = upload.pop("url")
+            deduplicated = upload.pop("deduplicated", False)
+            checkpoint["asset"] = upload  # Django에서 MediaAsset 생성에 사용
+            print(f"[Task] ✅ Supabase URL: {checkpoint['url']}")
+            if deduplicated:
+                await image_cache.record_dedup(upload["file_size"])
+        await _save_checkpoint(job_id, user_token, checkpoint, task_id)
 
-        return {
-            "success": True,
-            "url": final_image_url,
-            "revised_prompt": revised_prompt,
-            "model": DALLE_MODEL,
-        }
+    # 3. 결과 기록
+    result_data = {
+        "url": checkpoint["url"],
+        "revised_prompt": checkpoint["revised_prompt"],
+        "model": checkpoint.get("model", DALLE_MODEL),
+        "size": size,
+        "quality": quality,
+    }
+    asset = checkpoint.get("asset")
+    if asset:
+        result_data["asset"] = asset
+        if cache_key:
+            # 스토리지 URL만 캐시 (DALL-E URL은 곧 만료됨)
+            await image_cache.put(cache_key, result_data)
 
-    except Exception as e:
-        print(f"\n[Task] ❌ ========================================")
-        print(f"[Task] Image generation failed!")
-        print(f"[Task] Error: {str(e)}")
-        print(f"[Task] ========================================\n")
-        import traceback
-        traceback.print_exc()
-
-        # Django DB 업데이트 (실패)
-        if job_id and user_token:
-            print(f"[Task] Updating Django job {job_id} to failed...")
-            import asyncio
-            try:
-                asyncio.run(django_client.update_generation_job(
-                    job_id=job_id,
-                    status="failed",
-                    error_message=str(e),
-                    user_token=user_token
-                ))
-            except Exception as update_error:
-                print(f"[Task] ❌ Failed to update Django: {update_error}")
-
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    if track:
+        print(f"[Task] Updating Django job {job_id} to completed...")
+        await report(90, "Saving result...")
+        result = await django_client.update_generation_job(
+            job_id=job_id,
+            status="completed",
+            result_data=result_data,
+            user_token=user_token,
+            stage="recorded",
+            celery_task_id=task_id,
+        )
+        print(f"[Task] Django update result: {result}")
+        if result is None:
+            raise RetryableJobError("Failed to record result in Django", checkpoint)
+    else:
+        print(f"[Task] ⚠️ Skipping Django update: job_id={job_id}, user_token={bool(user_token)}")
 
+    return {
+        "success": True,
+        "url": result_data["url"],
+        "revised_prompt": result_data["revised_prompt"],
+        "model": result_data["model"],
+    }
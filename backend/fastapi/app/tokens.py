@@ -0,0 +1,130 @@
+"""
+토큰 계산
+
+프롬프트/응답 토큰 수를 모델 토크나이저(tiktoken BPE)로 계산
+- BPE 어휘 파일은 TIKTOKEN_CACHE_DIR에 로컬 캐시 (최초 1회만 다운로드)
+- 앱 시작 시 warm_encoding()으로 별도 스레드에서 미리 로드 (이벤트 루프 블로킹 방지)
+- tiktoken 미설치 또는 어휘 로드 실패 시 문자 기반 추정으로 대체
+  (실패는 캐시하지 않고 TOKENIZER_RETRY_SECONDS 후 다시 로드 시도)
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# tiktoken import 전에 캐시 디렉터리 지정
+os.environ.setdefault(
+    "TIKTOKEN_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / ".tiktoken_cache"),
+)
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 미설치 시 추정치 사용
+    tiktoken = None
+
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+DEFAULT_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+# 어휘 로드 실패 후 다시 시도하기까지 대기 시간 (그동안은 추정치 사용)
+TOKENIZER_RETRY_SECONDS = float(os.getenv("TOKENIZER_RETRY_SECONDS", "60"))
+
+# 채팅 포맷 오버헤드 (메시지당 / 응답 시작)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+# 모델 -> 인코더 (로드 성공만 저장), 모델 -> 마지막 로드 실패 시각
+_encodings: Dict[str, Any] = {}
+_failed_at: Dict[str, float] = {}
+
+
+def get_encoding(model: str = OPENAI_MODEL):
+    """모델 인코더 반환 (사용 불가 시 None)"""
+    encoding = _encodings.get(model)
+    if encoding is not None or tiktoken is None:
+        return encoding
+    failed_at = _failed_at.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < TOKENIZER_RETRY_SECONDS:
+        return None
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        print(f"[Tokens] Tokenizer unavailable, using estimate: {e}")
+        _failed_at[model] = time.monotonic()
+        return None
+    _failed_at.pop(model, None)
+    _encodings[model] = encoding
+    return encoding
+
+
+async def warm_encoding(model: str = OPENAI_MODEL) -> bool:
+    """인코더를 별도 스레드에서 미리 로드 (최초 BPE 다운로드가 이벤트 루프를 막지 않도록)"""
+    encoding = await asyncio.to_thread(get_encoding, model)
+    if encoding is not None:
+        print(f"[Tokens] Tokenizer ready: {encoding.name}")
+    return encoding is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 추정 (한글은 글자당 약 1토큰, 그 외는 약 4글자당 1토큰)"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def count_tokens(text: str, model: str = OPENAI_MODEL) -> int:
+    """텍스트 토큰 수"""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = OPENAI_MODEL) -> int:
+    """채팅 메시지 목록의 프롬프트 토큰 수 (포맷 오버헤드 포함)"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message.get("role", ""), model)
+        total += count_tokens(message.get("content", ""), model)
+    return total
+
+
+def tokenizer_source(model: str = OPENAI_MODEL) -> str:
+    """토큰 수 출처 (tokenizer 또는 estimate)"""
+    return "tokenizer" if get_encoding(model) is not None else "estimate"
+
+
+def build_usage(
+    prompt_messages: List[Dict[str, str]],
+    completion: str,
+    upstream_usage: Optional[Dict[str, Any]] = None,
+    model: str = OPENAI_MODEL,
+) -> Dict[str, Any]:
+    """
+    턴의 토큰 사용량
+
+    업스트림 usage 블록(stream_options.include_usage)이 있으면 그 값을 우선 사용
+    """
+    if upstream_usage and upstream_usage.get("prompt_tokens") is not None:
+        prompt_tokens = upstream_usage["prompt_tokens"]
+        completion_tokens = upstream_usage.get("completion_tokens", 0)
+        source = "upstream"
+    else:
+        prompt_tokens = count_message_tokens(prompt_messages, model)
+        completion_tokens = count_tokens(completion, model)
+        source = tokenizer_source(model)
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "source": source,
+    }
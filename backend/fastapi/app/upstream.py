@@ -0,0 +1,251 @@
+"""
+OpenAI 업스트림 HTTP 클라이언트
+
+FastAPI lifespan 동안 하나의 커넥션 풀을 유지하여
+채팅 턴마다 TCP+TLS 핸드셰이크를 반복하지 않도록 함:
+- HTTP/2 (h2 패키지 설치 시)
+- 커넥션 풀 크기 / keep-alive 만료 설정
+- connect / read / first-byte 타임아웃 분리
+- 풀 점유율 메트릭
+- lane을 지정한 요청은 보내기 전에 속도 제한 예산 확보 (governor.py)
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from .governor import upstream_governor, scope_for
+
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# 커넥션 풀 설정
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "true").lower() == "true"
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+
+# 타임아웃 설정 (초)
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "60"))  # 청크 간 최대 대기
+UPSTREAM_WRITE_TIMEOUT = float(os.getenv("UPSTREAM_WRITE_TIMEOUT", "10"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "10"))  # 풀 대기
+UPSTREAM_FIRST_BYTE_TIMEOUT = float(os.getenv("UPSTREAM_FIRST_BYTE_TIMEOUT", "30"))  # 응답 헤더까지
+
+
+class FirstByteTimeout(httpx.TimeoutException):
+    """응답 헤더를 first-byte 타임아웃 안에 받지 못함"""
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """429/503 응답의 재시도 대기 시간 (초, 헤더가 없으면 None)"""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date 형식
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _http2_available() -> bool:
+    """h2 패키지 설치 여부"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamClient:
+    """OpenAI 호환 API용 공유 비동기 HTTP 클라이언트"""
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: str = OPENAI_API_KEY):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.http2 = UPSTREAM_HTTP2 and _http2_available()
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # 메트릭
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_requests = 0
+        self._errors = 0
+        self._first_byte_timeouts = 0
+
+    async def start(self) -> None:
+        """커넥션 풀 생성 (lifespan 시작 시 호출)"""
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=UPSTREAM_CONNECT_TIMEOUT,
+                read=UPSTREAM_READ_TIMEOUT,
+                write=UPSTREAM_WRITE_TIMEOUT,
+                pool=UPSTREAM_POOL_TIMEOUT,
+            ),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+        print(
+            f"[Upstream] Pool started: {self.base_url} "
+            f"(http2={self.http2}, max_connections={UPSTREAM_MAX_CONNECTIONS})"
+        )
+
+    async def aclose(self) -> None:
+        """커넥션 풀 종료 (lifespan 종료 시 호출)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            print("[Upstream] Pool closed")
+
+    async def _govern(self, path: str, kwargs: Dict[str, Any], lane: Optional[str], tokens: int) -> Optional[str]:
+        """lane 지정 시 속도 제한 예산 확보 후 버킷 단위 반환 (부족하면 UpstreamBusy)"""
+        if lane is None:
+            return None
+        scope = scope_for(path, (kwargs.get("json") or {}).get("model"))
+        await upstream_governor.acquire(scope, tokens, lane)
+        return scope
+
+    async def _observe(self, scope: Optional[str], response: httpx.Response) -> None:
+        if scope is not None:
+            delay = retry_after(response) if response.status_code == 429 else None
+            await upstream_governor.observe(scope, response.status_code, response.headers, delay)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        lane: Optional[str] = None,
+        tokens: int = 0,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        비스트리밍 요청 (이미지 생성 등)
+
+        Args:
+            lane: 속도 제한 레인 (governor.INTERACTIVE / BACKGROUND, None이면 제한 없음)
+            tokens: 예상 토큰 수 (TPM 예산)
+        """
+        if self._client is None:
+            await self.start()
+
+        scope = await self._govern(path, kwargs, lane, tokens)
+
+        self._in_flight += 1
+        self._total_requests += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            response = await self._client.request(method, path, **kwargs)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        await self._observe(scope, response)
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        lane: Optional[str] = None,
+        tokens: int = 0,
+        **kwargs,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        스트리밍 요청
+
+        응답 헤더 수신까지는 first-byte 타임아웃, 이후 청크 간에는 read 타임아웃 적용
+        (lane / tokens는 request와 동일)
+        """
+        if self._client is None:
+            await self.start()
+
+        scope = await self._govern(path, kwargs, lane, tokens)
+        request = self._client.build_request(method, path, **kwargs)
+
+        self._in_flight += 1
+        self._total_requests += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            try:
+                response = await asyncio.wait_for(
+                    self._client.send(request, stream=True),
+                    timeout=UPSTREAM_FIRST_BYTE_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                self._first_byte_timeouts += 1
+                raise FirstByteTimeout(
+                    f"No response headers within {UPSTREAM_FIRST_BYTE_TIMEOUT}s",
+                    request=request,
+                )
+
+            await self._observe(scope, response)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """풀 점유율 및 요청 메트릭"""
+        connections = []
+        if self._client is not None:
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+
+        return {
+            "started": self._client is not None,
+            "http2": self.http2,
+            "max_connections": UPSTREAM_MAX_CONNECTIONS,
+            "max_keepalive_connections": UPSTREAM_MAX_KEEPALIVE,
+            "connections_open": len(connections),
+            "connections_idle": idle,
+            "connections_active": len(connections) - idle,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "total_requests": self._total_requests,
+            "errors": self._errors,
+            "first_byte_timeouts": self._first_byte_timeouts,
+        }
+
+
+# 싱글톤 인스턴스
+upstream_client = UpstreamClient()
@@ -0,0 +1,91 @@
+"""
+Celery 워커용 이벤트 루프
+
+태스크마다 asyncio.run()으로 루프와 HTTP 클라이언트를 새로 만들지 않도록
+워커 프로세스당 하나의 이벤트 루프를 백그라운드 스레드에서 유지
+- Celery threads 풀의 각 스레드는 코루틴을 이 루프에 제출하고 결과만 기다림
+- 이미지 생성은 I/O 대기가 대부분이므로 한 프로세스에서 수십 개의 작업을 동시에 처리
+- OpenAI / Django / 다운로드 HTTP 클라이언트는 루프에 묶인 커넥션 풀을 공유
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+from celery.signals import worker_shutdown
+
+
+class WorkerLoop:
+    """워커 프로세스 전역 이벤트 루프"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="worker-loop", daemon=True)
+                thread.start()
+                asyncio.run_coroutine_threadsafe(self._start_clients(), loop).result()
+                self._loop, self._thread = loop, thread
+                print("[Worker] Event loop started")
+            return self._loop
+
+    async def _start_clients(self) -> None:
+        from .django_client import django_client
+        from .upstream import upstream_client
+
+        await upstream_client.start()
+        await django_client.start()
+
+    async def _close_clients(self) -> None:
+        from .django_client import django_client
+        from .supabase_client import close_clients as close_storage_clients
+        from .upstream import upstream_client
+
+        await close_storage_clients()
+        await django_client.aclose()
+        await upstream_client.aclose()
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        코루틴을 워커 루프에서 실행하고 결과 반환 (호출 스레드는 블록)
+
+        threads 풀은 Celery time limit을 지원하지 않으므로 timeout 초과 시 코루틴을 취소
+        """
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """커넥션 풀을 닫고 루프 종료"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_clients(), loop).result(10)
+        except Exception as e:
+            print(f"[Worker] Failed to close clients: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+        print("[Worker] Event loop stopped")
+
+
+# 싱글톤 인스턴스
+worker_loop = WorkerLoop()
+
+
+@worker_shutdown.connect
+def _stop_worker_loop(**kwargs) -> None:
+    worker_loop.stop()
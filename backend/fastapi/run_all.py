@@ -82,7 +82,7 @@ def run_celery_worker():
         '-A', 'app.celery_app',
         'worker',
         '--loglevel=info',
-        '--concurrency=2'
+        # 풀 종류와 동시 작업 수는 celery_app 설정 (CELERY_WORKER_POOL, CELERY_WORKER_CONCURRENCY)
     ]
 
     worker_process = subprocess.Popen(
@@ -0,0 +1,125 @@
+"""
+대화 컨텍스트 캐시 테스트 (Django 메시지 API와 write-behind 큐는 가짜로 대체)
+"""
+
+import asyncio
+from unittest import mock
+
+from app import context
+from app.context import ConversationContextStore
+
+
+class _Django:
+    """messages 액션의 커서 페이지네이션 (커서 = 마지막 메시지 ID)"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+        self.fail = False
+
+    def add(self, role, content, client_id=None):
+        self.rows.append({"id": len(self.rows) + 1, "role": role, "content": content, "client_id": client_id})
+
+    async def get_message_page(self, conversation_id, page_size, user_token=None, since=None):
+        self.calls.append(since)
+        if self.fail:
+            return None
+        if since is None:
+            page, has_more = self.rows[-page_size:], False
+        else:
+            newer = [row for row in self.rows if row["id"] > int(since)]
+            page, has_more = newer[:page_size], len(newer) > page_size
+        return {
+            "results": page,
+            "next": str(page[-1]["id"]) if page else since,
+            "has_more": has_more,
+        }
+
+
+class _Writer:
+    def __init__(self):
+        self.messages = []
+
+    def pending(self, conversation_id, user_token):
+        return list(self.messages)
+
+
+def _contents(history):
+    return [message["content"] for message in history]
+
+
+def _history(store, django, writer=None, context_length=50):
+    with mock.patch.object(context, "django_client", django), \
+            mock.patch.object(context, "message_writer", writer or _Writer()):
+        return asyncio.run(store.get_history(1, "token", context_length))
+
+
+def test_miss_appends_messages_still_in_write_behind_queue():
+    django, writer = _Django(), _Writer()
+    django.add("user", "첫 질문", "m-1")
+    django.add("assistant", "첫 답변", "m-2")
+    writer.messages = [
+        # 저장 중인 배치가 이미 커밋된 경우
+        {"role": "assistant", "content": "첫 답변", "client_id": "m-2"},
+        {"role": "user", "content": "두 번째 질문", "client_id": "m-3"},
+    ]
+
+    history = _history(ConversationContextStore(), django, writer)
+
+    assert _contents(history) == ["첫 질문", "첫 답변", "두 번째 질문"]
+
+
+def test_hit_merges_turns_from_other_workers_without_duplicates():
+    store, django = ConversationContextStore(), _Django()
+    django.add("user", "첫 질문", "m-1")
+    assert _contents(_history(store, django)) == ["첫 질문"]
+
+    # 이 프로세스가 처리한 턴 (아직 Django에 없음)
+    store.append(1, "token", "assistant", "첫 답변", "m-2")
+    assert _contents(_history(store, django)) == ["첫 질문", "첫 답변"]
+
+    # write-behind 저장 완료 + 다른 워커가 처리한 턴 + Django에 직접 저장된 메시지
+    django.add("assistant", "첫 답변", "m-2")
+    django.add("user", "다른 탭 질문", "m-3")
+    django.add("assistant", "다른 탭 답변", None)
+    history = _history(store, django)
+
+    assert _contents(history) == ["첫 질문", "첫 답변", "다른 탭 질문", "다른 탭 답변"]
+    assert django.calls == [None, "1", "1"]
+    assert store.metrics()["synced_messages"] == 2
+
+    # 커서가 앞으로 이동해 같은 메시지를 다시 받지 않음
+    assert _contents(_history(store, django)) == _contents(history)
+    assert django.calls[-1] == "4"
+
+
+def test_sync_failure_uses_cached_history():
+    store, django = ConversationContextStore(), _Django()
+    django.add("user", "질문", "m-1")
+    _history(store, django)
+
+    django.fail = True
+    assert _contents(_history(store, django)) == ["질문"]
+
+
+def test_reloads_when_more_than_a_window_is_new():
+    store, django = ConversationContextStore(), _Django()
+    django.add("user", "처음", "m-0")
+    _history(store, django, context_length=1)
+
+    for i in range(1, 4):
+        django.add("user", f"질문 {i}", f"m-{i}")
+    history = _history(store, django, context_length=1)
+
+    # 최근 context_length 턴(2개)만 유지
+    assert _contents(history) == ["질문 2", "질문 3"]
+    assert django.calls == [None, "1", None]
+    assert store.metrics()["misses"] == 2
+
+
+def test_history_excludes_system_messages():
+    django = _Django()
+    django.add("system", "시스템 안내")
+    django.add("user", "질문", "m-1")
+
+    assert _history(ConversationContextStore(), django) == [{"role": "user", "content": "질문"}]
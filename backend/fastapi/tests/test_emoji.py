@@ -0,0 +1,89 @@
+"""
+이모지 다양화 스트림 필터 테스트 (델타 단위로 feed, 스트림 종료 시 flush)
+"""
+
+from unittest import mock
+
+from app import emoji
+from app.emoji import EmojiDiversifier, EmojiHistoryRegistry
+
+
+def _stream(diversifier, deltas):
+    """스트리밍 루프와 같은 순서로 델타를 처리, 내보낸 조각 목록 반환"""
+    chunks = [diversifier.feed(delta) for delta in deltas]
+    chunks.append(diversifier.flush())
+    return [chunk for chunk in chunks if chunk]
+
+
+def test_zwj_sequence_split_across_deltas_is_kept_whole():
+    family = "👨‍👩‍👧"
+    diversifier = EmojiDiversifier()
+
+    chunks = _stream(diversifier, ["가족 👨‍", "👩‍", "👧 사진"])
+
+    assert "".join(chunks) == f"가족 {family} 사진"
+    # 시퀀스가 조각으로 나뉘어 내보내지지 않음
+    assert any(family in chunk for chunk in chunks)
+    assert list(diversifier.recent) == [family]
+
+
+def test_variation_selector_at_chunk_boundary_stays_with_its_emoji():
+    diversifier = EmojiDiversifier()
+
+    chunks = _stream(diversifier, ["날씨 ☀", "️ 맑음"])
+
+    assert chunks == ["날씨 ", "☀️ 맑음"]
+    assert list(diversifier.recent) == ["☀️"]
+
+
+def test_trailing_variation_selector_is_flushed_at_end_of_stream():
+    diversifier = EmojiDiversifier()
+
+    assert diversifier.feed("좋아요 ❤") == "좋아요 "
+    assert diversifier.feed("️") == ""
+    assert diversifier.flush() == "❤️"
+
+
+def test_hangul_passes_through_unchanged():
+    text = "안녕하세요! 오늘은 광합성에 대해 알아볼까요? 漢字도 괜찮아요."
+    deltas = [text[i:i + 3] for i in range(0, len(text), 3)]
+    diversifier = EmojiDiversifier()
+
+    assert _stream(diversifier, deltas) == deltas
+    assert not diversifier.recent
+
+
+def test_repeated_emoji_is_replaced_from_context_pool():
+    diversifier = EmojiDiversifier()
+
+    with mock.patch.object(emoji.random, "choice", side_effect=lambda pool: pool[0]):
+        output = "".join(_stream(diversifier, ["좋아요 😊 ", "생각해 보면 😊"]))
+
+    assert output == "좋아요 😊 생각해 보면 🤔"
+    assert list(diversifier.recent) == ["😊", "🤔"]
+
+
+def test_history_is_scoped_per_conversation():
+    registry = EmojiHistoryRegistry()
+
+    with mock.patch.object(emoji.random, "choice", side_effect=lambda pool: pool[0]):
+        first = "".join(_stream(registry.diversifier(1), ["좋아요 😊"]))
+        # 같은 대화의 다음 응답은 기록을 이어받아 반복 이모지를 교체
+        same = "".join(_stream(registry.diversifier(1), ["좋아요 😊"]))
+        # 다른 대화에는 영향 없음
+        other = "".join(_stream(registry.diversifier(2), ["좋아요 😊"]))
+
+    assert first == "좋아요 😊"
+    assert same != first
+    assert other == first
+
+
+def test_registry_evicts_least_recently_used_conversation():
+    registry = EmojiHistoryRegistry(maxsize=2)
+    _stream(registry.diversifier(1), ["😊"])
+    _stream(registry.diversifier(2), ["😊"])
+    registry.diversifier(1)  # 최근 사용으로 갱신
+    registry.diversifier(3)
+
+    assert list(registry.diversifier(1).recent) == ["😊"]
+    assert not registry.diversifier(2).recent
@@ -0,0 +1,151 @@
+"""
+업스트림 속도 제어 테스트
+
+Lua 스크립트는 Redis 없이 실행할 수 없으므로 같은 규칙을 따르는 프로세스 내 버킷(_LocalBucket)과
+Redis 실패 시 대체 경로를 검증
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app import governor
+from app.governor import (
+    BACKGROUND,
+    INTERACTIVE,
+    UpstreamBusy,
+    UpstreamGovernor,
+    _LocalBucket,
+    parse_reset,
+    scope_for,
+)
+
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def no_redis():
+    with mock.patch.object(governor, "get_async_redis", return_value=None):
+        yield
+
+
+def _drain(bucket, now=NOW, cost=0, reserve=0.0):
+    """대기 없이 확보한 횟수"""
+    granted = 0
+    while bucket.acquire(now, cost, reserve) == 0:
+        granted += 1
+    return granted
+
+
+def test_parse_reset():
+    assert parse_reset("1s") == 1.0
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("1h2m") == 3720.0
+    assert parse_reset("1.5") == 1.5
+    assert parse_reset("") is None
+    assert parse_reset("soon") is None
+
+
+def test_scope_is_per_model():
+    assert scope_for("/chat/completions", "gpt-4o") == "gpt-4o"
+    assert scope_for("/images/generations", None) == "images:generations"
+
+
+def test_bucket_limits_requests_and_refills():
+    bucket = _LocalBucket(rpm=60, tpm=1_000_000)
+    bucket.ts = NOW
+
+    assert _drain(bucket) == 60
+    # 분당 60개 = 초당 1개 보충
+    assert bucket.acquire(NOW, 0, 0.0) == pytest.approx(1.0)
+    assert bucket.acquire(NOW + 1, 0, 0.0) == 0
+
+
+def test_bucket_limits_tokens():
+    bucket = _LocalBucket(rpm=1000, tpm=6000)
+    bucket.ts = NOW
+
+    assert _drain(bucket, cost=2000) == 3
+    # 토큰 2000개 부족분 = 20초 보충
+    assert bucket.acquire(NOW, 2000, 0.0) == pytest.approx(20.0)
+
+
+def test_oversized_request_is_capped_to_bucket_size():
+    bucket = _LocalBucket(rpm=1000, tpm=6000)
+    bucket.ts = NOW
+
+    assert bucket.acquire(NOW, 50_000, 0.0) == 0
+
+
+def test_background_lane_leaves_reserve_for_chat():
+    bucket = _LocalBucket(rpm=10, tpm=1_000_000)
+    bucket.ts = NOW
+
+    background = _drain(bucket, reserve=0.2)
+    interactive = _drain(bucket)
+
+    assert (background, interactive) == (8, 2)
+
+
+def test_observe_lowers_remaining_and_blocks_on_429():
+    bucket = _LocalBucket(rpm=500, tpm=200_000)
+    bucket.ts = NOW
+
+    bucket.observe(NOW, rpm=100, tpm=None, remaining_req=3, remaining_tok=None, blocked_until=None)
+    assert bucket.rpm == 100
+    assert _drain(bucket) == 3
+
+    bucket.observe(NOW, None, None, None, None, blocked_until=NOW + 30)
+    bucket.observe(NOW, None, None, None, None, blocked_until=NOW + 5)  # 더 짧은 차단으로 줄지 않음
+    assert bucket.acquire(NOW + 10, 0, 0.0) == pytest.approx(20.0)
+
+
+def test_acquire_waits_for_short_block():
+    upstream = UpstreamGovernor()
+    asyncio.run(upstream.observe("gpt-4o", 429, {}, retry_after=0.05))
+
+    waited = asyncio.run(upstream.acquire("gpt-4o", 100, INTERACTIVE))
+
+    assert waited >= 0.04
+    assert upstream.metrics()["delayed"][INTERACTIVE] == 1
+    assert upstream.metrics()["throttled_responses"] == 1
+
+
+def test_acquire_sheds_when_wait_exceeds_lane_limit():
+    upstream = UpstreamGovernor()
+    headers = {"x-ratelimit-reset-requests": "1m", "x-ratelimit-reset-tokens": "20s"}
+    asyncio.run(upstream.observe("gpt-4o", 429, headers))
+
+    with pytest.raises(UpstreamBusy) as error:
+        asyncio.run(upstream.acquire("gpt-4o", 100, BACKGROUND))
+
+    assert error.value.scope == "gpt-4o"
+    assert error.value.retry_after == pytest.approx(60.0, abs=1)
+    assert upstream.metrics()["shed"][BACKGROUND] == 1
+    # 다른 모델 버킷은 영향 없음
+    assert asyncio.run(upstream.acquire("gpt-4o-mini", 100, INTERACTIVE)) == 0
+
+
+def test_image_scope_uses_image_rpm():
+    upstream = UpstreamGovernor()
+
+    assert upstream._local_bucket("dall-e-3").rpm == governor.GOVERNOR_IMAGE_RPM
+    assert upstream._local_bucket("gpt-4o").rpm == governor.GOVERNOR_DEFAULT_RPM
+
+
+def test_redis_failure_falls_back_to_local_bucket():
+    class _Redis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis down")
+            return run
+
+    upstream = UpstreamGovernor()
+    with mock.patch.object(governor, "get_async_redis", return_value=_Redis()):
+        assert asyncio.run(upstream.acquire("gpt-4o", 100, INTERACTIVE)) == 0
+        asyncio.run(upstream.observe("gpt-4o", 200, {"x-ratelimit-remaining-requests": "0"}))
+
+    assert upstream._local["gpt-4o"].req == 0
@@ -0,0 +1,77 @@
+"""
+헬스 프로버 스냅샷 테스트 (브로커/워커/Redis/Django 확인은 가짜로 대체)
+"""
+
+import asyncio
+import time
+from unittest import mock
+
+from app import health
+from app.health import HealthProber
+
+
+class _Redis:
+    async def ping(self):
+        return True
+
+
+def _probe(prober, django_ping=None):
+    async def ping(timeout):
+        return True
+
+    with mock.patch.object(health, "_check_broker", return_value={"images": 2, "images.priority": 1}), \
+            mock.patch.object(health, "_check_workers", return_value=3), \
+            mock.patch.object(health, "get_async_redis", return_value=_Redis()), \
+            mock.patch.object(health.django_client, "ping", django_ping or ping):
+        return asyncio.run(prober.probe())
+
+
+def test_snapshot_is_stale_until_first_probe():
+    snapshot = HealthProber(interval=10).snapshot()
+
+    assert snapshot["stale"] is True
+    assert snapshot["age"] is None
+    assert snapshot["broker"] is False
+
+
+def test_probe_records_dependencies():
+    prober = HealthProber(interval=10, queues=["images"])
+    _probe(prober)
+    snapshot = prober.snapshot()
+
+    assert snapshot["stale"] is False
+    assert snapshot["broker"] is True
+    assert snapshot["workers"] == 3
+    assert snapshot["queue_depth"] == 3
+    assert snapshot["redis"] is True
+    assert snapshot["django"] is True
+    assert prober.metrics()["probes"] == 1
+
+
+def test_snapshot_becomes_stale_after_three_intervals():
+    prober = HealthProber(interval=10)
+    _probe(prober)
+
+    prober._snapshot["checked_at"] = time.time() - 29
+    assert prober.snapshot()["stale"] is False
+
+    prober._snapshot["checked_at"] = time.time() - 31
+    snapshot = prober.snapshot()
+    assert snapshot["stale"] is True
+    assert snapshot["age"] >= 31
+
+
+def test_slow_dependency_does_not_block_probe():
+    async def hanging_ping(timeout):
+        await asyncio.sleep(10)
+
+    prober = HealthProber(interval=10)
+    with mock.patch.object(health, "HEALTH_PROBE_TIMEOUT", 0.05):
+        started = time.monotonic()
+        _probe(prober, django_ping=hanging_ping)
+
+    assert time.monotonic() - started < 1
+    snapshot = prober.snapshot()
+    assert snapshot["django"] is False
+    assert snapshot["broker"] is True
+    assert snapshot["stale"] is False
@@ -0,0 +1,139 @@
+"""
+이미지 작업 상태 스트림 테스트 (Redis pub/sub과 Celery 결과 백엔드는 가짜로 대체)
+"""
+
+import asyncio
+import json
+from unittest import mock
+
+from app import job_events
+from app.job_events import report_progress, status_payload, stream_status
+from app.tasks import generate_image_task
+from app.worker import WorkerLoop
+
+
+class _PubSub:
+    """구독 이후 발행된 메시지만 받는 pub/sub"""
+
+    def __init__(self, log, messages):
+        self.log = log
+        self.messages = list(messages)
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.log.append(("subscribe", channel))
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        if not self.messages:
+            return None
+        return {"type": "message", "data": json.dumps(self.messages.pop(0))}
+
+    async def unsubscribe(self):
+        self.log.append(("unsubscribe",))
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _Redis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def pubsub(self):
+        return self._pubsub
+
+
+def _collect(statuses, log, redis=None):
+    def task_status(task_id):
+        log.append(("status", task_id))
+        return statuses.pop(0)
+
+    async def collect():
+        return [event async for event in stream_status("task-1", timeout=5)]
+
+    with mock.patch.object(job_events, "get_async_redis", return_value=redis), \
+            mock.patch.object(job_events, "task_status", task_status), \
+            mock.patch.object(job_events, "IMAGE_STATUS_POLL_INTERVAL", 0):
+        return asyncio.run(collect())
+
+
+def test_subscribes_before_reading_current_state():
+    log = []
+    progress = status_payload("task-1", "PROGRESS", {"current": 50, "status": "Uploading"})
+    success = status_payload("task-1", "SUCCESS", {"url": "https://storage/cat.png"})
+    # 현재 상태를 읽는 사이에 발행된 이벤트가 구독 큐에 남아 있음
+    pubsub = _PubSub(log, [progress, success])
+
+    events = _collect([status_payload("task-1", "PENDING", None)], log, _Redis(pubsub))
+
+    assert log[:2] == [("subscribe", "image_job:task-1"), ("status", "task-1")]
+    assert [event["state"] for event in events] == ["PENDING", "PROGRESS", "SUCCESS"]
+    assert events[-1]["result"] == {"url": "https://storage/cat.png"}
+    assert log[-1] == ("unsubscribe",)
+    assert pubsub.closed
+
+
+def test_rechecks_backend_when_no_event_arrives():
+    log = []
+    statuses = [
+        status_payload("task-1", "STARTED", None),
+        status_payload("task-1", "FAILURE", "boom"),
+    ]
+
+    events = _collect(statuses, log, _Redis(_PubSub(log, [])))
+
+    assert [event["state"] for event in events] == ["STARTED", "FAILURE"]
+    assert events[-1]["error"] == "boom"
+    assert log.count(("status", "task-1")) == 2
+
+
+def test_finished_job_yields_once():
+    log = []
+
+    events = _collect([status_payload("task-1", "SUCCESS", {"url": "u"})], log, _Redis(_PubSub(log, [])))
+
+    assert len(events) == 1
+    assert events[0]["success"] is True
+
+
+def test_polls_without_redis():
+    log = []
+    statuses = [
+        status_payload("task-1", "PENDING", None),
+        status_payload("task-1", "PROGRESS", {"current": 10}),
+        status_payload("task-1", "SUCCESS", {"url": "u"}),
+    ]
+
+    events = _collect(statuses, log)
+
+    assert [event["state"] for event in events] == ["PENDING", "PROGRESS", "SUCCESS"]
+    assert events[1]["current"] == 10
+    assert events[1]["total"] == 100
+
+
+def test_report_progress_from_worker_loop():
+    published = []
+
+    class _Publisher:
+        async def publish(self, channel, data):
+            published.append((channel, json.loads(data)))
+
+    async def report():
+        # 워커 루프 스레드에서는 Celery request(스레드 로컬)가 비어 있음
+        assert generate_image_task.request.id is None
+        await report_progress(generate_image_task, task_id, 50, "Uploading")
+
+    task_id = "task-1"
+    worker_loop = WorkerLoop()
+    generate_image_task.push_request(id=task_id)
+    try:
+        with mock.patch.object(generate_image_task, "update_state") as update_state, \
+                mock.patch.object(job_events, "get_async_redis", return_value=_Publisher()):
+            worker_loop.run(report(), timeout=5)
+    finally:
+        generate_image_task.pop_request()
+        worker_loop.stop()
+
+    meta = {"current": 50, "total": 100, "status": "Uploading"}
+    update_state.assert_called_once_with(task_id=task_id, state="PROGRESS", meta=meta)
+    assert published == [("image_job:task-1", status_payload(task_id, "PROGRESS", meta))]
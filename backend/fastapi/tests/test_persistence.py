@@ -0,0 +1,69 @@
+"""
+메시지 write-behind 저장 테스트 (Django bulk_add_messages는 가짜로 대체)
+"""
+
+import asyncio
+from unittest import mock
+
+import httpx
+
+from app import persistence
+from app.persistence import MessageWriter
+
+
+def _run(enqueue, save_messages):
+    """writer를 시작해 메시지를 넣고, 종료(남은 메시지 저장)까지 실행"""
+    writer = MessageWriter(flush_interval=0.01)
+
+    async def run():
+        await writer.start()
+        enqueue(writer)
+        await writer.stop()
+
+    with mock.patch.object(persistence.django_client, "save_messages", save_messages):
+        asyncio.run(run())
+    return writer
+
+
+def test_rejected_conversation_does_not_drop_other_conversations():
+    calls = []
+
+    async def save_messages(messages, user_token):
+        calls.append((user_token, [m["conversation"] for m in messages]))
+        if messages[0]["conversation"] == 2:
+            return None  # 4xx (삭제된 대화 등)
+        return {"created": len(messages)}
+
+    def enqueue(writer):
+        writer.enqueue(1, "token-a", "user", "질문")
+        writer.enqueue(2, "token-a", "user", "삭제된 대화")
+        writer.enqueue(1, "token-a", "assistant", "답변")
+        writer.enqueue(3, "token-b", "user", "다른 사용자")
+
+    writer = _run(enqueue, save_messages)
+
+    assert sorted(calls) == [("token-a", [1, 1]), ("token-a", [2]), ("token-b", [3])]
+    metrics = writer.metrics()
+    assert (metrics["written"], metrics["dropped"]) == (3, 1)
+
+
+def test_retry_resends_same_client_ids():
+    sent = []
+
+    async def save_messages(messages, user_token):
+        sent.append([m["client_id"] for m in messages])
+        if len(sent) == 1:
+            # Django는 커밋했지만 응답을 받지 못함
+            raise httpx.ReadTimeout("timed out")
+        return {"created": 0, "duplicates": len(messages)}
+
+    def enqueue(writer):
+        writer.enqueue(1, "token-a", "user", "질문")
+        writer.enqueue(1, "token-a", "assistant", "답변")
+
+    writer = _run(enqueue, save_messages)
+
+    assert len(sent) == 2
+    assert sent[0] == sent[1]
+    assert len(set(sent[0])) == 2
+    assert writer.metrics()["written"] == 2
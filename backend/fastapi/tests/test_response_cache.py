@@ -0,0 +1,143 @@
+"""
+채팅 응답 캐시 테스트 (유사도 기준, 버킷 분리, 만료)
+"""
+
+import asyncio
+from unittest import mock
+
+from app import response_cache as module
+from app.response_cache import NGRAM, ResponseCache, cosine, embed
+
+
+CHARACTER = {"id": 1, "response_cache_enabled": True}
+PROMPT = "너는 과학 선생님이야."
+QUESTION = "광합성이 뭐야?"
+ANSWER = "광합성은 식물이 빛으로 양분을 만드는 과정이에요."
+
+
+def _store(cache, key, question=QUESTION, answer=ANSWER, vectors=None):
+    asyncio.run(cache.store(key, question, answer, vectors))
+
+
+def _lookup(cache, key, question, character_id=1):
+    result, _ = asyncio.run(cache.lookup(key, character_id, question))
+    return result
+
+
+def test_eligible_requires_opt_in_and_short_context():
+    cache = ResponseCache()
+    greeting = [{"role": "assistant", "content": "안녕! 무엇이 궁금하니?"}]
+
+    assert cache.eligible(CHARACTER, []) is True
+    assert cache.eligible(CHARACTER, greeting) is True
+    assert cache.eligible({"response_cache_enabled": False}, []) is False
+    assert cache.eligible(CHARACTER, greeting * 3) is False
+    assert cache.metrics()["skipped_long_context"] == 1
+
+
+def test_normalized_question_is_exact_hit():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key)
+
+    assert _lookup(cache, key, "  광합성이   뭐야?? ") == (ANSWER, 1.0)
+
+
+def test_similarity_threshold_is_inclusive():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key)
+    score = cosine(embed(QUESTION), embed("광합성 뭐야"))
+
+    with mock.patch.object(module, "RESPONSE_CACHE_THRESHOLD", score):
+        assert _lookup(cache, key, "광합성 뭐야") == (ANSWER, score)
+    with mock.patch.object(module, "RESPONSE_CACHE_THRESHOLD", score + 0.01):
+        assert _lookup(cache, key, "광합성 뭐야") is None
+
+
+def test_different_question_misses_at_default_threshold():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key)
+
+    assert _lookup(cache, key, "광합성이 왜 필요해?") is None
+    assert _lookup(cache, key, "미토콘드리아가 뭐야?") is None
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (0, 2)
+
+
+def test_questions_with_different_numbers_never_match():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key, "1592년에 무슨 일이 있었어?", "임진왜란이 일어났어요.")
+
+    # 문자 n-gram으로는 매우 비슷한 질문
+    assert cosine(embed("1592년에 무슨 일이 있었어?"), embed("1598년에 무슨 일이 있었어?")) > 0.85
+    assert _lookup(cache, key, "1598년에 무슨 일이 있었어?") is None
+    with mock.patch.object(module, "RESPONSE_CACHE_THRESHOLD", 0.5):
+        assert _lookup(cache, key, "1598년에 무슨 일이 있었어?") is None
+        assert _lookup(cache, key, "무슨 일이 있었어?") is None
+        assert _lookup(cache, key, "1592년에는 무슨 일이 있었어?") is not None
+
+
+def test_buckets_are_isolated_by_character_prompt_and_context():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key)
+
+    other_keys = [
+        cache.bucket_key(2, PROMPT, []),
+        cache.bucket_key(1, "너는 역사 선생님이야.", []),
+        cache.bucket_key(1, PROMPT, [{"role": "assistant", "content": "안녕!"}]),
+    ]
+    assert len({key, *other_keys}) == 4
+    for other in other_keys:
+        assert _lookup(cache, other, QUESTION) is None
+    assert _lookup(cache, key, QUESTION) is not None
+
+
+def test_expired_entries_and_bucket_size():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    _store(cache, key)
+    for entry in cache._buckets[key].values():
+        entry.expires_at = 0
+    assert _lookup(cache, key, QUESTION) is None
+    assert cache.metrics()["entries"] == 0
+
+    with mock.patch.object(module, "RESPONSE_CACHE_BUCKET_SIZE", 2):
+        for question in ("첫 질문", "두 번째 질문", "세 번째 질문"):
+            _store(cache, key, question, f"{question} 답")
+    # 가장 오래된 항목부터 제거
+    assert _lookup(cache, key, "첫 질문") is None
+    assert _lookup(cache, key, "세 번째 질문") == ("세 번째 질문 답", 1.0)
+
+
+def test_embedding_vectors_use_embedding_threshold_only():
+    cache = ResponseCache()
+    key = cache.bucket_key(1, PROMPT, [])
+    model = "text-embedding-3-small"
+    _store(cache, key, vectors={NGRAM: embed(QUESTION), model: {0: 1.0}})
+    _store(cache, key, "다른 질문", "다른 답", vectors={NGRAM: embed("다른 질문")})
+
+    async def remote(text):
+        # 코사인 0.95 / 0.9
+        return {0: 0.95, 1: 0.312} if "정의" in text else {0: 0.9, 1: 0.436}
+
+    with mock.patch.object(module, "RESPONSE_CACHE_EMBEDDING_MODEL", model), \
+            mock.patch.object(module, "embed_remote", remote):
+        hit = _lookup(cache, key, "광합성의 정의")
+        miss = _lookup(cache, key, "식물의 에너지")
+
+    assert hit == (ANSWER, 0.95)
+    assert miss is None
+
+
+def test_replay_matches_stream_events():
+    async def collect():
+        return [event async for event in ResponseCache().replay("가" * 30)]
+
+    events = asyncio.run(collect())
+
+    assert [event.get("content") for event in events] == ["가" * 24, "가" * 6, None]
+    assert events[-1] == {"done": True}
@@ -0,0 +1,143 @@
+"""
+공급자 라우터 테스트 (httpx.MockTransport로 업스트림 대체)
+"""
+
+import asyncio
+from typing import List
+
+import httpx
+
+from app.router import Provider, ProviderRouter
+from app.upstream import UpstreamClient
+
+
+STREAM_BODY = b'data: {"choices": [{"delta": {"content": "hi"}}]}\n\ndata: [DONE]\n\n'
+
+
+def _provider(name, handler, calls: List[str]) -> Provider:
+    async def recording(request: httpx.Request) -> httpx.Response:
+        calls.append(name)
+        return await handler(request)
+
+    client = UpstreamClient(base_url=f"https://{name}.test/v1", api_key="test")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url,
+        transport=httpx.MockTransport(recording),
+    )
+    return Provider(name, client, "gpt-4o")
+
+
+async def _ok(request):
+    return httpx.Response(200, content=STREAM_BODY)
+
+
+def _status(code):
+    async def handler(request):
+        return httpx.Response(code, json={"error": {"message": str(code)}})
+    return handler
+
+
+async def _stream(router: ProviderRouter, hedge=False):
+    """라우팅된 응답의 (공급자, 상태 코드, 본문 줄)"""
+    async with router.stream_chat({"messages": []}, hedge=hedge) as routed:
+        lines = [line async for line in routed.aiter_lines() if line]
+        return routed.provider.name, routed.status_code, lines
+
+
+def test_ranked_prefers_untried_then_fast_healthy_providers():
+    calls = []
+    slow, fast, new, broken = (_provider(name, _ok, calls) for name in ("slow", "fast", "new", "broken"))
+    for provider, ttft in ((slow, 0.8), (fast, 0.1), (broken, 0.05)):
+        for _ in range(5):
+            provider.requests += 1
+            provider.record_success(ttft)
+    for _ in range(10):
+        broken.record_error()
+
+    assert broken.cooling_down
+    assert [p.name for p in ProviderRouter([slow, fast, new, broken]).ranked()] == ["new", "fast", "slow"]
+
+
+def test_fails_over_on_server_error():
+    calls = []
+    router = ProviderRouter([_provider("a", _status(503), calls), _provider("b", _ok, calls)])
+
+    name, status, lines = asyncio.run(_stream(router))
+
+    assert (name, status) == ("b", 200)
+    assert lines[0].startswith("data: ")
+    assert calls == ["a", "b"]
+
+
+def test_fails_over_on_rate_limit_and_connection_error():
+    async def unreachable(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    for handler in (_status(429), unreachable):
+        calls = []
+        router = ProviderRouter([_provider("a", handler, calls), _provider("b", _ok, calls)])
+        assert asyncio.run(_stream(router))[:2] == ("b", 200)
+        assert calls == ["a", "b"]
+
+
+def test_client_error_is_returned_without_failover():
+    for code in (400, 401, 422):
+        calls = []
+        router = ProviderRouter([_provider("a", _status(code), calls), _provider("b", _ok, calls)])
+
+        name, status, _ = asyncio.run(_stream(router))
+
+        assert (name, status) == ("a", code)
+        assert calls == ["a"]
+
+
+def test_single_provider_is_not_hedged_or_retried():
+    async def slow(request):
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, content=STREAM_BODY)
+
+    calls = []
+    provider = _provider("only", slow, calls)
+    provider.record_success(0.01)  # 헤지 지연 = ROUTER_HEDGE_MIN_DELAY
+    router = ProviderRouter([provider])
+
+    assert asyncio.run(_stream(router, hedge=True))[:2] == ("only", 200)
+    assert calls == ["only"]
+    assert router.metrics()["hedged_requests"] == 0
+
+    calls.clear()
+    router = ProviderRouter([_provider("only", _status(503), calls)])
+    assert asyncio.run(_stream(router))[:2] == ("only", 503)
+    assert calls == ["only"]
+
+
+def test_hedge_cancels_the_slower_request():
+    cancelled = []
+
+    async def stalled(request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(request.url.host)
+            raise
+        return httpx.Response(200, content=STREAM_BODY)
+
+    calls = []
+    primary = _provider("primary", stalled, calls)
+    secondary = _provider("secondary", _ok, calls)
+    primary.requests += 1
+    primary.record_success(0.01)  # 헤지 지연 = ROUTER_HEDGE_MIN_DELAY
+    secondary.requests += 1
+    secondary.record_success(0.05)
+    router = ProviderRouter([primary, secondary])
+
+    name, status, _ = asyncio.run(_stream(router, hedge=True))
+
+    assert (name, status) == ("secondary", 200)
+    assert calls == ["primary", "secondary"]
+    assert cancelled == ["primary.test"]
+    assert router.metrics()["hedged_requests"] == 1
+    assert router.metrics()["hedge_wins"] == 1
+    assert secondary.hedges_won == 1
+    # 취소된 요청은 공급자 오류로 기록하지 않음
+    assert primary.error_rate == 0.0
@@ -0,0 +1,135 @@
+"""
+이미지 작업 공정 스케줄링 테스트 (Redis sorted set은 메모리 구현으로 대체)
+"""
+
+import asyncio
+import time
+from unittest import mock
+
+from app import scheduler
+from app.scheduler import IMAGE_PRIORITY_QUEUE, IMAGE_QUEUE, ImageScheduler, build_tenant
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+        return queue
+
+    async def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class _Redis:
+    """plan에서 쓰는 sorted set 명령만 구현"""
+
+    def __init__(self):
+        self.zsets = {}
+
+    def pipeline(self, transaction=False):
+        return _Pipeline(self)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.zsets.get(key, {})
+        removed = [member for member, score in members.items() if score <= high]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def expire(self, key, seconds):
+        return True
+
+
+def _plan(tenants, redis):
+    image_scheduler = ImageScheduler()
+
+    async def run():
+        return [
+            await image_scheduler.plan(tenant, f"task-{i}")
+            for i, tenant in enumerate(tenants)
+        ]
+
+    with mock.patch.object(scheduler, "get_async_redis", return_value=redis):
+        return asyncio.run(run())
+
+
+def test_each_users_next_job_waits_behind_other_users_first_jobs():
+    alice = build_tenant(1)
+    bob = build_tenant(2)
+
+    plans = _plan([alice, alice, alice, bob], _Redis())
+
+    assert [plan["priority"] for plan in plans] == [1, 2, 3, 1]
+    assert {plan["queue"] for plan in plans} == {IMAGE_QUEUE}
+
+
+def test_teacher_uses_priority_lane_one_level_higher():
+    teacher = build_tenant(1, role="teacher")
+
+    plans = _plan([teacher, teacher], _Redis())
+
+    assert plans == [
+        {"queue": IMAGE_PRIORITY_QUEUE, "priority": 0},
+        {"queue": IMAGE_PRIORITY_QUEUE, "priority": 1},
+    ]
+
+
+def test_busy_organization_is_lowered_per_fair_share():
+    students = [build_tenant(user_id, organization_id=7) for user_id in range(1, 7)]
+
+    plans = _plan(students, _Redis())
+
+    # 조직 대기 작업이 IMAGE_ORG_FAIR_SHARE(4)개 쌓인 뒤부터 한 단계 낮춤
+    assert [plan["priority"] for plan in plans] == [1, 1, 1, 1, 2, 2]
+
+
+def test_priority_is_capped_and_stale_jobs_are_ignored():
+    redis = _Redis()
+    stale = time.time() - scheduler.IMAGE_SCHEDULER_STALE - 60
+    redis.zadd("image_sched:active:user:1", {f"lost-{i}": stale for i in range(20)})
+
+    plans = _plan([build_tenant(1)], redis)
+    assert plans[0]["priority"] == 1
+
+    plans = _plan([build_tenant(2)] * 12, redis)
+    assert plans[-1]["priority"] == scheduler.PRIORITY_LEVELS - 1
+
+
+def test_without_redis_uses_lane_base_priority():
+    plans = _plan([build_tenant(1), build_tenant(1), build_tenant(2, role="admin")], None)
+
+    assert plans == [
+        {"queue": IMAGE_QUEUE, "priority": 1},
+        {"queue": IMAGE_QUEUE, "priority": 1},
+        {"queue": IMAGE_PRIORITY_QUEUE, "priority": 0},
+    ]
+
+
+def test_redis_error_falls_back_to_base_priority():
+    class _Broken(_Redis):
+        def zcard(self, key):
+            raise ConnectionError("redis down")
+
+    assert _plan([build_tenant(1)], _Broken()) == [{"queue": IMAGE_QUEUE, "priority": 1}]
+
+
+def test_acquire_without_redis_runs_immediately():
+    with mock.patch.object(scheduler, "get_redis", return_value=None):
+        assert ImageScheduler().acquire(build_tenant(1), "task-1") is True
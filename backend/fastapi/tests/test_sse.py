@@ -0,0 +1,65 @@
+"""
+SSE 인코딩 / 프레임 병합 테스트
+"""
+
+import asyncio
+
+from app.sse import coalesce_events, encode_event
+
+
+def _content(text):
+    return {"content": text, "done": False}
+
+
+async def _events(items):
+    for item in items:
+        if isinstance(item, float):
+            # 업스트림 지연 (초)
+            await asyncio.sleep(item)
+        else:
+            yield item
+
+
+def _coalesce(items, interval_ms=1000, max_bytes=1024):
+    async def collect():
+        return [event async for event in coalesce_events(_events(items), interval_ms, max_bytes)]
+    return asyncio.run(collect())
+
+
+def test_encode_event_keeps_utf8():
+    assert encode_event({"content": "안녕"}).decode("utf-8") in (
+        'data: {"content":"안녕"}\n\n',
+        'data: {"content": "안녕"}\n\n',
+    )
+
+
+def test_first_content_is_sent_immediately_then_merged():
+    done = {"done": True, "conversation_id": 1}
+    events = _coalesce([_content("a"), _content("b"), _content("c"), {"usage": {"total_tokens": 3}}, done])
+
+    assert events == [
+        _content("a"),
+        _content("bc"),
+        {"usage": {"total_tokens": 3}},
+        done,
+    ]
+
+
+def test_flushes_when_buffer_reaches_max_bytes():
+    # 한글 한 글자는 UTF-8 3바이트
+    events = _coalesce([_content("시작"), _content("가"), _content("나"), _content("다")], max_bytes=6)
+
+    assert [event["content"] for event in events] == ["시작", "가나", "다"]
+
+
+def test_flushes_after_interval_when_upstream_stalls():
+    events = _coalesce([_content("a"), _content("b"), 0.2, _content("c"), _content("d")], interval_ms=50)
+
+    assert [event["content"] for event in events] == ["a", "b", "cd"]
+
+
+def test_error_event_is_not_merged():
+    error = {"error": "upstream failed", "done": True}
+    events = _coalesce([_content("a"), _content("b"), error])
+
+    assert events == [_content("a"), _content("b"), error]
@@ -0,0 +1,70 @@
+"""
+토크나이저 로드 테스트 (tiktoken은 가짜 모듈로 대체)
+"""
+
+import asyncio
+import threading
+from contextlib import ExitStack
+from unittest import mock
+
+import pytest
+
+from app import tokens
+
+
+class _Encoding:
+    name = "fake"
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class _Tiktoken:
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.calls = []
+
+    def encoding_for_model(self, model):
+        self.calls.append(threading.current_thread())
+        if self.fail_times:
+            self.fail_times -= 1
+            raise OSError("download failed")
+        return _Encoding()
+
+
+@pytest.fixture
+def fake_tiktoken():
+    def install(**kwargs):
+        module = _Tiktoken(**kwargs)
+        stack.enter_context(mock.patch.object(tokens, "tiktoken", module))
+        return module
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(tokens, "_encodings", {}))
+        stack.enter_context(mock.patch.object(tokens, "_failed_at", {}))
+        yield install
+
+
+def test_failure_is_not_cached(fake_tiktoken):
+    module = fake_tiktoken(fail_times=1)
+
+    assert tokens.count_tokens("하나 둘 셋", "m") == tokens.estimate_tokens("하나 둘 셋")
+    # 재시도 대기 중에는 다시 로드하지 않음
+    assert tokens.get_encoding("m") is None
+    assert len(module.calls) == 1
+
+    with mock.patch.object(tokens, "TOKENIZER_RETRY_SECONDS", 0):
+        assert tokens.count_tokens("하나 둘 셋", "m") == 3
+    assert tokens.get_encoding("m") is not None
+    assert len(module.calls) == 2
+
+
+def test_warm_encoding_loads_off_the_event_loop(fake_tiktoken):
+    module = fake_tiktoken()
+
+    assert asyncio.run(tokens.warm_encoding("m")) is True
+    assert module.calls[0] is not threading.main_thread()
+
+    # 이후 요청은 캐시된 인코더 사용
+    assert tokens.tokenizer_source("m") == "tokenizer"
+    assert len(module.calls) == 1
@@ -153,9 +153,9 @@ function ChatPageContent() {
           if (filteredConvs.length > 0) {
             const selectedConv = filteredConvs[0];
             setCurrentConversationId(selectedConv.id);
-            const msgs = await fetchConversationMessages(token, selectedConv.id);
+            const page = await fetchConversationMessages(token, selectedConv.id);
             setMessages(
-              msgs.map((m) => ({
+              page.results.map((m) => ({
                 type: m.role === 'assistant' ? 'bot' : m.role as 'user' | 'bot',
                 text: m.content,
               }))
@@ -201,11 +201,7 @@ function ChatPageContent() {
         currentConversationId,
         currentCharacter.id,
         userMessage,
-        messages.map((m) => ({
-          role: m.type === "bot" ? "assistant" : "user",
-          content: m.text,
-        })),
-        token  // 사용자 토큰 전달
+        token  // 사용자 토큰 전달 (이전 대화 이력은 서버에서 구성)
       );
 
       // SSE 파싱
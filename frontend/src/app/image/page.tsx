@@ -20,7 +20,6 @@ export default function ImageGenerationPage() {
   const [error, setError] = useState<string | null>(null);
   const [history, setHistory] = useState<Array<ImageGenerationResult & { prompt: string }>>([]);
   const [taskId, setTaskId] = useState<string | null>(null);
-  const [pollInterval, setPollInterval] = useState<NodeJS.Timeout | null>(null);
 
   // 로그인 상태 확인 (리다이렉트 없음)
   useEffect(() => {
@@ -31,8 +30,30 @@ export default function ImageGenerationPage() {
     setUserToken(token);
   }, []);
 
-  // 작업 상태 폴링
-  const pollTaskStatus = async (currentTaskId: string) => {
+  // 작업 상태 처리 (완료/실패 시 true 반환)
+  const handleTaskStatus = (status: any): boolean => {
+    console.log(`[Frontend] Task status: ${status.status}`, status);
+
+    if (status.success && status.result) {
+      console.log(`[Frontend] ✅ Task completed!`);
+      setResult(status.result);
+      setHistory(prev => [{ ...status.result, prompt }, ...prev].slice(0, 6));
+      setTaskId(null);
+      setGenerating(false);
+      return true;
+    } else if (status.status === "FAILURE") {
+      console.error(`[Frontend] ❌ Task failed: ${status.error}`);
+      setError(status.error || "이미지 생성에 실패했습니다.");
+      setTaskId(null);
+      setGenerating(false);
+      return true;
+    }
+    // PENDING, PROGRESS 상태는 계속 대기
+    return false;
+  };
+
+  // 작업 상태 폴링 (스트림을 사용할 수 없을 때)
+  const pollTaskStatus = async (currentTaskId: string): Promise<boolean> => {
     console.log(`[Frontend] Polling status for task: ${currentTaskId}`);
 
     try {
@@ -42,57 +63,53 @@ export default function ImageGenerationPage() {
 
       if (!response.ok) {
         console.error(`[Frontend] Status check failed: ${response.status}`);
-        return;
+        return false;
       }
 
-      const status = await response.json();
-      console.log(`[Frontend] Task status: ${status.status}`, status);
-
-      if (status.success && status.result) {
-        console.log(`[Frontend] ✅ Task completed!`);
-        setResult(status.result);
-        setHistory(prev => [{ ...status.result, prompt }, ...prev].slice(0, 6));
-        setTaskId(null);
-        setGenerating(false);
-
-        // 폴링 중지
-        if (pollInterval) {
-          clearInterval(pollInterval);
-          setPollInterval(null);
-        }
-      } else if (status.status === "FAILURE") {
-        console.error(`[Frontend] ❌ Task failed: ${status.error}`);
-        setError(status.error || "이미지 생성에 실패했습니다.");
-        setTaskId(null);
-        setGenerating(false);
-
-        if (pollInterval) {
-          clearInterval(pollInterval);
-          setPollInterval(null);
-        }
-      }
-      // PENDING, PROGRESS 상태는 계속 폴링
+      return handleTaskStatus(await response.json());
     } catch (err) {
       console.error(`[Frontend] Polling error:`, err);
+      return false;
     }
   };
 
-  // taskId 변경 시 폴링 시작
+  // taskId 변경 시 상태 스트림 구독 (SSE), 연결 실패 시 폴링으로 대체
   useEffect(() => {
     if (!taskId) return;
 
-    console.log(`[Frontend] Starting polling for task: ${taskId}`);
+    console.log(`[Frontend] Subscribing to status stream for task: ${taskId}`);
 
-    // 첫 번째 폴링 즉시 실행
-    pollTaskStatus(taskId);
+    let interval: NodeJS.Timeout | null = null;
+    let finished = false;
+    const source = new EventSource(
+      `https://fastapi-production-287b.up.railway.app/image/status/${taskId}/stream`
+    );
 
-    // 2초마다 상태 확인
-    const interval = setInterval(() => pollTaskStatus(taskId), 2000);
-    setPollInterval(interval);
+    source.onmessage = (event) => {
+      if (handleTaskStatus(JSON.parse(event.data))) {
+        finished = true;
+        source.close();
+      }
+    };
+
+    source.onerror = () => {
+      source.close();
+      if (finished || interval) return;
+
+      // 2초마다 상태 확인
+      console.warn(`[Frontend] Status stream unavailable, falling back to polling`);
+      pollTaskStatus(taskId);
+      interval = setInterval(async () => {
+        if (await pollTaskStatus(taskId) && interval) {
+          clearInterval(interval);
+          interval = null;
+        }
+      }, 2000);
+    };
 
     return () => {
-      clearInterval(interval);
-      setPollInterval(null);
+      source.close();
+      if (interval) clearInterval(interval);
     };
   }, [taskId]);
 
@@ -62,6 +62,7 @@ export interface CharacterDetail extends Character {
   context_length: number;
   moderation_level: string;
   moderation_level_display: string;
+  response_cache_enabled: boolean;
 }
 
 export interface Conversation {
@@ -72,6 +73,9 @@ export interface Conversation {
   title: string | null;
   subject: string | null;
   message_count: number;
+  total_tokens: number;
+  last_message_at: string | null;
+  last_message_preview: string;
   is_active: boolean;
   created_at: string;
   updated_at: string;
@@ -86,6 +90,33 @@ export interface Message {
   created_at: string;
 }
 
+// 메시지 이력 커서 페이지 (시간순)
+export interface MessagePage {
+  results: Message[];
+  previous: string | null; // 이전 페이지 커서 (before)
+  next: string | null; // 증분 동기화 커서 (since)
+  has_more: boolean; // since 요청에서 새 메시지가 더 남았는지
+}
+
+// 메시지 검색 결과 (기본 페이지네이션)
+export interface MessageSearchHit {
+  id: number;
+  conversation: number;
+  conversation_title: string | null;
+  character_name: string;
+  user_name: string;
+  role: 'user' | 'assistant' | 'system';
+  snippet: string;
+  created_at: string;
+}
+
+export interface MessageSearchPage {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: MessageSearchHit[];
+}
+
 // ==================== Auth API ====================
 
 export interface LoginResponse {
@@ -319,11 +350,18 @@ export async function createConversation(
 
 export async function fetchConversationMessages(
   token: string,
-  conversationId: number
-): Promise<Message[]> {
+  conversationId: number,
+  options: { before?: string; since?: string; pageSize?: number } = {}
+): Promise<MessagePage> {
   try {
+    const params = new URLSearchParams();
+    if (options.before) params.set('before', options.before);
+    if (options.since) params.set('since', options.since);
+    if (options.pageSize) params.set('page_size', String(options.pageSize));
+    const query = params.toString();
+
     const response = await fetch(
-      `${DJANGO_API_URL}/conversations/${conversationId}/messages/`,
+      `${DJANGO_API_URL}/conversations/${conversationId}/messages/${query ? `?${query}` : ''}`,
       {
         method: 'GET',
         headers: {
@@ -344,13 +382,45 @@ export async function fetchConversationMessages(
   }
 }
 
+export async function searchMessages(
+  token: string,
+  query: string,
+  filters: { conversation?: number; character?: number; classroom?: number; role?: string; page?: number } = {}
+): Promise<MessageSearchPage> {
+  try {
+    const params = new URLSearchParams({ q: query });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined) params.set(key, String(value));
+    });
+
+    const response = await fetch(
+      `${DJANGO_API_URL}/conversations/search/?${params.toString()}`,
+      {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${token}`,
+        },
+      }
+    );
+
+    if (!response.ok) {
+      throw new Error(`Failed to search messages: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Error searching messages:', error);
+    throw error;
+  }
+}
+
 // ==================== FastAPI Chat & Image ====================
 
 export async function streamChat(
   conversationId: number,
   characterId: number,
   userMessage: string,
-  messages: Array<{ role: string; content: string }>,
   userToken: string = '',
   temperature?: number,
   maxTokens?: number
@@ -365,7 +435,6 @@ export async function streamChat(
       character_id: characterId,
       user_message: userMessage,
       user_token: userToken,
-      messages,
       temperature: temperature || 0.7,
       max_tokens: maxTokens || 2000,
       save_to_db: true,
@@ -391,17 +460,22 @@ export interface ImageGenerationResponse {
   status: string;
   message?: string;
   check_url?: string;
+  stream_url?: string;
   success: boolean;
   url?: string;
   revised_prompt?: string;
   model?: string;
+  cached?: boolean;
+  idempotent_replay?: boolean;
 }
 
 export async function generateImage(
   prompt: string,
   size: string = '1024x1024',
   quality: string = 'standard',
-  userToken: string = ''
+  userToken: string = '',
+  useCache: boolean = false,  // 같은 프롬프트의 저장된 결과 재사용
+  idempotencyKey?: string  // 같은 키로 다시 요청하면 새로 생성하지 않고 기존 작업 반환
 ): Promise<ImageGenerationResponse> {
   try {
     console.log("\n[API] Calling FastAPI /image/generate endpoint");
@@ -425,6 +499,8 @@ export async function generateImage(
         quality,
         user_token: userToken,
         save_to_db: true,  // Django에 저장
+        use_cache: useCache,
+        idempotency_key: idempotencyKey,
       }),
     });
 